@@ -0,0 +1,126 @@
+""" Replay a synthetic trading day through orders_check, run with:
+
+    python -m benchmarks.bench_replay [--trades 1000] [--max-us-per-fill 2000]
+
+The day is a recording of raw eTrade orders, polled every second from the
+open: option and stock trades of OrderGenerator, with scale-ins and exits
+in several STCs. Every poll goes through _read_orders, track_portfolio and
+make_alert as in the app. Throughput and the per fill latency, from the end
+of the poll to the alert in the queue, are reported. With --max-us-per-fill
+the exit code is 1 if the p95 latency is above it, to catch regressions in
+CI.
+"""
+import argparse
+import json
+import queue
+import re
+import sys
+import tempfile
+import time
+import os.path as op
+from datetime import datetime
+from tradealerter.brokerages.replay_api import Replay
+from tradealerter.check_orders import orders_check
+from tradealerter.metrics import Metrics
+from benchmarks.order_generator import OrderGenerator, TIME_FORMAT
+
+
+def raw_order(order:dict)->dict:
+    "Executed eTrade order of a format_order order"
+    product = {'symbol': order['symbol']}
+    if order['asset'] == 'option':
+        symbol, expiry, callput, strike = re.match(r"(\w+)_(\d{6})([CP])(\d+)", order['symbol']).groups()
+        product = {'symbol': symbol, 'callPut': 'CALL' if callput == 'C' else 'PUT',
+                   'expiryYear': 2000 + int(expiry[4:]), 'expiryMonth': int(expiry[:2]),
+                   'expiryDay': int(expiry[2:4]), 'strikePrice': float(strike)}
+    ms = lambda t: int(datetime.strptime(t, TIME_FORMAT).timestamp()*1000)
+    return {
+        'orderId': order['order_id'],
+        'orderType': 'EQ' if order['asset'] == 'stock' else 'OPTN',
+        'OrderDetail': [{
+            'status': 'EXECUTED',
+            'placedTime': ms(order['enteredTime']),
+            'executedTime': ms(order['closeTime']),
+            'priceType': order['orderType'],
+            'Instrument': [{
+                'Product': product,
+                'orderAction': order['action'],
+                'orderedQuantity': order['quantity'],
+                'filledQuantity': order['filledQuantity'],
+                'averageExecutionPrice': order['price'],
+                }],
+            }],
+        }
+
+
+def synthetic_day(n_trades:int=1000, seed:int=0, window:int=100)->list:
+    """Recorded polls of a day with n_trades round trips, one poll per second
+
+    Trades are from OrderGenerator, with scale-ins and several STCs. Each
+    poll returns the last window executed orders, most recent first, as the
+    brokerage does. The first poll is before the open, its orders are not
+    alerted, then only the polls with new fills are kept.
+    """
+    generator = OrderGenerator(seed=seed)
+    orders = generator.orders(n_trades, duration=6.5*3600 - 600)
+    fills, polls = [], [{'broker': 'etrade', 't': 0, 'orders': []}]
+    for batch in generator.arrivals(orders):
+        fills.extend(raw_order(order) for order in reversed(batch))
+        t = datetime.strptime(batch[0]['closeTime'], TIME_FORMAT) - generator.start
+        polls.append({'broker': 'etrade', 't': round(t.total_seconds(), 3),
+                      'orders': fills[-window:][::-1]})
+    return polls
+
+
+def replay(polls:list, tmp_dir:str)->dict:
+    "Replay the polls through orders_check, per fill latency in ns and totals"
+    alerts = queue.Queue()
+    checker = orders_check(alerts, order_fname=op.join(tmp_dir, "orders.json"),
+                           port_fname=op.join(tmp_dir, "portfolio.csv"),
+                           bksession=lambda: Replay(polls=polls))
+    bksession = checker.bksession
+    latencies, n_polls = [], 0
+    t0 = time.perf_counter()
+    while not bksession.exhausted:
+        checker._read_orders(False, True)
+        n_polls += 1
+        while not alerts.empty():
+            _, _, _, stamps = alerts.get_nowait()
+            latencies.append(stamps['enqueued'] - stamps['detected'])
+    elapsed = time.perf_counter() - t0
+    return {'polls': n_polls, 'fills': len(latencies), 'seconds': elapsed, 'latencies': latencies,
+            'trades': len(checker.trades), 'open': len(checker.open_trades)}
+
+
+def main(argv:list=None)->dict:
+    parser = argparse.ArgumentParser(description="Replay a synthetic trading day through orders_check")
+    parser.add_argument('--trades', type=int, default=1000, help="round trips in the day")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--record', help="also write the day as a recording to this file")
+    parser.add_argument('--max-us-per-fill', type=float, help="fail if the p95 fill latency is above")
+    args = parser.parse_args(argv)
+
+    polls = synthetic_day(args.trades, args.seed)
+    if args.record:
+        with open(args.record, 'w') as f:
+            f.writelines(json.dumps(poll) + "\n" for poll in polls)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        result = replay(polls, tmp_dir)
+
+    metrics = Metrics(window=len(result['latencies']) or 1)
+    for latency in result['latencies']:
+        metrics.observe("fill", latency / 1e9)
+    result['summary'] = summary = metrics.summary("fill")
+    print(f"{result['polls']} polls, {result['fills']} fills, {result['trades']} trades "
+          f"({result['open']} open) in {result['seconds']:.2f} s")
+    print(f"throughput {result['fills']/result['seconds']:10.1f} fills/s")
+    for q in [.5, .95, .99]:
+        print(f"p{int(q*100):<2} fill    {summary[q]*1e6:10.1f} us")
+    if args.max_us_per_fill is not None and summary[.95]*1e6 > args.max_us_per_fill:
+        print(f"p95 fill latency above {args.max_us_per_fill} us")
+        sys.exit(1)
+    return result
+
+
+if __name__ == '__main__':
+    main()
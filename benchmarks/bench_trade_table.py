@@ -0,0 +1,44 @@
+""" Benchmark appending trades to the portfolio, run with:
+
+    python -m benchmarks.bench_trade_table
+
+Each appended trade is read back from the frame, as an alert of it would.
+The frame buffer doubles when full, the time per trade includes the copies.
+"""
+import time
+import pandas as pd
+from tradealerter.portfolio_store import PORT_COLUMNS
+from tradealerter.trade_table import TradeTable, Trade
+
+
+def make_trade(i:int)->dict:
+    return {'date': "2023-05-30 14:01:11.193000", 'isopen': 1, 'symbol': f"TSLA_060223P{i}",
+            'asset': 'option', 'broker': 'etrade', 'qty': 2, 'fills': 2.0, 'price': 3.1,
+            'ordID': i, 'BTO-n': 1, 'BTOs-sent': 0, 'STCs-sent': 0}
+
+
+def time_appends(n_rows:int, n_appends:int=1000):
+    "Time per appended and read trade in a portfolio with n_rows, table vs pd.concat"
+    port = pd.DataFrame([make_trade(i) for i in range(n_rows)], columns=PORT_COLUMNS)
+    table = TradeTable.from_frame(port)
+    table.frame
+
+    t0 = time.perf_counter()
+    for i in range(n_appends):
+        trade_ix = table.append(Trade.from_row(make_trade(n_rows + i)))
+        table.frame.loc[trade_ix]
+    t_table = (time.perf_counter() - t0) / n_appends
+
+    t0 = time.perf_counter()
+    for i in range(n_appends):
+        port = pd.concat([port, pd.DataFrame(make_trade(n_rows + i), index=[0])], ignore_index=True)
+        port.loc[n_rows + i]
+    t_concat = (time.perf_counter() - t0) / n_appends
+    return t_table, t_concat
+
+
+if __name__ == '__main__':
+    print(f"{'rows':>8} {'table us/trade':>16} {'concat us/trade':>16}")
+    for n_rows in [100, 1_000, 10_000, 100_000]:
+        t_table, t_concat = time_appends(n_rows)
+        print(f"{n_rows:>8} {t_table*1e6:>16.2f} {t_concat*1e6:>16.2f}")
@@ -0,0 +1,64 @@
+""" Benchmark decoding the numeric fields of a Webull history payload, run with:
+
+    python -m benchmarks.bench_webull_decoder
+"""
+import json
+import os.path as op
+import time
+from tradealerter.brokerages.webull_decoder import decode, ORDER_SCHEMA
+
+PAYLOAD = op.join(op.dirname(op.dirname(op.abspath(__file__))),
+                  "tests", "data", "webull_history_orders.json")
+
+
+def eval_order(order:dict)->dict:
+    "Numeric fields parsed as format_order did before the decoder"
+    leg = order['orders'][0]
+    price = leg.get('avgFilledPrice')
+    if price is None:
+        price = leg.get('lmtPrice')
+    return {
+        'quantity': eval(leg['totalQuantity']),
+        'filledQuantity': eval(leg['filledQuantity']),
+        'price': float(price) if price else float(order['auxPrice']),
+        'enteredTime': int(leg['createTime0'])/1000,
+        'closeTime': int(leg['updateTime0'])/1000,
+        'legQuantity': eval(order['filledQuantity']),
+        }
+
+
+def decoder_order(order:dict)->dict:
+    "Same fields through the schema decoder"
+    order = decode(order, ORDER_SCHEMA)
+    leg = order['orders'][0]
+    price = leg.get('avgFilledPrice')
+    if price is None:
+        price = leg.get('lmtPrice')
+    return {
+        'quantity': leg['totalQuantity'],
+        'filledQuantity': leg['filledQuantity'],
+        'price': price if price is not None else order['auxPrice'],
+        'enteredTime': leg['createTime0']/1000,
+        'closeTime': leg['updateTime0']/1000,
+        'legQuantity': order['filledQuantity'],
+        }
+
+
+def time_payload(func, orders:list, repeat:int=50)->float:
+    "Seconds per order"
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for order in orders:
+            func(order)
+    return (time.perf_counter() - t0) / (repeat * len(orders))
+
+
+if __name__ == "__main__":
+    with open(PAYLOAD) as f:
+        orders = json.load(f)
+    assert [eval_order(o) for o in orders] == [decoder_order(o) for o in orders]
+    t_eval = time_payload(eval_order, orders)
+    t_decoder = time_payload(decoder_order, orders)
+    print(f"{len(orders)} orders")
+    print(f"eval    {t_eval*1e6:8.1f} us/order")
+    print(f"decoder {t_decoder*1e6:8.1f} us/order  x{t_eval/t_decoder:.1f}")
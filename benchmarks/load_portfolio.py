@@ -0,0 +1,91 @@
+""" Load test orders_check throughput and memory against the portfolio size, run with:
+
+    python -m benchmarks.load_portfolio [--sizes 100 1000 10000] [--burst 500] [--late 0.05]
+
+For each size the portfolio is rebuilt from that many generated trades,
+then a burst of new trades arrives poll by poll, with late orders arriving
+after later fills, and goes through _new_orders and _process_orders. Fills
+per second, p95 latency per fill, the memory held by the portfolio and the
+peak memory of the burst are reported. Every fill of the burst, late or not,
+must be alerted, the load test fails if one is dropped.
+"""
+import argparse
+import gc
+import queue
+import tempfile
+import time
+import tracemalloc
+import os.path as op
+from tradealerter.brokerages.replay_api import Replay
+from tradealerter.check_orders import orders_check
+from tradealerter.metrics import Metrics
+from benchmarks.order_generator import OrderGenerator
+
+
+def load(n_trades:int, n_burst:int, tmp_dir:str, late_ratio:float=0, seed:int=0)->dict:
+    "Burst of n_burst trades tracked with a portfolio of n_trades"
+    generator = OrderGenerator(late_ratio=late_ratio, seed=seed)
+    # a few trades stay open, as in a real portfolio
+    history = generator.orders(n_trades, duration=n_trades*60, close_ratio=.95)
+    burst = generator.orders(n_burst, duration=n_burst*10)
+
+    alerts = queue.Queue()
+    # modules imported on first use are not portfolio memory
+    import pandas, tradealerter.portfolio_rebuild
+    gc.collect()
+    tracemalloc.start()
+    mem0 = tracemalloc.get_traced_memory()[0]
+    checker = orders_check(alerts, order_fname=op.join(tmp_dir, "orders.json"),
+                           port_fname=op.join(tmp_dir, "portfolio.csv"),
+                           bksession=lambda: Replay(polls=[]))
+    checker.rebuild_portfolio(history)
+    for order in history:
+        checker.orders.append(order)
+        checker._mark_seen(order)
+    mem_port = tracemalloc.get_traced_memory()[0] - mem0
+    tracemalloc.reset_peak()
+
+    latencies = []
+    t0 = time.perf_counter()
+    for batch in generator.arrivals(burst):
+        checker._process_orders(checker._new_orders(batch), False, True)
+        while not alerts.empty():
+            _, _, _, stamps = alerts.get_nowait()
+            latencies.append(stamps['enqueued'] - stamps['detected'])
+    elapsed = time.perf_counter() - t0
+    mem_peak = tracemalloc.get_traced_memory()[1] - mem0
+    tracemalloc.stop()
+    return {'portfolio': n_trades, 'trades': len(checker.trades), 'fills': len(latencies),
+            'dropped': len(burst) - len(latencies), 'seconds': elapsed, 'latencies': latencies, 'mem_port': mem_port, 'mem_peak': mem_peak}
+
+
+def main(argv:list=None)->list:
+    parser = argparse.ArgumentParser(description="Load test orders_check against the portfolio size")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1_000, 10_000],
+                        help="trades in the portfolio")
+    parser.add_argument('--burst', type=int, default=500, help="new trades of the burst")
+    parser.add_argument('--late', type=float, default=.05, help="share of the orders arriving late")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"{'trades':>8} {'fills':>6} {'fills/s':>10} {'p95 us':>10} {'dropped':>8} {'port MB':>9} {'peak MB':>9}")
+    results = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            result = load(size, args.burst, tmp_dir, args.late, args.seed)
+        metrics = Metrics(window=len(result['latencies']) or 1)
+        for latency in result['latencies']:
+            metrics.observe("fill", latency / 1e9)
+        result['summary'] = metrics.summary("fill")
+        print(f"{size:>8} {result['fills']:>6} {result['fills']/result['seconds']:>10.1f} "
+              f"{result['summary'][.95]*1e6:>10.1f} {result['dropped']:>8} "
+              f"{result['mem_port']/2**20:>9.2f} {result['mem_peak']/2**20:>9.2f}")
+        results.append(result)
+        if result['dropped']:
+            raise AssertionError(f"{result['dropped']} fills of the burst were not alerted "
+                                 f"with a portfolio of {size} trades")
+    return results
+
+
+if __name__ == '__main__':
+    main()
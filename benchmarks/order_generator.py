@@ -0,0 +1,146 @@
+""" Synthetic filled orders in the format_order format, for load tests and benchmarks"""
+import math
+import random
+from datetime import datetime, timedelta
+
+SYMBOLS = ['TSLA', 'AAPL', 'SPY', 'QQQ', 'NVDA', 'AMD', 'META', 'AMZN', 'MSFT', 'IWM']
+# filled quantity -> weight, mostly small option scalps
+FILL_SIZES = {1: .35, 2: .25, 3: .15, 5: .12, 10: .1, 25: .03}
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+class OrderGenerator():
+    """Stream of round trip trades as filled orders, one open trade per symbol
+
+    Each trade has a BTO, up to max_avgs scale-in BTOs and is closed by up to
+    max_stcs STCs. Calls to orders continue the stream, with new order ids
+    and later times.
+
+    Parameters
+    ----------
+    symbols : list
+        underlying symbols
+    option_ratio : float
+        share of the trades on options, the rest on stocks
+    fill_sizes : dict
+        filled quantity -> weight of the fill size distribution
+    max_avgs, max_stcs : int
+        max scale-in BTOs and STCs of a trade
+    late_ratio : float
+        share of the orders arriving after later filled orders, see arrivals
+    max_delay : float
+        max seconds a late order arrives after its fill
+    broker : str
+        broker of the orders
+    start : datetime
+        time of the stream start, default today at the open
+    seed : int
+        same seed, same orders
+    """
+    def __init__(self, symbols:list=SYMBOLS, option_ratio:float=.8, fill_sizes:dict=FILL_SIZES,
+                 max_avgs:int=2, max_stcs:int=4, late_ratio:float=0, max_delay:float=30,
+                 broker:str='etrade', start:datetime=None, seed:int=0):
+        self.symbols = symbols
+        self.option_ratio = option_ratio
+        self.sizes, self.weights = list(fill_sizes), list(fill_sizes.values())
+        self.max_avgs = max_avgs
+        self.max_stcs = max_stcs
+        self.late_ratio = late_ratio
+        self.max_delay = max_delay
+        self.broker = broker
+        self.start = start or datetime.now().replace(hour=9, minute=30, second=0, microsecond=0)
+        self.rng = random.Random(seed)
+        self.t = 0.
+        self.t_last = 0.
+        self.order_id = 0
+        self.free_at = {}
+
+    def _contract(self)->tuple:
+        "symbol and asset of a random contract"
+        symbol = self.rng.choice(self.symbols)
+        if self.rng.random() >= self.option_ratio:
+            return symbol, 'stock'
+        expiry = self.start + timedelta(days=self.rng.randint(0, 30))
+        strike = self.rng.randrange(100, 500, 5)
+        return f"{symbol}_{expiry:%m%d%y}{self.rng.choice('CP')}{strike}", 'option'
+
+    def _order(self, symbol:str, asset:str, buy:bool, qty:int, price:float, t:float)->dict:
+        self.order_id += 1
+        close_time = self.start + timedelta(seconds=t)
+        if asset == 'option':
+            action = 'BUY_OPEN' if buy else 'SELL_CLOSE'
+        else:
+            action = 'BUY' if buy else 'SELL'
+        return {
+            'symbol': symbol,
+            'asset': asset,
+            'action': action,
+            'status': 'FILLED',
+            'quantity': qty,
+            'filledQuantity': float(qty),
+            'price': price,
+            'order_id': self.order_id,
+            'stopPrice': None,
+            'orderType': 'LIMIT',
+            'enteredTime': (close_time - timedelta(seconds=self.rng.uniform(.1, 2))).strftime(TIME_FORMAT),
+            'closeTime': close_time.strftime(TIME_FORMAT),
+            'broker': self.broker,
+            }
+
+    def trade(self, t:float, close:bool=True)->list:
+        "Orders of one trade starting after t seconds, closed or left open"
+        for _ in range(100):
+            symbol, asset = self._contract()
+            if self.free_at.get(symbol, 0) < math.inf:
+                break
+        else:
+            raise ValueError("All the contracts have an open trade, add symbols or options")
+        t = max(t, self.free_at.get(symbol, 0))
+        price = round(self.rng.uniform(.5, 10) if asset == 'option' else self.rng.uniform(20, 500), 2)
+        orders, bought = [], 0
+        for _ in range(1 + self.rng.randint(0, self.max_avgs)):
+            qty = self.rng.choices(self.sizes, self.weights)[0]
+            t += self.rng.uniform(.5, 60)
+            orders.append(self._order(symbol, asset, True, qty, price, t))
+            bought += qty
+            price = round(price * self.rng.uniform(.9, 1.1), 2)
+        n_stcs = min(bought, self.rng.randint(1, self.max_stcs))
+        sizes = sorted(self.rng.sample(range(1, bought), n_stcs - 1)) + [bought]
+        if not close:
+            # some of the STCs, the trade stays open
+            sizes = sizes[:self.rng.randint(0, n_stcs - 1)]
+        for sold_before, sold in zip([0] + sizes, sizes):
+            t += self.rng.uniform(.5, 120)
+            price = round(price * self.rng.uniform(.7, 1.5), 2)
+            orders.append(self._order(symbol, asset, False, sold - sold_before, price, t))
+        # open trades keep the symbol, a new trade would average into them
+        self.free_at[symbol] = t + 1 if close else math.inf
+        self.t_last = max(self.t_last, t)
+        return orders
+
+    def orders(self, n_trades:int, duration:float=6.5*3600, close_ratio:float=1)->list:
+        """Orders of n_trades starting within the next duration seconds, by closeTime
+
+        Trades of a busy symbol can start later. close_ratio is the share of
+        the trades that are closed. The next call starts after the last order.
+        """
+        orders = []
+        for _ in range(n_trades):
+            t = self.t + self.rng.uniform(0, duration)
+            orders.extend(self.trade(t, close=self.rng.random() < close_ratio))
+        self.t = max(self.t + duration, self.t_last)
+        return sorted(orders, key=lambda o: o['closeTime'])
+
+    def arrivals(self, orders:list, poll_interval:float=1)->list:
+        """Orders as returned by polls every poll_interval seconds, most recent first
+
+        late_ratio of the orders arrive up to max_delay seconds after their
+        fill, after orders filled later. Only polls with orders are returned.
+        """
+        polls = {}
+        for order in orders:
+            t = (datetime.strptime(order['closeTime'], TIME_FORMAT) - self.start).total_seconds()
+            if self.rng.random() < self.late_ratio:
+                t += self.rng.uniform(poll_interval, self.max_delay)
+            polls.setdefault(math.ceil(t / poll_interval), []).append(order)
+        return [sorted(polls[n], key=lambda o: o['closeTime'], reverse=True) for n in sorted(polls)]
@@ -38,6 +38,7 @@ setup(
         'Intended Audience :: Information Technology',
         'Operating System :: Microsoft :: Windows',
     ],
-    entry_points = {'console_scripts': ['tradealerter = tradealerter.gui:gui'],
+    entry_points = {'console_scripts': ['tradealerter = tradealerter.gui:gui',
+                                        'tradealerter-daemon = tradealerter.daemon:main'],
           }
 )
\ No newline at end of file
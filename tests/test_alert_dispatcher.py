@@ -0,0 +1,86 @@
+import unittest
+import time
+from tradealerter.alert_dispatcher import AlertDispatcher, RateLimited, TokenBucket
+
+
+class Destination():
+    "Records sends, fails the first n_fail ones and can be slow"
+    def __init__(self, n_fail=0, delay=0, rate_limit=None):
+        self.n_fail = n_fail
+        self.delay = delay
+        self.rate_limit = rate_limit
+        self.sent = []
+        self.times = []
+
+    def __call__(self, content):
+        time.sleep(self.delay)
+        if self.rate_limit is not None:
+            retry_after, self.rate_limit = self.rate_limit, None
+            raise RateLimited(retry_after)
+        if self.n_fail:
+            self.n_fail -= 1
+            raise ConnectionError("down")
+        self.sent.append(content)
+        self.times.append(time.monotonic())
+        return 204
+
+
+class TestAlertDispatcher(unittest.TestCase):
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=2, capacity=2)
+        now = bucket.t
+        self.assertEqual(bucket.take(now), 0)
+        self.assertEqual(bucket.take(now), 0)
+        self.assertAlmostEqual(bucket.take(now), .5)
+        self.assertEqual(bucket.take(now + .5), 0)
+        bucket.pause(3, now + .5)
+        self.assertAlmostEqual(bucket.take(now + .5), 3)
+
+    def test_lanes_do_not_block(self):
+        slow, fast = Destination(delay=.3), Destination()
+        dispatcher = AlertDispatcher({'slow': slow, 'fast': fast})
+        statuses = []
+        t0 = time.monotonic()
+        for i in range(3):
+            self.assertTrue(dispatcher.submit(f"BTO {i}", info=i,
+                                              on_status=lambda d: statuses.append(d.status)))
+        # fast lane is done before the first slow send
+        time.sleep(.15)
+        self.assertEqual(fast.sent, ["BTO 0", "BTO 1", "BTO 2"])
+        self.assertTrue(dispatcher.join(timeout=5))
+        self.assertEqual(slow.sent, ["BTO 0", "BTO 1", "BTO 2"])
+        self.assertEqual(statuses, ['sent'] * 6)
+        self.assertLess(fast.times[-1] - t0, .15)
+        dispatcher.close()
+
+    def test_retries(self):
+        flaky, broken = Destination(n_fail=2), Destination(n_fail=10)
+        dispatcher = AlertDispatcher({'flaky': flaky, 'broken': broken},
+                                     max_retries=2, backoff=.01)
+        deliveries = []
+        dispatcher.submit("STC 1", on_status=deliveries.append)
+        dispatcher.submit("STC 2", on_status=deliveries.append)
+        self.assertTrue(dispatcher.join(timeout=5))
+        self.assertEqual(flaky.sent, ["STC 1", "STC 2"])
+        final = {(d.destination, d.content): d.status for d in deliveries
+                 if d.status != 'retry'}
+        self.assertEqual(final, {('flaky', "STC 1"): 'sent', ('flaky', "STC 2"): 'sent',
+                                 ('broken', "STC 1"): 'failed', ('broken', "STC 2"): 'failed'})
+        dispatcher.close()
+
+    def test_rate_limit_and_full(self):
+        limited = Destination(rate_limit=.3)
+        dispatcher = AlertDispatcher({'limited': limited}, maxsize=2)
+        t0 = time.monotonic()
+        self.assertTrue(dispatcher.submit("BTO 1"))
+        self.assertTrue(dispatcher.submit("BTO 2"))
+        self.assertFalse(dispatcher.submit("BTO 3"))
+        self.assertTrue(dispatcher.join(timeout=5))
+        self.assertEqual(limited.sent, ["BTO 1", "BTO 2"])
+        self.assertGreaterEqual(limited.times[0] - t0, .3)
+        dispatcher.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+from unittest.mock import MagicMock
+from tradealerter.alert_dispatcher import AlertDispatcher, Delivery
+from tradealerter.alert_policy import delivery_status, send_order
+
+
+class InstantDispatcher():
+    "Dispatcher delivering in submit, before it returns"
+    lanes = {'discord': None}
+
+    def __init__(self, accept:bool=True):
+        self.accept = accept
+
+    def submit(self, content, info=None, on_status=None):
+        if not self.accept:
+            return False
+        delivery = Delivery(content, 'discord', info, on_status)
+        delivery.status = 'sent'
+        on_status(delivery)
+        return True
+
+
+class TestSendOrder(unittest.TestCase):
+
+    def setUp(self):
+        self.ord_checker = MagicMock()
+        self.on_status = delivery_status(self.ord_checker, lambda order: None)
+        self.order = {'alert': "BTO 2 TSLA 195P 06/02 @3.1", 'port_ix': 0, 'status': 'Send'}
+
+    def test_fast_delivery(self):
+        # sent before submit returns, Sending does not overwrite Sent
+        send_order(self.order, InstantDispatcher(), self.on_status)
+        self.assertEqual(self.order['status'], 'Sent')
+        self.ord_checker.mark_sent.assert_called_once_with(0, 'BTO')
+
+    def test_merged_alerts(self):
+        # alerts of the trade merged by the alert queue, each one is counted
+        self.order['alert'] = "BTO 2 TSLA 195P 06/02 @3.1\nBTO 1 TSLA 195P 06/02 @2.36 @here"
+        send_order(self.order, InstantDispatcher(), self.on_status)
+        self.assertEqual(self.ord_checker.mark_sent.call_count, 2)
+        self.ord_checker.save_portfolio.assert_called_once_with(0)
+
+    def test_rejected(self):
+        send_order(self.order, InstantDispatcher(accept=False), self.on_status)
+        self.assertEqual(self.order['status'], 'Send')
+        self.ord_checker.mark_sent.assert_not_called()
+
+    def test_no_destination(self):
+        dispatcher = AlertDispatcher({})
+        send_order(self.order, dispatcher, self.on_status)
+        dispatcher.close()
+        self.assertEqual(self.order['status'], 'Send')
+
+
+class TestDeliveryStatus(unittest.TestCase):
+
+    def setUp(self):
+        self.ord_checker = MagicMock()
+        self.on_status = delivery_status(self.ord_checker, lambda order: None)
+        self.order = {'alert': "BTO 2 TSLA 195P 06/02 @3.1", 'port_ix': 0, 'status': 'Send'}
+
+    def send(self, destinations:dict)->dict:
+        dispatcher = AlertDispatcher(destinations, max_retries=0)
+        send_order(self.order, dispatcher, self.on_status)
+        dispatcher.close(timeout=5)
+        # on_status runs after the delivery is done, wait for the workers
+        for worker in dispatcher.workers:
+            worker.join(timeout=5)
+        return self.order
+
+    def test_webhook_failed(self):
+        # the local file got it first, the alert did not reach discord
+        order = self.send({'jsonl': lambda content: None, 'discord': failing})
+        self.assertEqual(order['status'], 'Failed')
+        self.assertEqual(order['deliveries'], {'jsonl': 'sent', 'discord': 'failed'})
+        self.assertEqual(order['failed'], ['discord'])
+        self.ord_checker.mark_sent.assert_not_called()
+
+    def test_sink_failed(self):
+        order = self.send({'jsonl': failing, 'discord': lambda content: None})
+        self.assertEqual(order['status'], 'Sent')
+        self.assertEqual(order['failed'], ['jsonl'])
+        self.ord_checker.mark_sent.assert_called_once_with(0, 'BTO')
+
+    def test_no_required(self):
+        # without discord, every destination is required
+        order = self.send({'jsonl': lambda content: None, 'socket': failing})
+        self.assertEqual(order['status'], 'Failed')
+        self.ord_checker.mark_sent.assert_not_called()
+        order = self.send({'jsonl': lambda content: None, 'socket': lambda content: None})
+        self.assertEqual(order['status'], 'Sent')
+        self.assertEqual(order['failed'], [])
+        self.ord_checker.mark_sent.assert_called_once_with(0, 'BTO')
+
+
+def failing(content):
+    raise ConnectionError("webhook down")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import os
+import os.path as op
+import tempfile
+import threading
+import time
+from tradealerter.alert_queue import AlertQueue
+from tradealerter.metrics import metrics
+
+
+def item(n:int, trade_ix=0, action="BTO"):
+    return [f"{action} {n} TSLA", f"2023-05-30 14:01:{n:02d}.000000", trade_ix, {'enqueued': n}]
+
+
+class TestAlertQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.spill_fname = op.join(self.tmp_dir.name, "alert_queue.jsonl")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_block(self):
+        alerts = AlertQueue(maxsize=2, policy='block', timeout=.1)
+        self.assertTrue(alerts.put(item(1)))
+        self.assertTrue(alerts.put(item(2)))
+        dropped = metrics.value("tradealerter_alert_queue_dropped_total") or 0
+        t0 = time.monotonic()
+        self.assertFalse(alerts.put(item(3)))
+        self.assertLess(time.monotonic() - t0, .5)
+        self.assertEqual(metrics.value("tradealerter_alert_queue_dropped_total"), dropped + 1)
+
+        # room made while waiting, the alert is queued
+        threading.Timer(.05, alerts.get).start()
+        alerts.timeout = 2
+        self.assertTrue(alerts.put(item(4)))
+        self.assertEqual([alerts.get(timeout=1)[0] for _ in range(2)], ["BTO 2 TSLA", "BTO 4 TSLA"])
+        self.assertEqual(metrics.value("tradealerter_alert_queue_depth"), 0)
+
+    def test_coalesce(self):
+        alerts = AlertQueue(maxsize=2, policy='coalesce', timeout=.05)
+        alerts.put(item(1, trade_ix=0))
+        alerts.put(item(2, trade_ix=1))
+        self.assertTrue(alerts.put(item(3, trade_ix=0)))
+        # other action of the trade, not merged and dropped
+        self.assertFalse(alerts.put(item(4, trade_ix=0, action="STC")))
+        self.assertEqual(alerts.qsize(), 2)
+        alert, close_time, trade_ix, stamps = alerts.get()
+        self.assertEqual(alert, "BTO 1 TSLA\nBTO 3 TSLA")
+        self.assertEqual(close_time, item(3)[1])
+        self.assertEqual(stamps, {'enqueued': 1})
+
+    def test_spill(self):
+        alerts = AlertQueue(maxsize=2, policy='spill', spill_fname=self.spill_fname)
+        t0 = time.monotonic()
+        for n in range(10):
+            self.assertTrue(alerts.put(item(n)))
+        self.assertLess(time.monotonic() - t0, .5)
+        self.assertEqual(alerts.qsize(), 10)
+        self.assertEqual(alerts.n_spilled, 8)
+        # in order, through the file
+        self.assertEqual([alerts.get_nowait()[0] for _ in range(5)], [item(n)[0] for n in range(5)])
+        alerts.put(item(10))
+        self.assertEqual([alerts.get_nowait() for _ in range(6)], [item(n) for n in range(5, 11)])
+        self.assertTrue(alerts.empty())
+        self.assertFalse(os.path.exists(self.spill_fname))
+        self.assertGreater(metrics.summary("tradealerter_alert_queue_wait_seconds")['count'], 0)
+
+    def test_policy(self):
+        with self.assertRaises(ValueError):
+            AlertQueue(policy='drop')
+        with self.assertRaises(ValueError):
+            AlertQueue(policy='spill')
+
+
+if __name__ == '__main__':
+    unittest.main()
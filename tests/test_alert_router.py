@@ -0,0 +1,85 @@
+import unittest
+import configparser
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from tradealerter.alert_router import (SocketSink, JsonlSink, sinks_from_config,
+                                       make_dispatcher)
+
+
+class SlowSink():
+    name = 'slow'
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, content):
+        time.sleep(.5)
+        self.sent.append(content)
+
+
+class TestAlertRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(1)
+        self.lines = []
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        try:
+            conn, _ = self.server.accept()
+        except OSError:
+            return
+        with conn, conn.makefile() as f:
+            for line in f:
+                self.lines.append(json.loads(line))
+
+    def tearDown(self):
+        self.server.close()
+        self.tmpdir.cleanup()
+
+    def test_sinks_from_config(self):
+        config = configparser.ConfigParser()
+        config.read_dict({'discord': {'webhook': '', 'webhook_name': ''},
+                          'alert_sinks': {'webhooks': '', 'socket': '127.0.0.1:9',
+                                          'jsonl_file': 'alerts.jsonl', 'timeout': '2'},
+                          'paths': {'data': self.tmpdir.name}})
+        sinks = sinks_from_config(config)
+        self.assertEqual([s.name for s in sinks], ['socket', 'jsonl'])
+        self.assertEqual(sinks[0].timeout, 2)
+        self.assertEqual(sinks[1].fname, os.path.join(self.tmpdir.name, 'alerts.jsonl'))
+
+    def test_deliver_to_all(self):
+        fname = os.path.join(self.tmpdir.name, 'alerts.jsonl')
+        port = self.server.getsockname()[1]
+        slow = SlowSink()
+        dispatcher = make_dispatcher([SocketSink('socket', f"127.0.0.1:{port}"),
+                                      JsonlSink('jsonl', fname), slow])
+        done = {}
+        t0 = time.monotonic()
+        dispatcher.submit("BTO 2 TSLA 195P 06/02 @3.1",
+                          on_status=lambda d: done.setdefault(d.destination, time.monotonic() - t0))
+        self.assertTrue(dispatcher.join(timeout=5))
+        dispatcher.close()
+        # the slow sink does not delay the others
+        self.assertLess(done['socket'], .3)
+        self.assertLess(done['jsonl'], .3)
+        self.assertGreaterEqual(done['slow'], .5)
+        with open(fname) as f:
+            self.assertEqual(json.loads(f.readline())['alert'], "BTO 2 TSLA 195P 06/02 @3.1")
+        for _ in range(50):
+            if self.lines:
+                break
+            time.sleep(.01)
+        self.assertEqual(self.lines[0]['alert'], "BTO 2 TSLA 195P 06/02 @3.1")
+        self.assertEqual(slow.sent, ["BTO 2 TSLA 195P 06/02 @3.1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import asyncio
+import threading
+import queue
+import time
+import os.path as op
+import tempfile
+from tradealerter import check_orders
+from tradealerter.async_poller import AsyncPoller
+from tradealerter.coalescer import Coalescer
+
+
+def make_order(broker, order_id, close_time):
+    return {'symbol': 'AAPL', 'asset': 'stock', 'action': 'BUY', 'status': 'FILLED',
+            'quantity': 1, 'filledQuantity': 1.0, 'price': 180.0, 'order_id': order_id,
+            'closeTime': close_time, 'broker': broker,
+            'orders': [{'updateTime0': '1685541935125'}]}
+
+
+class FakeBroker():
+    "Returns no orders on the first call, then one fill taking delay seconds"
+    def __init__(self, name, delay):
+        self.name = name
+        self.delay = delay
+        self.n_calls = 0
+
+    def get_orders(self, status='ALL', since=None, skip_ids=()):
+        self.n_calls += 1
+        if self.n_calls == 1:
+            return []
+        time.sleep(self.delay)
+        return [make_order(self.name, 1, "2023-05-31 09:45:35.125000")]
+
+
+class TestAsyncPoller(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.queue = queue.Queue(maxsize=10)
+        self.checker = check_orders.orders_check(
+            queue=self.queue,
+            order_fname=op.join(self.tmp_dir.name, "orders.json"),
+            port_fname=op.join(self.tmp_dir.name, "portfolio.csv"),
+            bksession=[lambda: FakeBroker('fast', 0), lambda: FakeBroker('slow', 1)])
+        self.checker._metrics_fname = lambda: op.join(self.tmp_dir.name, "metrics.prom")
+
+    def test_slow_broker_does_not_delay(self):
+        poller = AsyncPoller(self.checker, refresh_rate=.05)
+        thread = threading.Thread(target=asyncio.run, args=(poller.run(),), daemon=True)
+        t0 = time.monotonic()
+        thread.start()
+        alert, close_time, trade_ix, stamps = self.queue.get(timeout=.8)
+        self.assertLess(time.monotonic() - t0, .8)
+        self.assertTrue(alert.startswith("BTO 1 AAPL"))
+        self.assertLessEqual(stamps['detected'], stamps['tracked'])
+        self.assertLessEqual(stamps['tracked'], stamps['enqueued'])
+        # the slow brokerage fill arrives later, each fill alerted once
+        self.queue.get(timeout=3)
+        poller.stop()
+        thread.join(timeout=3)
+        self.assertTrue(self.queue.empty())
+        self.assertEqual(self.checker.seen_ids, {('fast', 1), ('slow', 1)})
+        self.assertEqual(len(self.checker.trades), 2)
+
+    def test_coalesced(self):
+        # fills of different brokers are not merged, each is processed once due
+        self.checker.coalescer = Coalescer(window=.1, max_delay=1)
+        poller = AsyncPoller(self.checker, refresh_rate=.05)
+        thread = threading.Thread(target=asyncio.run, args=(poller.run(),), daemon=True)
+        thread.start()
+        alert, close_time, trade_ix, stamps = self.queue.get(timeout=1)
+        self.assertIn('coalesced', stamps)
+        self.queue.get(timeout=3)
+        poller.stop()
+        thread.join(timeout=3)
+        self.assertEqual(len(self.checker.trades), 2)
+
+    def test_process_error(self):
+        # an error processing a batch does not stop the next ones
+        process_orders = self.checker._process_orders
+        calls = []
+        def fail_once(new_orders, *args):
+            calls.append(new_orders)
+            if len(calls) == 1:
+                raise ValueError("malformed order")
+            return process_orders(new_orders, *args)
+        self.checker._process_orders = fail_once
+        poller = AsyncPoller(self.checker, refresh_rate=.05)
+        thread = threading.Thread(target=asyncio.run, args=(poller.run(),), daemon=True)
+        thread.start()
+        alert, close_time, trade_ix, stamps = self.queue.get(timeout=3)
+        poller.stop()
+        thread.join(timeout=3)
+        self.assertGreaterEqual(len(calls), 2)
+        self.assertEqual([o['broker'] for o in calls[0]], ['fast'])
+        self.assertTrue(alert.startswith("BTO 1 AAPL"))
+
+    def tearDown(self):
+        self.checker.store.close()
+        self.checker.journal.close()
+        self.tmp_dir.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,8 +16,8 @@ class TestCheckOrders(unittest.TestCase):
         self.queue = queue.Queue(maxsize=10)
         self.order_fname = op.join(root_dir, "data", "orders.json")
         self.port_fname = op.join(root_dir, "data", "portfolio.csv")
-        if os.path.exists(self.port_fname):
-            os.remove(self.port_fname)
+        self.store_fname = op.join(root_dir, "data", "portfolio.db")
+        self.tearDown()
         self.bksession = MagicMock(spec=eTrade)
         self.check_orders = check_orders.orders_check(queue=self.queue,
                                                       order_fname=self.order_fname,
@@ -30,12 +30,69 @@ class TestCheckOrders(unittest.TestCase):
         
         order_buy = orders[0]
         alert = self.check_orders.make_alert(order_buy)
-        self.assertEqual('BTO 2 TSLA 195P 06/02 @3.1', alert)
+        self.assertEqual('BTO 2 TSLA 195P 06/02 @3.1 - filled at 05/30 14:01:11', alert)
         
         order_sell = orders[3]
         alert = self.check_orders.make_alert(order_sell)
-        self.assertEqual('STC 3 TSLA 195P 06/02 @3.73', alert)
+        self.assertEqual('STC 3 TSLA 195P 06/02 @3.73 - filled at 05/31 09:45:35', alert)
     
+    def test_new_orders(self):
+        orders = self.check_orders.orders
+        self.assertEqual(self.check_orders.seen_ids, {('etrade', o['order_id']) for o in orders})
+        self.assertEqual(self.check_orders.last_close, {'etrade': max(o['closeTime'] for o in orders)})
+
+        # broker returns most recent first, only unseen orders are kept
+        new_order = dict(orders[-1], order_id=-1, closeTime="2100-01-01 00:00:00.000000")
+        broker_orders = [new_order] + orders[-1::-1]
+        self.assertEqual(self.check_orders._new_orders(broker_orders), [new_order])
+        self.assertEqual(self.check_orders._new_orders(orders[-1::-1]), [])
+
+    def test_late_order(self):
+        # an older fill reported after a newer one is still new
+        last = self.check_orders.orders[-1]
+        newer = dict(last, order_id=-1, closeTime="2100-01-01 00:01:00.000000")
+        late = dict(last, order_id=-2, closeTime="2100-01-01 00:00:00.000000")
+        self.assertEqual(self.check_orders._new_orders([newer]), [newer])
+        self.check_orders._mark_seen(newer)
+        self.assertEqual(self.check_orders._new_orders([newer, late]), [late])
+        self.check_orders._mark_seen(late)
+        self.assertEqual(self.check_orders._new_orders([newer, late]), [])
+        # older than the lookback, it is not looked for
+        too_late = dict(last, order_id=-3, closeTime="2099-12-31 23:00:00.000000")
+        self.assertEqual(self.check_orders._new_orders([newer, late, too_late]), [])
+
+    def test_since(self):
+        orders = self.check_orders.orders
+        bksession = self.check_orders.bksession
+        bksession.broker = 'etrade'
+        bksession.get_orders.return_value = orders[-1::-1]
+        self.check_orders._read_orders(False, False)
+        # late fills within the lookback are asked for again
+        since = datetime.strptime(max(o['closeTime'] for o in orders), "%Y-%m-%d %H:%M:%S.%f") \
+            - timedelta(seconds=self.check_orders.lookback)
+        bksession.get_orders.assert_called_with('FILLED', since=since,
+                                                skip_ids={o['order_id'] for o in orders})
+        self.assertEqual(len(self.check_orders.orders), len(orders))
+
+    def test_open_trades_index(self):
+        orders = self.check_orders.orders
+        for order in orders[:3]:
+            self.check_orders.track_portfolio(order)
+        self.assertEqual(self.check_orders.get_trade_ix(orders[0]), (True, 0))
+
+        # index is rebuilt from the saved portfolio
+        reloaded = check_orders.orders_check(queue=self.queue,
+                                             order_fname=self.order_fname,
+                                             port_fname=self.port_fname,
+                                             bksession=self.bksession)
+        self.assertEqual(reloaded.open_trades, {('etrade', orders[0]['symbol']): 0})
+
+        # selling all contracts closes the trade
+        for order in orders[3:5]:
+            self.check_orders.track_portfolio(order)
+        self.assertEqual(self.check_orders.port.loc[0, 'isopen'], 0)
+        self.assertEqual(self.check_orders.get_trade_ix(orders[0]), (False, None))
+
     def test_track_portfolio(self):
         # Test BTO
         order_buy = self.check_orders.orders[0]   
@@ -173,8 +230,10 @@ class TestCheckOrders(unittest.TestCase):
                 
 
     def tearDown(self):
-        if os.path.exists(self.port_fname):
-            os.remove(self.port_fname)
+        for fname in [self.port_fname, self.store_fname,
+                      self.store_fname + "-wal", self.store_fname + "-shm"]:
+            if os.path.exists(fname):
+                os.remove(fname)
 
 if __name__ == '__main__':
     unittest.main()
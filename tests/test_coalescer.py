@@ -0,0 +1,133 @@
+import unittest
+from unittest.mock import MagicMock
+import json
+import os.path as op
+import queue
+import tempfile
+from tradealerter.check_orders import orders_check
+from tradealerter.coalescer import Coalescer, merge_fills
+from tradealerter.brokerages.eTrade_api import eTrade
+from tradealerter.metrics import metrics
+
+root_dir = op.abspath(op.dirname(__file__))
+
+
+class TestCoalescer(unittest.TestCase):
+
+    def setUp(self):
+        with open(op.join(root_dir, "data", "orders.json")) as f:
+            self.orders = json.load(f)
+        # three BTO fills of TSLA_060223P195, then an STC
+        self.btos, self.stc = self.orders[:3], self.orders[3]
+
+    def test_merge_fills(self):
+        merged = merge_fills(self.btos)
+        self.assertEqual(merged['quantity'], 5)
+        self.assertEqual(merged['filledQuantity'], 5)
+        self.assertAlmostEqual(merged['price'], (2*3.1 + 2.36 + 2*3.5) / 5)
+        self.assertEqual(merged['closeTime'], self.btos[-1]['closeTime'])
+        self.assertEqual(merged['order_id'], self.btos[0]['order_id'])
+        self.assertEqual(merged['order_ids'], [o['order_id'] for o in self.btos])
+        self.assertIs(merge_fills(self.btos[:1]), self.btos[0])
+
+    def test_window(self):
+        coalescer = Coalescer(window=1, max_delay=2.5)
+        coalescer.add(self.btos[0], {'detected': 0}, now=0)
+        coalescer.add(self.btos[1], {'detected': 1}, now=.8)
+        self.assertEqual(coalescer.next_due(), 1.8)
+        self.assertEqual(coalescer.pop_due(now=1.5), [])
+        # a new fill delays it, up to max_delay after the first fill
+        coalescer.add(self.btos[2], {'detected': 2}, now=1.6)
+        self.assertEqual(coalescer.next_due(), 2.5)
+        (order, stamps), = coalescer.pop_due(now=2.5)
+        self.assertEqual(order['quantity'], 5)
+        self.assertEqual(stamps['detected'], 0)
+        self.assertIn('coalesced', stamps)
+        self.assertEqual(len(coalescer), 0)
+        self.assertIsNone(coalescer.next_due())
+
+    def test_symbol_order(self):
+        coalescer = Coalescer(window=1, max_delay=10)
+        coalescer.add(self.btos[0], {}, now=0)
+        coalescer.add(self.btos[1], {}, now=.9)
+        coalescer.add(self.stc, {}, now=1)
+        # the STC is due first, the BTO of the symbol held before is tracked first
+        popped = coalescer.pop_due(now=2)
+        self.assertEqual([o['action'] for o, _ in popped], ['BUY_OPEN', 'SELL_CLOSE'])
+        self.assertEqual(popped[0][0]['quantity'], 3)
+
+    def test_opposite_fill_closes_group(self):
+        coalescer = Coalescer(window=1, max_delay=10)
+        times = ["2023-05-31 09:45:00.000", "2023-05-31 09:45:00.300", "2023-05-31 09:45:00.600"]
+        bto, stc, bto2 = [dict(o, closeTime=t, order_id=n)
+                          for n, (o, t) in enumerate(zip([self.btos[0], self.stc, self.btos[2]], times))]
+        coalescer.add(bto, {}, now=0)
+        coalescer.add(stc, {}, now=.3)
+        coalescer.add(bto2, {}, now=.6)
+        self.assertEqual(len(coalescer), 3)
+        popped = coalescer.pop_due(now=2)
+        self.assertEqual([o['action'] for o, _ in popped], ['BUY_OPEN', 'SELL_CLOSE', 'BUY_OPEN'])
+        self.assertEqual([o['order_id'] for o, _ in popped], [0, 1, 2])
+        self.assertNotIn('order_ids', popped[0][0])
+
+    def test_opposite_fill_before_group(self):
+        coalescer = Coalescer(window=1, max_delay=10)
+        coalescer.add(self.stc, {}, now=0)
+        coalescer.add(self.btos[0], {}, now=.2)
+        # the STC came before the BTO group, it stays open
+        coalescer.add(self.btos[1], {}, now=.4)
+        self.assertEqual(len(coalescer), 2)
+
+
+class TestCoalescedOrders(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        with open(op.join(root_dir, "data", "orders.json")) as f:
+            self.orders = json.load(f)
+        self.queue = queue.Queue()
+        self.checker = self.make_checker()
+        self.checker.coalescer = Coalescer(window=.05, max_delay=1)
+
+    def tearDown(self):
+        self.checker.store.close()
+        self.tmp_dir.cleanup()
+
+    def make_checker(self):
+        return orders_check(self.queue, order_fname=op.join(self.tmp_dir.name, "orders.json"),
+                            port_fname=op.join(self.tmp_dir.name, "portfolio.csv"),
+                            bksession=MagicMock(spec=eTrade))
+
+    def test_one_alert(self):
+        coalesced = metrics.value("tradealerter_coalesced_fills_total", broker="etrade") or 0
+        for order in self.orders[:3]:
+            self.checker._process_orders([order], False, True)
+        self.assertTrue(self.queue.empty())
+        self.assertEqual(len(self.checker.trades), 0)
+        self.assertEqual(self.checker._new_orders(self.orders[2::-1]), [])
+
+        self.checker._wait(.2, False, True)
+        alert, close_time, trade_ix, stamps = self.queue.get_nowait()
+        self.assertTrue(alert.startswith("BTO 5 TSLA 195P 06/02 @3.11"))
+        self.assertTrue(self.queue.empty())
+        self.assertEqual(close_time, self.orders[2]['closeTime'])
+        self.assertLessEqual(stamps['detected'], stamps['coalesced'])
+        self.assertEqual(self.checker.trades[trade_ix].fills, 5)
+        self.assertEqual(metrics.value("tradealerter_coalesced_fills_total", broker="etrade"),
+                         coalesced + 2)
+
+        # the fills are seen after a restart
+        self.checker.store.close()
+        checker = self.make_checker()
+        self.assertEqual(checker._new_orders(self.orders[2::-1]), [])
+        checker.store.close()
+
+    def test_flush(self):
+        self.checker._process_orders(self.orders[:2], False, True)
+        self.checker.flush_coalesced()
+        self.assertTrue(self.queue.get_nowait()[0].startswith("BTO 3 TSLA"))
+        self.assertEqual(len(self.checker.coalescer), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
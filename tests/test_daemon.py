@@ -0,0 +1,97 @@
+import unittest
+from unittest.mock import MagicMock
+import json
+import os
+import os.path as op
+import queue
+import time
+import urllib.request
+from tradealerter import check_orders
+from tradealerter.alert_dispatcher import AlertDispatcher
+from tradealerter.brokerages.eTrade_api import eTrade
+from tradealerter.coalescer import Coalescer
+from tradealerter.daemon import AlertDaemon
+from tradealerter.metrics import stamp
+
+root_dir = op.abspath(op.dirname(__file__))
+
+
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.port_fname = op.join(root_dir, "data", "portfolio.csv")
+        self.store_fname = op.join(root_dir, "data", "portfolio.db")
+        self.tearDown()
+        self.ord_checker = check_orders.orders_check(queue=queue.Queue(maxsize=10),
+                                                     order_fname=op.join(root_dir, "data", "orders.json"),
+                                                     port_fname=self.port_fname,
+                                                     bksession=MagicMock(spec=eTrade))
+        self.sent = []
+        self.dispatcher = AlertDispatcher({'test': self.sent.append})
+        self.alerter = AlertDaemon(self.ord_checker, self.dispatcher, port=0)
+        self.alerter.start(poll=False)
+        self.url = "http://%s:%d" % self.alerter.address
+
+    def tearDown(self):
+        if hasattr(self, 'alerter'):
+            self.alerter.stop()
+            del self.alerter
+        for fname in [self.port_fname, self.store_fname,
+                      self.store_fname + "-wal", self.store_fname + "-shm"]:
+            if os.path.exists(fname):
+                os.remove(fname)
+
+    def request(self, path, data=None):
+        req = urllib.request.Request(self.url + path, data=data, method='POST' if data else 'GET')
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            return resp.status, json.loads(resp.read())
+
+    def test_api(self):
+        order = self.ord_checker.orders[0]
+        _, trade_ix = self.ord_checker.track_portfolio(order)
+        self.alerter.handle_alert("BTO 2 TSLA 195P 06/02 @3.1", order['closeTime'], trade_ix)
+        self.assertTrue(self.dispatcher.join(timeout=5))
+
+        # send_all_BTOs in the example config, the alert is sent and counted
+        self.assertEqual(self.sent, ["BTO 2 TSLA 195P 06/02 @3.1 @here"])
+        status, alerts = self.request('/alerts')
+        self.assertEqual(status, 200)
+        self.assertEqual(alerts[0]['status'], 'Sent')
+        self.assertEqual(self.ord_checker.port.loc[trade_ix, 'BTOs-sent'], 1)
+
+        status, alert = self.request(f"/alerts/{alerts[0]['id']}/send", b'{"extra": "again"}')
+        self.assertEqual(status, 202)
+        self.assertTrue(self.dispatcher.join(timeout=5))
+        self.assertEqual(self.sent[-1], "BTO 2 TSLA 195P 06/02 @3.1 @here again")
+
+        status, trades = self.request('/portfolio?open=1')
+        self.assertEqual([t['symbol'] for t in trades], [order['symbol']])
+        self.assertEqual(trades[0]['ix'], trade_ix)
+
+    def test_stop_flushes(self):
+        # a fill held by the coalescer is tracked and journaled on stop
+        self.ord_checker.coalescer = Coalescer(window=60, max_delay=60)
+        self.ord_checker.journal = MagicMock()
+        order = self.ord_checker.orders[0]
+        self.ord_checker._process_orders([order], False, True)
+        self.assertEqual(len(self.ord_checker.trades), 0)
+        self.alerter.stop()
+        del self.alerter
+        self.assertEqual(len(self.ord_checker.coalescer), 0)
+        self.assertEqual(len(self.ord_checker.trades), 1)
+        self.ord_checker.journal.append.assert_called_once_with(order)
+
+    def test_metrics(self):
+        order = self.ord_checker.orders[0]
+        stamps = {'detected': time.monotonic_ns(), 'fill_age': 0}
+        self.alerter.handle_alert("STC 2 TSLA 195P 06/02 @3.1", order['closeTime'], None,
+                                  stamp(stamps, 'dequeued'))
+        self.assertTrue(self.dispatcher.join(timeout=5))
+        with urllib.request.urlopen(self.url + '/metrics', timeout=5) as resp:
+            text = resp.read().decode()
+        self.assertIn('tradealerter_dequeued_to_sent_seconds_count{sink="test"}', text)
+        self.assertIn('tradealerter_fill_to_sent_seconds{sink="test",quantile="0.5"}', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+import subprocess
+import sys
+
+HEAVY = ['pandas', 'numpy', 'PySimpleGUI', 'discord_webhook', 'webull', 'pyetrade', 'td']
+# seconds, for the import of the entry modules on a slow machine
+BUDGET = .5
+
+
+class TestImportTime(unittest.TestCase):
+
+    def importtime(self, module:str):
+        "Cumulative import seconds of module and the modules it imported"
+        code = (f"import sys, {module}\n"
+                f"from tradealerter.configurator import cfg\n"
+                f"print(cfg._config is None)\n"
+                f"print(' '.join(sorted(sys.modules)))")
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                              capture_output=True, text=True, check=True)
+        cumulative = 0
+        for line in proc.stderr.splitlines():
+            if line.startswith("import time:") and line.split("|")[2].strip() == module:
+                cumulative = int(line.split("|")[1]) / 1e6
+        config_lazy, modules = proc.stdout.splitlines()[-2:]
+        return cumulative, config_lazy == 'True', set(modules.split())
+
+    def test_entry_points(self):
+        for module in ['tradealerter.daemon', 'tradealerter.check_orders']:
+            seconds, config_lazy, modules = self.importtime(module)
+            self.assertLess(seconds, BUDGET, module)
+            self.assertTrue(config_lazy, f"{module} reads the config at import")
+            self.assertEqual(modules & set(HEAVY), set(), module)
+
+
+if __name__ == '__main__':
+    unittest.main()
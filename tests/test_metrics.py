@@ -0,0 +1,75 @@
+import unittest
+import os.path as op
+import tempfile
+import time
+from datetime import datetime, timedelta
+from tradealerter.metrics import Metrics, stamp, fill_age_ns
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_quantiles(self):
+        metrics = Metrics()
+        for i in range(1, 101):
+            metrics.observe("latency_seconds", i / 100, sink="test")
+        summary = metrics.summary("latency_seconds", sink="test")
+        self.assertEqual(summary['count'], 100)
+        self.assertAlmostEqual(summary['sum'], 50.5)
+        self.assertEqual(summary[.5], .5)
+        self.assertEqual(summary[.95], .95)
+        self.assertEqual(summary[.99], .99)
+
+    def test_window(self):
+        metrics = Metrics(window=10)
+        for i in range(100):
+            metrics.observe("latency_seconds", i)
+        summary = metrics.summary("latency_seconds")
+        # quantiles of the last observations, count of all
+        self.assertEqual(summary[.5], 94)
+        self.assertEqual(summary['count'], 100)
+
+    def test_observe_stages(self):
+        metrics = Metrics()
+        stamps = {'detected': 0, 'fill_age': 2_000_000_000, 'tracked': 1_000_000,
+                  'enqueued': 2_000_000, 'sent': 1_002_000_000}
+        metrics.observe_stages(stamps, sink="test")
+        self.assertEqual(metrics.summary("tradealerter_detected_to_tracked_seconds", sink="test")[.5], .001)
+        # missing dequeued stage is skipped
+        self.assertEqual(metrics.summary("tradealerter_enqueued_to_sent_seconds", sink="test")[.5], 1.)
+        self.assertEqual(metrics.summary("tradealerter_fill_to_sent_seconds", sink="test")[.5], 3.002)
+
+    def test_prometheus(self):
+        metrics = Metrics()
+        metrics.observe("poll_seconds", .2, broker="etrade")
+        text = metrics.prometheus()
+        self.assertIn("# TYPE poll_seconds summary\n", text)
+        self.assertIn('poll_seconds{broker="etrade",quantile="0.99"} 0.200000\n', text)
+        self.assertIn('poll_seconds_count{broker="etrade"} 1\n', text)
+        metrics.set("queue_depth", 3)
+        metrics.inc("dropped_total")
+        metrics.inc("dropped_total", 2)
+        self.assertEqual(metrics.value("dropped_total"), 3)
+        self.assertIn("# TYPE queue_depth gauge\nqueue_depth 3\n", metrics.prometheus())
+        self.assertIn("# TYPE dropped_total counter\ndropped_total 3\n", metrics.prometheus())
+        text = metrics.prometheus()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fname = op.join(tmp_dir, "metrics.prom")
+            metrics.write_if_due(fname, interval=60)
+            with open(fname) as f:
+                self.assertEqual(f.read(), text)
+            metrics.observe("poll_seconds", .3, broker="etrade")
+            # not due yet
+            metrics.write_if_due(fname, interval=60)
+            with open(fname) as f:
+                self.assertEqual(f.read(), text)
+
+    def test_stamps(self):
+        stamps = stamp({}, 'detected')
+        self.assertLessEqual(stamps['detected'], time.monotonic_ns())
+        close_time = (datetime.now() - timedelta(seconds=2)).strftime("%Y-%m-%d %H:%M:%S.%f")
+        self.assertAlmostEqual(fill_age_ns(close_time) / 1e9, 2, delta=.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import os
+import tempfile
+from datetime import date, timedelta
+from tradealerter.brokerages.option_id_cache import OptionIdCache
+
+
+class TestOptionIdCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fname = os.path.join(self.tmpdir.name, "option_ids.db")
+        self.expiry = (date.today() + timedelta(days=7)).isoformat()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_persists(self):
+        cache = OptionIdCache(self.fname)
+        cache.put_many([("TSLA_060223P195", 1041, self.expiry),
+                        ("TSLA_060223P200", 1042, self.expiry)])
+        self.assertEqual(cache.get("TSLA_060223P200"), "1042")
+        self.assertIsNone(cache.get("TSLA_060223P205"))
+        cache.close()
+
+        cache = OptionIdCache(self.fname)
+        self.assertEqual(len(cache), 2)
+        self.assertIn("TSLA_060223P195", cache)
+        cache.close()
+
+    def test_evict_expired(self):
+        cache = OptionIdCache(self.fname)
+        yesterday = (date.today() - timedelta(days=1)).isoformat()
+        cache.put_many([("SPY_053123C420", 1, yesterday), ("SPY_060223C420", 2, self.expiry)])
+        self.assertIsNone(cache.get("SPY_053123C420"))
+        self.assertEqual(cache.get("SPY_060223C420"), "2")
+        cache.evict(today=date.today() + timedelta(days=8))
+        self.assertEqual(len(cache), 0)
+        cache.close()
+
+    def test_lru(self):
+        cache = OptionIdCache(self.fname, max_size=2)
+        cache.put("A", 1, self.expiry)
+        cache.put("B", 2, self.expiry)
+        cache.get("A")
+        cache.put("C", 3, self.expiry)
+        self.assertEqual(len(cache), 2)
+        self.assertIn("A", cache)
+        self.assertNotIn("B", cache)
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import json
+import os.path as op
+import queue
+import tempfile
+from collections import defaultdict
+from tradealerter.brokerages.replay_api import Replay
+from tradealerter.check_orders import orders_check
+from benchmarks.order_generator import OrderGenerator
+from benchmarks import load_portfolio
+
+root_dir = op.abspath(op.dirname(__file__))
+
+
+class TestOrderGenerator(unittest.TestCase):
+
+    def test_orders(self):
+        generator = OrderGenerator(seed=1)
+        orders = generator.orders(200)
+        with open(op.join(root_dir, "data", "orders.json")) as f:
+            self.assertEqual(set(orders[0]), set(json.load(f)[0]))
+        self.assertEqual(orders, sorted(orders, key=lambda o: o['closeTime']))
+        self.assertEqual(len({o['order_id'] for o in orders}), len(orders))
+
+        # every trade is closed, never selling more than bought
+        position = defaultdict(int)
+        for order in orders:
+            position[order['symbol']] += order['quantity'] * (1 if order['action'].startswith('BUY') else -1)
+            self.assertGreaterEqual(position[order['symbol']], 0)
+        self.assertFalse(any(position.values()))
+
+        # same seed, same orders, the stream continues later
+        self.assertEqual(OrderGenerator(seed=1).orders(200), orders)
+        self.assertGreater(generator.orders(10)[0]['closeTime'], orders[-1]['closeTime'])
+
+    def test_arrivals(self):
+        generator = OrderGenerator(late_ratio=.2, seed=2)
+        orders = generator.orders(100)
+        polls = generator.arrivals(orders)
+        arrived = [o for poll in polls for o in poll[::-1]]
+        self.assertCountEqual(arrived, orders)
+        self.assertNotEqual(arrived, orders)
+        for poll in polls:
+            self.assertEqual(poll, sorted(poll, key=lambda o: o['closeTime'], reverse=True))
+
+    def test_tracked(self):
+        generator = OrderGenerator(seed=3)
+        orders = generator.orders(50, close_ratio=.8)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            checker = orders_check(queue.Queue(), order_fname=op.join(tmp_dir, "orders.json"),
+                                   port_fname=op.join(tmp_dir, "portfolio.csv"),
+                                   bksession=lambda: Replay(polls=[]))
+            checker._process_orders(orders, False, False)
+            self.assertEqual(len(checker.trades), 50)
+            self.assertGreater(len(checker.open_trades), 0)
+            self.assertLess(len(checker.open_trades), 50)
+            checker.store.close()
+
+    def test_load_smoke(self):
+        results = load_portfolio.main(['--sizes', '20', '--burst', '10', '--late', '.2'])
+        self.assertEqual(results[0]['trades'], 30)
+        self.assertGreater(results[0]['fills'], 0)
+        self.assertEqual(results[0]['dropped'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import os
+import json
+import tempfile
+from tradealerter.order_journal import OrderJournal
+
+
+class TestOrderJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.fname = os.path.join(self.tmp_dir.name, "orders.json")
+        self.orders = [{'order_id': i, 'closeTime': f"2023-05-30 14:0{i}:00.000000"} for i in range(3)]
+
+    def test_append_load(self):
+        journal = OrderJournal(self.fname, fsync='never')
+        for order in self.orders:
+            journal.append(order)
+        journal.close()
+        self.assertEqual(list(OrderJournal(self.fname).load()), self.orders)
+
+    def test_legacy_file(self):
+        with open(self.fname, 'w') as f:
+            json.dump(self.orders[:2], f)
+        journal = OrderJournal(self.fname)
+        self.assertEqual(list(journal.load()), self.orders[:2])
+        # first write converts legacy file to json lines
+        journal.append(self.orders[2])
+        journal.close()
+        with open(self.fname, 'r') as f:
+            self.assertEqual(len(f.readlines()), 3)
+        self.assertEqual(list(OrderJournal(self.fname).load()), self.orders)
+
+    def test_compact(self):
+        journal = OrderJournal(self.fname, compact_every=4)
+        for order in self.orders + self.orders[:1]:
+            journal.append(order)
+        journal.close()
+        with open(self.fname, 'a') as f:
+            f.write('{"order_id": 3, "clo')
+        self.assertEqual(list(journal.load()), self.orders)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()
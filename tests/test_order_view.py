@@ -0,0 +1,63 @@
+import unittest
+from unittest.mock import MagicMock
+from tradealerter.brokerages.eTrade_api import eTrade
+from tradealerter.brokerages.order_view import LazyOrder
+
+
+def raw_order(order_id, status='EXECUTED'):
+    "eTrade list_orders order"
+    return {
+        'orderId': order_id,
+        'orderType': 'OPTN',
+        'OrderDetail': [{
+            'placedTime': 1685540675125,
+            'executedTime': 1685540676125,
+            'status': status,
+            'priceType': 'LIMIT',
+            'Instrument': [{
+                'Product': {'symbol': 'TSLA', 'callPut': 'PUT', 'expiryYear': 2023,
+                            'expiryMonth': 6, 'expiryDay': 2, 'strikePrice': 195.0},
+                'orderAction': 'BUY_OPEN',
+                'orderedQuantity': 2,
+                'filledQuantity': 2,
+                'averageExecutionPrice': 3.1,
+                }]
+            }]
+        }
+
+
+class ETradeStub(eTrade):
+    "eTrade does not implement the whole BaseBroker yet"
+    get_quotes = send_order = cancel_order = get_order_info = None
+
+
+class TestOrderView(unittest.TestCase):
+
+    def test_lazy_fields(self):
+        calls = []
+        fields = {'a': lambda o: calls.append('a') or o['x'],
+                  'b': lambda o: calls.append('b') or o['x'] * 2}
+        order = LazyOrder({'x': 1}, fields, broker='etrade')
+        self.assertEqual(order['a'], 1)
+        self.assertEqual(order['a'], 1)
+        self.assertEqual(calls, ['a'])
+        self.assertEqual(dict(order), {'a': 1, 'b': 2, 'broker': 'etrade'})
+        self.assertIsNone(order.get('c'))
+
+    def test_etrade_get_orders(self):
+        et = ETradeStub()
+        et.accountIdKey = 'key'
+        et.order_session = MagicMock()
+        et.order_session.list_orders.return_value = {'OrdersResponse': {'Order': [
+            raw_order(3), raw_order(2, 'CANCELLED'), raw_order(1)]}}
+
+        orders = et.get_orders('FILLED', skip_ids={1})
+        self.assertEqual([o['order_id'] for o in orders], [3])
+        self.assertEqual(dict(orders[0]), et.format_order(raw_order(3)))
+        self.assertEqual(orders[0]['symbol'], 'TSLA_060223P195')
+        self.assertEqual(orders[0]['status'], 'FILLED')
+        self.assertEqual(orders[0]['broker'], 'etrade')
+
+
+if __name__ == '__main__':
+    unittest.main()
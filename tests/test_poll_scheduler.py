@@ -0,0 +1,47 @@
+import unittest
+from datetime import datetime
+from tradealerter import poll_scheduler
+from tradealerter.poll_scheduler import PollScheduler
+
+
+@unittest.skipIf(poll_scheduler.MARKET_TZ is None, "no tz database")
+class TestPollScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = PollScheduler(refresh_rate=1, extended_rate=5, closed_rate=60, max_backoff=30)
+        tz = poll_scheduler.MARKET_TZ
+        self.regular = datetime(2023, 5, 31, 10, 0, tzinfo=tz)
+        self.extended = datetime(2023, 5, 31, 17, 0, tzinfo=tz)
+        self.night = datetime(2023, 5, 31, 3, 0, tzinfo=tz)
+        self.weekend = datetime(2023, 6, 3, 10, 0, tzinfo=tz)
+
+    def test_sessions(self):
+        self.assertEqual(self.scheduler.session(self.regular), 'regular')
+        self.assertEqual(self.scheduler.session(self.extended), 'extended')
+        self.assertEqual(self.scheduler.session(self.night), 'closed')
+        self.assertEqual(self.scheduler.session(self.weekend), 'closed')
+
+    def test_delay(self):
+        # poll duration is subtracted from the interval
+        self.assertAlmostEqual(self.scheduler.next_delay(.4, now=self.regular), .6)
+        self.assertEqual(self.scheduler.next_delay(.4, now=self.night), 59.6)
+        self.assertEqual(self.scheduler.next_delay(0, now=self.extended), 5)
+        self.assertEqual(self.scheduler.next_delay(0, active=True, now=self.extended), 1)
+
+    def test_backoff(self):
+        delays = [self.scheduler.next_delay(0, error=True, now=self.regular) for _ in range(6)]
+        for n_error, delay in enumerate(delays, 1):
+            backoff = min(30, 2 ** n_error)
+            self.assertTrue(backoff / 2 <= delay <= backoff)
+        # success resets the backoff
+        self.scheduler.next_delay(0, now=self.regular)
+        self.assertTrue(self.scheduler.next_delay(0, error=True, now=self.regular) <= 2)
+
+    def test_backoff_closed(self):
+        # errors while the market is closed do not poll faster than closed_rate
+        for _ in range(6):
+            self.assertGreaterEqual(self.scheduler.next_delay(0, error=True, now=self.night), 60)
+        self.assertGreaterEqual(self.scheduler.next_delay(0, error=True, now=self.extended), 5)
+
+if __name__ == '__main__':
+    unittest.main()
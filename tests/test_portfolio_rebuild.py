@@ -0,0 +1,68 @@
+import unittest
+from unittest.mock import MagicMock
+import os
+import os.path as op
+import json
+import random
+import tempfile
+import pandas as pd
+from tradealerter import check_orders
+from tradealerter.portfolio_rebuild import rebuild_portfolio
+from tradealerter.brokerages.eTrade_api import eTrade
+
+root_dir  =  os.path.abspath(os.path.dirname(__file__))
+
+
+def random_orders(n_orders:int, seed:int=0)->list:
+    "Random fills of a few symbols, sells without an open trade included"
+    rng = random.Random(seed)
+    orders = []
+    for i in range(n_orders):
+        symbol = rng.choice(['AAPL', 'NIO', 'TSLA_060223P195', 'SPY_061623C430'])
+        qty = rng.randint(1, 5)
+        orders.append({'symbol': symbol, 'asset': 'option' if '_' in symbol else 'stock',
+                       'action': rng.choice(['BUY_OPEN', 'SELL_CLOSE']), 'status': 'FILLED',
+                       'quantity': qty, 'filledQuantity': float(qty),
+                       'price': round(rng.uniform(0.05, 9), 2), 'order_id': i,
+                       'closeTime': f"2023-05-30 10:{i//60:02d}:{i%60:02d}.000000",
+                       'broker': rng.choice(['etrade', 'weBull'])})
+    return orders
+
+
+class TestPortfolioRebuild(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.check_orders = check_orders.orders_check(
+            queue=None,
+            order_fname=op.join(self.tmp_dir.name, "orders.json"),
+            port_fname=op.join(self.tmp_dir.name, "portfolio.csv"),
+            bksession=MagicMock(spec=eTrade))
+
+    def assert_same_as_tracked(self, orders):
+        for order in orders:
+            self.check_orders.track_portfolio(order)
+        pd.testing.assert_frame_equal(self.check_orders.port, rebuild_portfolio(orders),
+                                      check_dtype=False, check_exact=True)
+
+    def test_saved_orders(self):
+        with open(op.join(root_dir, "data", "orders.json"), 'r') as f:
+            self.assert_same_as_tracked(json.load(f))
+
+    def test_random_orders(self):
+        self.assert_same_as_tracked(random_orders(500))
+
+    def test_rebuild_portfolio(self):
+        orders = random_orders(100, seed=1)
+        self.check_orders.rebuild_portfolio(orders)
+        self.assertEqual(len(self.check_orders.store), len(self.check_orders.trades))
+        for (broker, symbol), trade_ix in self.check_orders.open_trades.items():
+            trade = self.check_orders.trades[trade_ix]
+            self.assertEqual((trade.broker, trade.symbol, trade.isopen), (broker, symbol, 1))
+
+    def tearDown(self):
+        self.check_orders.store.close()
+        self.tmp_dir.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()
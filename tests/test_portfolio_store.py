@@ -0,0 +1,44 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from tradealerter.portfolio_store import PortfolioStore, PORT_COLUMNS
+
+
+class TestPortfolioStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.fname = os.path.join(self.tmp_dir.name, "portfolio.db")
+        self.trade = {'date': "2023-05-30 14:01:11.193000", 'symbol': "TSLA_060223P195",
+                      'isopen': 1, 'broker': 'etrade', 'qty': 2, 'fills': np.float64(2.0),
+                      'price': 3.1, 'ordID': 18, 'avged': np.nan, 'avg_qty': "2,1"}
+
+    def test_save_load(self):
+        store = PortfolioStore(self.fname)
+        store.save_trade(0, self.trade)
+        store.save_trade(1, self.trade)
+        store.save_trade(0, dict(self.trade, qty=3))
+        store.close()
+
+        port = PortfolioStore(self.fname).load()
+        self.assertEqual(list(port.columns), PORT_COLUMNS)
+        self.assertEqual(list(port.index), [0, 1])
+        self.assertEqual(list(port['qty']), [3, 2])
+        self.assertEqual(port.loc[0, 'avg_qty'], "2,1")
+        self.assertTrue(pd.isna(port.loc[0, 'avged']))
+
+    def test_save_all(self):
+        port = pd.DataFrame([self.trade, dict(self.trade, symbol="AAPL")], columns=PORT_COLUMNS)
+        store = PortfolioStore(self.fname)
+        store.save_all(port)
+        self.assertEqual(len(store), 2)
+        self.assertEqual(list(store.load()['symbol']), ["TSLA_060223P195", "AAPL"])
+        store.close()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()
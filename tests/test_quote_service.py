@@ -0,0 +1,63 @@
+import unittest
+import threading
+import time
+from tradealerter.quote_service import QuoteService
+
+
+class FakeBroker():
+    def __init__(self, delay=.1, bulk_quotes=False):
+        self.delay = delay
+        self.bulk_quotes = bulk_quotes
+        self.calls = []
+
+    def get_quotes(self, symbols):
+        self.calls.append(list(symbols))
+        time.sleep(self.delay)
+        return {s: {'symbol': s, 'askPrice': 1.1, 'bidPrice': 1} for s in symbols
+                if s != 'BAD'}
+
+
+class TestQuoteService(unittest.TestCase):
+
+    def test_concurrent_and_cached(self):
+        broker = FakeBroker()
+        quotes = QuoteService(broker, ttl=60)
+        t0 = time.monotonic()
+        resp = quotes.get_quotes(['AAPL', 'TSLA', 'SPY', 'AAPL'])
+        # one call per symbol, in parallel
+        self.assertLess(time.monotonic() - t0, .25)
+        self.assertEqual(sorted(resp), ['AAPL', 'SPY', 'TSLA'])
+        self.assertEqual(len(broker.calls), 3)
+
+        resp = quotes.get_quotes(['AAPL', 'TSLA'])
+        self.assertEqual(len(broker.calls), 3)
+        self.assertEqual(resp['TSLA']['symbol'], 'TSLA')
+        quotes.close()
+
+    def test_bulk_and_missing(self):
+        broker = FakeBroker(bulk_quotes=True)
+        quotes = QuoteService(broker, ttl=60)
+        resp = quotes.get_quotes(['AAPL', 'BAD', 'TSLA'])
+        self.assertEqual(broker.calls, [['AAPL', 'BAD', 'TSLA']])
+        self.assertEqual(sorted(resp), ['AAPL', 'TSLA'])
+        self.assertIsNone(quotes.get_quote('BAD'))
+        quotes.close()
+
+    def test_inflight_dedupe(self):
+        broker = FakeBroker(delay=.2)
+        quotes = QuoteService(broker, ttl=0)
+        resps = []
+        threads = [threading.Thread(target=lambda: resps.append(quotes.get_quote('AAPL')))
+                   for _ in range(5)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        self.assertEqual(len(broker.calls), 1)
+        self.assertEqual(len(resps), 5)
+        self.assertTrue(all(r['symbol'] == 'AAPL' for r in resps))
+        quotes.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import json
+import os.path as op
+import queue
+import tempfile
+from datetime import datetime
+from tradealerter.brokerages.replay_api import Replay, Recorder, load_recording
+from tradealerter.check_orders import orders_check
+from benchmarks import bench_replay
+
+root_dir = op.abspath(op.dirname(__file__))
+
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.polls = bench_replay.synthetic_day(n_trades=20, seed=1)
+
+    def test_get_orders(self):
+        replay = Replay(polls=self.polls)
+        self.assertEqual(replay.broker, 'etrade')
+        self.assertEqual(replay.get_orders('FILLED'), [])
+        orders = replay.get_orders('FILLED')
+        self.assertEqual([o['order_id'] for o in orders],
+                         [o['orderId'] for o in self.polls[1]['orders']])
+        self.assertEqual(orders[0]['status'], 'FILLED')
+
+        # since and skip_ids are applied as by the live brokerages
+        last = orders[0]
+        orders = replay.get_orders('FILLED', since=datetime.strptime(last['closeTime'], "%Y-%m-%d %H:%M:%S.%f"),
+                                   skip_ids={last['order_id']})
+        self.assertNotIn(last['order_id'], [o['order_id'] for o in orders])
+        self.assertTrue(all(o['closeTime'] >= last['closeTime'] for o in orders))
+        self.assertEqual(replay.get_order_info(last['order_id'])[0], 'FILLED')
+
+        # the last recorded call is served again once exhausted
+        for _ in range(len(self.polls)):
+            replay.get_orders('FILLED')
+        self.assertTrue(replay.exhausted)
+        self.assertEqual(len(replay.get_orders('FILLED')), len(self.polls[-1]['orders']))
+
+    def test_no_trading(self):
+        # orders are rejected, not raised
+        replay = Replay(polls=self.polls)
+        self.assertEqual(replay.send_order('BUY', 'TSLA', 'LIMIT', 1, 3.1), (None, None))
+        self.assertFalse(replay.cancel_order(1))
+
+    def test_webull(self):
+        with open(op.join(root_dir, "data", "webull_history_orders.json")) as f:
+            raw = json.load(f)
+        replay = Replay(polls=[{'broker': 'weBull', 't': 0, 'orders': raw}])
+        orders = replay.get_orders('FILLED')
+        self.assertEqual(len(orders), sum(o['status'] == 'Filled' for o in raw))
+        self.assertEqual(orders[0]['broker'], 'weBull')
+        self.assertIsInstance(orders[0]['quantity'], int)
+
+    def test_record(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fname = op.join(tmp_dir, "replay.jsonl")
+            recorder = Recorder(Replay(polls=self.polls), fname)
+            recorded = [[dict(o) for o in recorder.get_orders('FILLED')] for _ in range(3)]
+            self.assertEqual(recorder.broker, 'etrade')
+
+            polls = load_recording(fname)
+            self.assertEqual(len(polls), 3)
+            replay = Replay(fname)
+            self.assertEqual([[dict(o) for o in replay.get_orders('FILLED')] for _ in range(3)], recorded)
+
+    def test_late_fill(self):
+        # the older fill is reported one poll after the newer one
+        newer, late = self.polls[-1]['orders'][:2]
+        polls = [{'broker': 'etrade', 't': 0, 'orders': [newer]},
+                 {'broker': 'etrade', 't': 1, 'orders': [newer, late]}]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            checker = orders_check(queue.Queue(), order_fname=op.join(tmp_dir, "orders.json"),
+                                   port_fname=op.join(tmp_dir, "portfolio.csv"),
+                                   bksession=lambda: Replay(polls=polls))
+            checker._read_orders(False, False)
+            checker._read_orders(False, False)
+            checker.store.close()
+        self.assertLess(checker.orders[1]['closeTime'], checker.orders[0]['closeTime'])
+        self.assertEqual([o['order_id'] for o in checker.orders], [newer['orderId'], late['orderId']])
+
+    def test_bench_smoke(self):
+        result = bench_replay.main(['--trades', '30'])
+        self.assertGreater(result['fills'], 30)
+        self.assertEqual(result['trades'], 30)
+        self.assertEqual(result['open'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
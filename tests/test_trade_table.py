@@ -0,0 +1,60 @@
+import unittest
+import pandas as pd
+from tradealerter.trade_table import TradeTable, Trade, Fill
+
+
+def make_trade(symbol, qty):
+    return Trade(symbol, 'etrade', 'option',
+                 Fill("2023-05-30 14:01:11.193000", qty, 3.1, 18, float(qty)))
+
+
+class TestTradeTable(unittest.TestCase):
+
+    def test_lazy_frame(self):
+        table = TradeTable()
+        self.assertEqual(len(table.frame), 0)
+        ix0 = table.append(make_trade('TSLA', 2))
+        ix1 = table.append(make_trade('AAPL', 1))
+        self.assertEqual((ix0, ix1), (0, 1))
+        self.assertEqual(list(table.frame['symbol']), ['TSLA', 'AAPL'])
+
+        # updates and new rows show up on the next frame read
+        table[0].qty = 3
+        table[0].avged = 1
+        table.touch(0)
+        table.append(make_trade('SPY', 5))
+        port = table.frame
+        self.assertEqual(list(port.index), [0, 1, 2])
+        self.assertEqual(list(port['qty']), [3, 1, 5])
+        self.assertEqual(port.loc[0, 'avged'], 1)
+        self.assertTrue(pd.isna(port.loc[1, 'avged']))
+
+    def test_legacy_row(self):
+        trade = make_trade('TSLA_060223P195', 2)
+        trade.btos.append(Fill("2023-05-30 14:02:40.352000", 1, 2.36, 19, 1.0))
+        trade.avged, trade.qty, trade.fills, trade.price, trade.bto_n = 1, 3, 3, 2.85, 2
+        for ordID, price, pnl in [(24, 3.73, 30.88), (25, 3.63, 27.37)]:
+            trade.stcs.append(Fill("2023-05-31 09:45:35.125000", 1, price, ordID, 1.0, pnl, pnl/10))
+        trade.stc_price, trade.stc_fills, trade.stc_qty, trade.stc_n = 3.68, 2.0, 2, 2
+        trade.pnl, trade.pnl_usd = 29.12, 5.82
+
+        row = trade.to_row()
+        self.assertEqual(row['avg_price'], "3.1,2.36")
+        self.assertEqual(row['avg_ordID'], "18,19")
+        self.assertEqual(row['STCs-price'], "3.73,3.63")
+        self.assertEqual(row['PnLs'], "30.88,27.37")
+        self.assertEqual(row['ordID'], 19)
+        self.assertEqual(row['STC-ordID'], 25)
+        # legacy columns are parsed back to fills
+        self.assertEqual(Trade.from_row(row).to_row(), row)
+
+    def test_from_frame(self):
+        port = pd.DataFrame([{'date': "2023-05-30", 'symbol': 'TSLA', 'qty': 2, 'price': 3.1,
+                              'ordID': 18, 'avged': float('nan')}])
+        table = TradeTable.from_frame(port)
+        self.assertEqual(table[0].symbol, 'TSLA')
+        self.assertIsNone(table[0].avged)
+        self.assertEqual(len(table[0].btos), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from tradealerter.webhook_client import WebhookClient
+from tradealerter.alert_dispatcher import RateLimited
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    "Discord-like webhook keeping connections alive"
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status, body=b""):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        self._reply(200, b"{}")
+
+    def do_POST(self):
+        self.server.connections.add(self.client_address)
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.posts.append(payload)
+        if payload['content'] == 'limit':
+            self._reply(429, json.dumps({'retry_after': 1.5}).encode())
+        else:
+            self._reply(204)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestWebhookClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.posts, self.server.connections = [], set()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/webhooks/1/token"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_send_reuses_connection(self):
+        client = WebhookClient(self.url, username="alerts")
+        client.warm()
+        for i in range(3):
+            self.assertEqual(client.send(f"BTO {i}").status_code, 204)
+        self.assertEqual(self.server.posts[0], {'content': 'BTO 0', 'username': 'alerts'})
+        # warm-up and sends go through one connection
+        self.assertEqual(len(self.server.connections), 1)
+        self.assertEqual(len(client.latencies), 3)
+        client.close()
+
+    def test_rate_limited(self):
+        client = WebhookClient(self.url)
+        with self.assertRaises(RateLimited) as err:
+            client.send("limit")
+        self.assertEqual(err.exception.retry_after, 1.5)
+        client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import json
+import os.path as op
+from decimal import Decimal
+from tradealerter.brokerages.webull_decoder import (
+    decode, number, decimal, ORDER_SCHEMA, QUOTE_SCHEMA)
+
+root_dir = op.abspath(op.dirname(__file__))
+
+
+class TestWebullDecoder(unittest.TestCase):
+
+    def setUp(self):
+        with open(op.join(root_dir, "data", "webull_history_orders.json")) as f:
+            self.orders = json.load(f)
+
+    def test_converters(self):
+        self.assertEqual(number("2"), 2)
+        self.assertIsInstance(number("2"), int)
+        self.assertEqual(number("2.50"), 2.5)
+        self.assertIsNone(number(""))
+        self.assertEqual(decimal("3.10"), Decimal("3.10"))
+        with self.assertRaises(ValueError):
+            number("__import__('os')")
+
+    def test_orders_as_eval(self):
+        for order in self.orders:
+            decoded = decode(order, ORDER_SCHEMA)
+            leg, raw_leg = decoded['orders'][0], order['orders'][0]
+            self.assertEqual(decoded['filledQuantity'], eval(order['filledQuantity']))
+            for key in ['totalQuantity', 'filledQuantity']:
+                self.assertEqual(leg[key], eval(raw_leg[key]))
+                self.assertEqual(type(leg[key]), type(eval(raw_leg[key])))
+            if 'avgFilledPrice' in raw_leg:
+                self.assertEqual(leg['avgFilledPrice'], float(raw_leg['avgFilledPrice']))
+            # fields out of the schema are untouched, raw payload is not modified
+            self.assertEqual(leg['symbol'], raw_leg['symbol'])
+            self.assertIsInstance(raw_leg['totalQuantity'], str)
+
+    def test_quote(self):
+        quote = {'symbol': 'TSLA', 'askList': [{'price': '3.20', 'volume': '10'}],
+                 'bidList': [{'price': '3.10', 'volume': '4'}]}
+        decoded = decode(quote, QUOTE_SCHEMA)
+        self.assertEqual(decoded['askList'][0], {'price': 3.2, 'volume': 10})
+        self.assertEqual(decoded['bidList'][0]['price'], 3.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
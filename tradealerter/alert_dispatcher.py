@@ -0,0 +1,212 @@
+""" Deliver alerts to their destinations from a background worker pool"""
+import threading
+import time
+from collections import deque
+
+
+class RateLimited(Exception):
+    "The destination asked to wait retry_after seconds before sending again"
+    def __init__(self, retry_after:float):
+        super().__init__(f"rate limited, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket():
+    """Allow rate sends per second on average and bursts of capacity sends"""
+    def __init__(self, rate:float, capacity:float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.t = time.monotonic()
+
+    def _refill(self, now:float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.t) * self.rate)
+        self.t = now
+
+    def take(self, now:float=None)->float:
+        "Take a token, returns 0 or the seconds to wait for one"
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def pause(self, seconds:float, now:float=None):
+        "No token available for the next seconds"
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+
+class Delivery():
+    "An alert to a single destination and its delivery status"
+    __slots__ = ('content', 'destination', 'info', 'on_status', 'status', 'attempts',
+                 'error', 'response', 'submitted')
+
+    def __init__(self, content:str, destination:str, info=None, on_status=None):
+        self.content = content
+        self.destination = destination
+        self.info = info
+        self.on_status = on_status
+        self.status = 'queued'
+        self.attempts = 0
+        self.error = None
+        self.response = None
+        self.submitted = time.monotonic()
+
+    def __repr__(self):
+        return f"Delivery({self.destination}, {self.status}, {self.content!r})"
+
+
+class _Lane():
+    "Deliveries of one destination, sent in order one at a time"
+    __slots__ = ('name', 'send', 'bucket', 'jobs', 'busy', 'ready_at')
+
+    def __init__(self, name:str, send, bucket:TokenBucket):
+        self.name = name
+        self.send = send
+        self.bucket = bucket
+        self.jobs = deque()
+        self.busy = False
+        self.ready_at = 0
+
+
+class AlertDispatcher():
+    """Send alerts to several destinations without blocking the caller
+
+    Every destination has its own lane: deliveries are sent in order, one at
+    a time, at most at the rate of its token bucket. A failed or rate limited
+    delivery waits in its lane for the retry while the other lanes go on.
+    on_status callbacks run in the worker threads with the Delivery once it
+    is 'sent' or 'failed', and on every 'retry'.
+
+    Parameters
+    ----------
+    destinations : dict
+        name -> send(content), raises on error or RateLimited
+    maxsize : int
+        maximum deliveries waiting, submit returns False when full
+    rate, burst : float
+        token bucket of every destination, sends per second and burst size.
+        Discord allows 5 requests per 2 seconds per webhook.
+    max_retries : int
+        attempts after the first one before a delivery fails
+    backoff : float
+        seconds to wait after the first failure, doubled on each retry
+    workers : int
+        threads sending, default one per destination
+    """
+    def __init__(self, destinations:dict, maxsize:int=100, rate:float=2.5, burst:float=5,
+                 max_retries:int=3, backoff:float=1, workers:int=None):
+        self.lanes = {name: _Lane(name, send, TokenBucket(rate, burst))
+                      for name, send in destinations.items()}
+        self.maxsize = maxsize
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pending = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.workers = [threading.Thread(target=self._work, daemon=True, name=f"dispatch{i}")
+                        for i in range(workers or max(1, len(self.lanes)))]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, content:str, info=None, on_status=None, destinations:list=None)->bool:
+        """Queue content to every destination, or to the given ones
+
+        Returns False without queueing if the dispatcher is full or closed
+        """
+        names = list(self.lanes) if destinations is None else destinations
+        with self._cond:
+            if self._closed or self.pending + len(names) > self.maxsize:
+                print("Alert dispatcher full, dropping", content)
+                return False
+            for name in names:
+                self.lanes[name].jobs.append(Delivery(content, name, info, on_status))
+            self.pending += len(names)
+            self._cond.notify_all()
+        return True
+
+    def _next_lane(self, now:float):
+        "Lane ready to send, or None and seconds until one could be"
+        wait = None
+        for lane in self.lanes.values():
+            if lane.busy or not lane.jobs:
+                continue
+            if lane.ready_at <= now:
+                delay = lane.bucket.take(now)
+                if not delay:
+                    return lane, 0
+                lane.ready_at = now + delay
+            delay = lane.ready_at - now
+            wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed and not self.pending:
+                        return
+                    lane, wait = self._next_lane(time.monotonic())
+                    if lane is not None:
+                        break
+                    self._cond.wait(wait)
+                lane.busy = True
+                delivery = lane.jobs[0]
+
+            delivery.attempts += 1
+            delay = None
+            try:
+                delivery.response = lane.send(delivery.content)
+                delivery.status, delivery.error = 'sent', None
+            except RateLimited as e:
+                # does not count as an attempt, the destination tells when to retry
+                delivery.attempts -= 1
+                delivery.status, delivery.error = 'retry', e
+                delay = e.retry_after
+                with self._cond:
+                    lane.bucket.pause(delay)
+            except Exception as e:
+                delivery.error = e
+                if delivery.attempts > self.max_retries:
+                    delivery.status = 'failed'
+                else:
+                    delivery.status = 'retry'
+                    delay = self.backoff * 2 ** (delivery.attempts - 1)
+
+            with self._cond:
+                lane.busy = False
+                if delay is None:
+                    lane.jobs.popleft()
+                    self.pending -= 1
+                else:
+                    lane.ready_at = time.monotonic() + delay
+                self._cond.notify_all()
+
+            if delivery.status == 'failed':
+                print(f"Alert to {lane.name} failed after {delivery.attempts} attempts:", delivery.error)
+            if delivery.on_status is not None:
+                try:
+                    delivery.on_status(delivery)
+                except Exception as e:
+                    print("Error in alert status callback:", e)
+
+    def join(self, timeout:float=None)->bool:
+        "Wait until every delivery is sent or failed, False on timeout"
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.pending:
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout:float=None):
+        "Stop accepting alerts and wait up to timeout for the queued ones"
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self.join(timeout)
@@ -0,0 +1,107 @@
+""" When to send an alert and how a delivery updates the portfolio, shared by GUI and daemon"""
+import time
+from datetime import datetime
+from tradealerter.alert_dispatcher import AlertDispatcher
+from tradealerter.portfolio_store import isna
+from tradealerter.configurator import cfg
+from tradealerter.metrics import metrics
+
+
+def _lt(sent, n)->bool:
+    "sent - n < 0, False if either is missing"
+    return not isna(sent) and not isna(n) and sent - n < 0
+
+
+def alert_status(ord_checker, alert:str, port_ix)->str:
+    """Status of a new alert
+
+    "do_send" to send it now, "Send" to wait for a manual send, "Sent" if
+    already counted as sent, None to skip alerts of trades not in the
+    portfolio.
+    """
+    send_all = cfg['alert_configs'].getboolean('send_all_BTOs')
+    if port_ix is None:
+        return "do_send" if send_all else None
+    with ord_checker.lock:
+        trade = ord_checker.trades[port_ix]
+        btos_sent, bto_n = trade.btos_sent, trade.bto_n
+        stcs_sent, stc_n = trade.stcs_sent, trade.stc_n
+    if alert.startswith("BTO"):
+        if send_all:
+            return "do_send"
+        elif _lt(btos_sent, bto_n):
+            return "Send"
+        return "Sent"
+    elif alert.startswith("STC"):
+        # send all STC
+        if send_all:
+            return "do_send"
+        # if not sent but BTO not sent
+        elif isna(btos_sent):
+            return "Send"
+        # if not sent but BTO already sent
+        elif _lt(stcs_sent, stc_n) and not isna(bto_n) and btos_sent - bto_n >= 0:
+            return "do_send"
+        return "Send"
+
+
+# an alert going to any of these destinations is sent once all of them got it
+REQUIRED = ('discord',)
+
+
+def _required(deliveries:dict, required)->list:
+    "Destinations the alert has to reach, all of them if none is required"
+    return [d for d in deliveries if d in required] or list(deliveries)
+
+
+def delivery_status(ord_checker, notify, required:tuple=REQUIRED):
+    """on_status callback counting the sent alert in the portfolio, then calling notify(order)
+
+    order['deliveries'] has the status of every destination. The alert is
+    Sent and counted once the required destinations got it, Failed if one of
+    them failed, order['failed'] has the destinations that failed.
+    """
+    def on_status(delivery):
+        order = delivery.info
+        if delivery.status == 'sent':
+            print("alert sent to", delivery.destination, "at",
+                  datetime.now().strftime("%m/%d %H:%M:%S"), "response:", delivery.response)
+            if order.get('stamps'):
+                # stamped per destination, each one has its own response time
+                stamps = dict(order['stamps'], sent=time.monotonic_ns())
+                metrics.observe_stages(stamps, sink=delivery.destination)
+        if delivery.status in ['sent', 'failed']:
+            with ord_checker.lock:
+                deliveries = order.setdefault('deliveries', {})
+                deliveries[delivery.destination] = delivery.status
+                if delivery.status == 'failed':
+                    order['failed'] = order.get('failed', []) + [delivery.destination]
+                dests = _required(deliveries, required)
+                # count once, when the last required destination got it
+                if order['status'] != 'Sent' and all(deliveries[d] == 'sent' for d in dests):
+                    if order['port_ix'] is not None:
+                        # alerts merged by the alert queue are a line each
+                        for line in order['alert'].split("\n"):
+                            if line.startswith('BTO'):
+                                ord_checker.mark_sent(order['port_ix'], 'BTO')
+                            elif line.startswith('STC'):
+                                ord_checker.mark_sent(order['port_ix'], 'STC')
+                        ord_checker.save_portfolio(order['port_ix'])
+                    order['status'] = 'Sent'
+                elif order['status'] != 'Sent' and any(deliveries[d] == 'failed' for d in dests):
+                    order['status'] = 'Failed'
+        notify(order)
+    return on_status
+
+
+def send_order(order, dispatcher:AlertDispatcher, on_status):
+    "Queue the alert to the dispatcher, its status is updated by on_status"
+    if not len(dispatcher.lanes):
+        return order
+    # set before submit, a fast destination calls on_status before submit returns
+    previous, order['status'] = order['status'], 'Sending'
+    order['deliveries'] = {name: 'queued' for name in dispatcher.lanes}
+    order['failed'] = []
+    if not dispatcher.submit(order['alert'], info=order, on_status=on_status):
+        order['status'] = previous
+    return order
@@ -0,0 +1,146 @@
+""" Bounded alert queue between the order poller and the GUI or daemon
+
+put never blocks the poller for longer than a timeout, what happens to an
+alert when the queue is full depends on the overflow policy:
+
+    block     wait up to timeout for room, then drop the alert
+    coalesce  merge it into a queued alert of the same trade and action, sent
+              as one message with a line per alert, each line counted as a
+              sent alert of the trade, else as block
+    spill     write it to a file, read back in order as the queue drains
+
+The queue depth and the time alerts wait in it are in metrics.
+"""
+import json
+import os
+import os.path as op
+import queue
+import time
+from collections import deque
+from tradealerter.configurator import cfg
+from tradealerter.metrics import metrics
+
+POLICIES = ('block', 'coalesce', 'spill')
+
+
+class AlertQueue(queue.Queue):
+    """Queue of [alert, closeTime, trade_ix, stamps] items with an overflow policy
+
+    Parameters
+    ----------
+    maxsize : int
+        alerts kept in memory
+    policy : str
+        block, coalesce or spill, see the module docstring
+    timeout : float
+        max seconds put waits for room with block and coalesce
+    spill_fname : str
+        JSON lines file of the spilled alerts, removed when the queue is
+        made and when it is drained, spilled alerts do not survive a restart
+    """
+    def __init__(self, maxsize:int=20, policy:str='spill', timeout:float=1, spill_fname:str=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Alert queue policy {policy} not in {POLICIES}")
+        if policy == 'spill' and spill_fname is None:
+            raise ValueError("Alert queue spill policy needs a spill_fname")
+        self.policy = policy
+        self.timeout = timeout
+        self.spill_fname = spill_fname
+        super().__init__(maxsize)
+        if spill_fname is not None and op.exists(spill_fname):
+            os.remove(spill_fname)
+
+    @classmethod
+    def from_config(cls)->'AlertQueue':
+        "Alert queue of the alert_queue config"
+        return cls(maxsize=cfg.getint('alert_queue', 'maxsize', fallback=20),
+                   policy=cfg.get('alert_queue', 'policy', fallback='spill'),
+                   timeout=cfg.getfloat('alert_queue', 'timeout', fallback=1),
+                   spill_fname=op.join(cfg['paths']['data'],
+                                       cfg.get('alert_queue', 'spill_file', fallback='alert_queue.jsonl')))
+
+    def _init(self, maxsize):
+        # items are (monotonic put time, alert item)
+        self.queue = deque()
+        self.n_spilled = 0
+        self._spill_pos = 0
+
+    def _qsize(self):
+        return len(self.queue) + self.n_spilled
+
+    def _full(self)->bool:
+        return 0 < self.maxsize <= len(self.queue)
+
+    def _spill(self, item:tuple):
+        with open(self.spill_fname, 'a') as f:
+            f.write(json.dumps(item) + "\n")
+        self.n_spilled += 1
+        metrics.inc("tradealerter_alert_queue_spilled_total")
+
+    def _unspill(self)->tuple:
+        with open(self.spill_fname) as f:
+            f.seek(self._spill_pos)
+            line = f.readline()
+            self._spill_pos = f.tell()
+        self.n_spilled -= 1
+        if not self.n_spilled:
+            os.remove(self.spill_fname)
+            self._spill_pos = 0
+        return tuple(json.loads(line))
+
+    def _coalesce(self, item:list)->bool:
+        "Merge item into the last queued alert of the same trade and action"
+        alert, close_time, trade_ix = item[:3]
+        if trade_ix is None:
+            return False
+        for ix in range(len(self.queue) - 1, -1, -1):
+            t_put, queued = self.queue[ix]
+            if queued[2] == trade_ix and queued[0][:3] == alert[:3]:
+                # stamps of the first alert, its latency includes the wait
+                self.queue[ix] = (t_put, [f"{queued[0]}\n{alert}", close_time, *queued[2:]])
+                metrics.inc("tradealerter_alert_queue_coalesced_total")
+                return True
+        return False
+
+    def put(self, item, block:bool=True, timeout:float=None)->bool:
+        """Queue an alert, False if it was dropped
+
+        block and timeout are ignored, the queue policy decides
+        """
+        entry = (time.monotonic(), item)
+        with self.not_full:
+            if self.policy == 'spill' and (self.n_spilled or self._full()):
+                # once spilling, alerts keep their order through the file
+                self._spill(entry)
+            elif self._full():
+                if self.policy == 'coalesce' and self._coalesce(item):
+                    self._set_depth()
+                    return True
+                if not self.not_full.wait_for(lambda: not self._full(), self.timeout):
+                    metrics.inc("tradealerter_alert_queue_dropped_total")
+                    print("Alert queue full, dropping alert", item[0])
+                    return False
+                self.queue.append(entry)
+            else:
+                self.queue.append(entry)
+            self.unfinished_tasks += 1
+            self._set_depth()
+            self.not_empty.notify()
+        return True
+
+    def put_nowait(self, item)->bool:
+        return self.put(item)
+
+    def _get(self):
+        if not self.queue:
+            self.queue.append(self._unspill())
+        t_put, item = self.queue.popleft()
+        while self.n_spilled and not self._full():
+            self.queue.append(self._unspill())
+        metrics.observe("tradealerter_alert_queue_wait_seconds", time.monotonic() - t_put)
+        self._set_depth()
+        return item
+
+    def _set_depth(self):
+        # called with the mutex held
+        metrics.set("tradealerter_alert_queue_depth", self._qsize())
@@ -0,0 +1,97 @@
+""" Alert sinks of the config: webhooks, a local socket and a JSON lines file"""
+import json
+import os.path as op
+import socket
+import threading
+from datetime import datetime
+from tradealerter.configurator import cfg
+from tradealerter.alert_dispatcher import AlertDispatcher
+from tradealerter.webhook_client import get_webhook_client
+
+
+class WebhookSink():
+    "Discord style webhook"
+    def __init__(self, name:str, url:str, username:str=None, timeout:float=5):
+        self.name = name
+        self.client = get_webhook_client(url, username, timeout=timeout)
+
+    def send(self, content:str):
+        return self.client.send(content)
+
+
+class SocketSink():
+    """JSON line per alert to a TCP host:port or a unix:/path socket
+
+    The connection is kept open and opened again after errors.
+    """
+    def __init__(self, name:str, address:str, timeout:float=5):
+        self.name = name
+        self.address = address
+        self.timeout = timeout
+        self.sock = None
+
+    def _connect(self)->socket.socket:
+        if self.address.startswith("unix:"):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            target = self.address[len("unix:"):]
+        else:
+            host, port = self.address.rsplit(":", 1)
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            target = (host, int(port))
+        sock.settimeout(self.timeout)
+        sock.connect(target)
+        return sock
+
+    def send(self, content:str):
+        line = json.dumps({'time': datetime.now().isoformat(), 'alert': content}) + "\n"
+        if self.sock is None:
+            self.sock = self._connect()
+        try:
+            self.sock.sendall(line.encode())
+        except OSError:
+            self.sock.close()
+            self.sock = None
+            raise
+
+
+class JsonlSink():
+    "Append every alert to a JSON lines file"
+    def __init__(self, name:str, fname:str):
+        self.name = name
+        self.fname = fname
+        self._lock = threading.Lock()
+
+    def send(self, content:str):
+        line = json.dumps({'time': datetime.now().isoformat(), 'alert': content}) + "\n"
+        with self._lock, open(self.fname, "a") as f:
+            f.write(line)
+
+
+def sinks_from_config(config=cfg)->list:
+    "Sinks of the discord webhook and of the [alert_sinks] section"
+    sinks_cfg = config['alert_sinks'] if config.has_section('alert_sinks') else {}
+    timeout = float(sinks_cfg.get('timeout', 5) or 5)
+    username = config['discord'].get('webhook_name') or None
+    sinks = []
+    if len(config['discord'].get('webhook', '')):
+        sinks.append(WebhookSink('discord', config['discord']['webhook'], username, timeout))
+    urls = [url.strip() for url in sinks_cfg.get('webhooks', '').split(",") if url.strip()]
+    for i, url in enumerate(urls):
+        sinks.append(WebhookSink(f"webhook{i + 1}", url, username, timeout))
+    if sinks_cfg.get('socket'):
+        sinks.append(SocketSink('socket', sinks_cfg['socket'], timeout))
+    if sinks_cfg.get('jsonl_file'):
+        fname = op.join(config['paths']['data'], sinks_cfg['jsonl_file'])
+        sinks.append(JsonlSink('jsonl', fname))
+    return sinks
+
+
+def make_dispatcher(sinks:list=None, **kwargs)->AlertDispatcher:
+    """Dispatcher delivering every alert to all sinks at the same time
+
+    Each sink is a lane of the dispatcher, a slow or failing sink only
+    delays its own alerts. Default sinks from the config.
+    """
+    if sinks is None:
+        sinks = sinks_from_config()
+    return AlertDispatcher({sink.name: sink.send for sink in sinks}, **kwargs)
@@ -0,0 +1,132 @@
+""" Poll several brokerages concurrently and merge their fills in one alert stream"""
+import asyncio
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tradealerter.configurator import cfg
+from tradealerter.poll_scheduler import PollScheduler
+from tradealerter.metrics import metrics
+
+
+class AsyncPoller():
+    """Run get_orders('FILLED') of every brokerage of an orders_check concurrently
+
+    Each brokerage is polled by its own task with its own PollScheduler, the
+    blocking broker SDK calls run in a thread pool. New fills go to a single
+    merge task that processes them in closeTime order in one worker thread,
+    so portfolio tracking and alerts stay sequential.
+
+    Parameters
+    ----------
+    checker : orders_check
+        tracks the portfolio and pushes the alerts to its queue
+    refresh_rate : float
+        seconds between polls of each brokerage in market hours
+    """
+    def __init__(self, checker, refresh_rate:float=1):
+        self.checker = checker
+        self.refresh_rate = refresh_rate
+        self.broker_executor = ThreadPoolExecutor(max_workers=len(checker.bksessions),
+                                                  thread_name_prefix='broker')
+        self.process_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='process')
+        self._stop = threading.Event()
+        self._loop = None
+        self._wakeup = None
+
+    def stop(self):
+        "Stop polling, can be called from any thread"
+        self._stop.set()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _sleep(self, delay:float):
+        "Sleep that returns early on stop"
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _poll(self, bksession, fills:asyncio.Queue):
+        "Poll one brokerage and put its new fills, oldest first, in fills"
+        loop = asyncio.get_running_loop()
+        scheduler = PollScheduler(
+            refresh_rate=self.refresh_rate,
+            extended_rate=cfg.getfloat('polling', 'extended_rate', fallback=5),
+            closed_rate=cfg.getfloat('polling', 'closed_rate', fallback=60),
+            max_backoff=cfg.getfloat('polling', 'max_backoff', fallback=120))
+        name = getattr(bksession, 'name', type(bksession).__name__)
+        metrics_fname = self.checker._metrics_fname()
+        n_errors = 0
+        while not self._stop.is_set():
+            error = False
+            t_start = loop.time()
+            try:
+                since = self.checker._since(bksession)
+                skip_ids = self.checker._skip_ids(bksession)
+                orders = await loop.run_in_executor(
+                    self.broker_executor,
+                    lambda: bksession.get_orders('FILLED', since=since, skip_ids=skip_ids))
+                detected = time.monotonic_ns()
+                metrics.observe("tradealerter_poll_seconds", loop.time() - t_start,
+                                broker=getattr(bksession, 'broker', name))
+                new_orders = self.checker._new_orders(orders)
+                if len(new_orders):
+                    await fills.put((detected, new_orders))
+            except Exception as e:
+                error = True
+                n_errors += 1
+                print(f"Cauguth error num {n_errors} in {name}:", e)
+            if metrics_fname:
+                metrics.write_if_due(metrics_fname, cfg.getfloat('metrics', 'interval', fallback=10))
+            await self._sleep(scheduler.next_delay(loop.time() - t_start, error,
+                                                   active=len(self.checker.open_trades) > 0))
+
+    async def _merge(self, fills:asyncio.Queue, dev, alert):
+        "Process fills of all brokerages, fills ready at the same time in closeTime order"
+        loop = asyncio.get_running_loop()
+        coalescer = self.checker.coalescer
+        n_errors = 0
+        while True:
+            # wake up when coalesced fills are due
+            due = coalescer.next_due() if coalescer is not None else None
+            try:
+                ready = [await asyncio.wait_for(
+                    fills.get(), None if due is None else max(0, due - time.monotonic()))]
+            except asyncio.TimeoutError:
+                ready = []
+            while not fills.empty():
+                ready.append(fills.get_nowait())
+            # latency is measured from the earliest poll of the merged fills
+            detected = min((t for t, _ in ready), default=None)
+            batches = [batch for _, batch in ready]
+            # the same fill can be found by two polls before it is processed
+            new_orders, keys = [], set()
+            for order in heapq.merge(*batches, key=lambda o: o['closeTime']):
+                key = (order['broker'], order['order_id'])
+                if key not in keys and key not in self.checker.seen_ids:
+                    keys.add(key)
+                    new_orders.append(order)
+            try:
+                # with no new orders, processes the coalesced fills due
+                await loop.run_in_executor(self.process_executor, self.checker._process_orders,
+                                           new_orders, dev, alert, detected)
+            except Exception as e:
+                # a bad order must not stop the alerts of the next ones
+                n_errors += 1
+                print(f"Cauguth error num {n_errors} processing orders:", e)
+
+    async def run(self, dev=False, alert=True):
+        "Poll until stop is called"
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        fills = asyncio.Queue()
+        pollers = [asyncio.create_task(self._poll(bk, fills)) for bk in self.checker.bksessions]
+        merger = asyncio.create_task(self._merge(fills, dev, alert))
+        try:
+            await asyncio.gather(*pollers)
+        finally:
+            merger.cancel()
+            self.checker.flush_coalesced(dev, alert)
+            self.broker_executor.shutdown(wait=False)
+            self.process_executor.shutdown(wait=False)
@@ -7,6 +7,9 @@ from td.orders import Order, OrderLeg
 from td.client import TDClient
 
 class TDA(BaseBroker):
+    # get_quotes takes many symbols in one request
+    bulk_quotes = True
+
     def __init__(self,account_n=0, accountId=None):
         self.account_n = account_n
         self.accountId = accountId
@@ -70,7 +73,7 @@ class TDA(BaseBroker):
     def get_quotes(self, symbol:list):
         return self.session.get_quotes(instruments=symbol)
 
-    def get_orders(self):
+    def get_orders(self, status:str='ALL', since=None, skip_ids=()):
         pass
 
     def get_order_status(self, order_id):
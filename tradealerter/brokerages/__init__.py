@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
 from ..configurator import cfg
 
 class BaseBroker(ABC):
@@ -23,7 +24,15 @@ class BaseBroker(ABC):
         pass
 
     @abstractmethod
-    def get_orders(self):
+    def get_orders(self, status:str='ALL', since:datetime=None, skip_ids=()):
+        """Orders in the format_order format, most recent first
+
+        status: ALL, WORKING, FILLED
+        since: if given, only orders closed at or after since are needed,
+        brokers map it to their own time window or paging fields
+        skip_ids: broker order ids already processed, dropped before
+        formatting them
+        """
         pass
 
     @abstractmethod
@@ -31,7 +40,10 @@ class BaseBroker(ABC):
         pass
 
 
-def get_brokerage(name=cfg['alert_configs']['BROKERAGE']):
+def get_brokerage(name:str=None):
+    "Session of the brokerage name, default BROKERAGE in config"
+    if name is None:
+        name = cfg['alert_configs']['BROKERAGE']
     if name.lower() == 'tda':
         from .TDA_api import TDA
         accountId = cfg['TDA']['accountId']
@@ -54,6 +66,10 @@ def get_brokerage(name=cfg['alert_configs']['BROKERAGE']):
             return wb
         else:
             raise Exception("Failed to get session for weBull")
+    elif name.lower() == 'replay':
+        import os.path as op
+        from .replay_api import Replay
+        return Replay(op.join(cfg['paths']['data'], cfg['replay']['file']))
     elif name.lower() == 'etrade':
         from .eTrade_api import eTrade
         accountId = cfg['etrade']['accountId']
@@ -66,4 +82,20 @@ def get_brokerage(name=cfg['alert_configs']['BROKERAGE']):
             et.get_session()
         return et
     else:
-        raise Exception(f"Brokerage {name} not supported")
\ No newline at end of file
+        raise Exception(f"Brokerage {name} not supported")
+
+
+def get_brokerages(names:str=None)->list:
+    """Sessions of comma separated brokerages, default BROKERAGE in config
+
+    With record set in the replay config, their orders are recorded for replay
+    """
+    if names is None:
+        names = cfg['alert_configs']['BROKERAGE']
+    sessions = [get_brokerage(name.strip()) for name in names.split(",") if name.strip()]
+    record = cfg.get('replay', 'record', fallback='')
+    if record:
+        import os.path as op
+        from .replay_api import Recorder
+        sessions = [Recorder(bk, op.join(cfg['paths']['data'], record)) for bk in sessions]
+    return sessions
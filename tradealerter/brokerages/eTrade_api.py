@@ -2,7 +2,7 @@
 import webbrowser
 import pyetrade
 import re
-from datetime import datetime
+from datetime import datetime, timedelta
 import time
 import json
 import os
@@ -10,6 +10,7 @@ import functools
 
 from tradealerter.configurator import cfg
 from tradealerter.brokerages import BaseBroker
+from tradealerter.brokerages.order_view import LazyOrder
 
 
 def retry_on_exception(retries=3, do_raise=False):
@@ -28,7 +29,46 @@ def retry_on_exception(retries=3, do_raise=False):
         return wrapper
     return decorator
 
+def _time(ms)->str:
+    return datetime.fromtimestamp(int(ms)/1000).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+def _close_time(order:dict)->str:
+    detail = order['OrderDetail'][0]
+    return _time(detail['executedTime'] if 'executedTime' in detail else detail['placedTime'])
+
+def _asset(order:dict)->str:
+    return 'stock' if order['orderType']=='EQ' else 'option' if order['orderType']=='OPTN' else "N/A"
+
+def _symbol(order:dict)->str:
+    prod = order['OrderDetail'][0]['Instrument'][0]['Product']
+    if _asset(order) == 'option':
+        opty = prod['callPut'][0].upper().replace('CALL','C').replace('PUT','P')
+        return f"{prod['symbol']}_{prod['expiryMonth']:02d}{prod['expiryDay']:02d}{str(prod['expiryYear'])[2:]}{opty}{str(prod['strikePrice']).replace('.0','')}"
+    return prod['symbol']
+
+def _instrument(order:dict)->dict:
+    return order['OrderDetail'][0]['Instrument'][0]
+
+# format_order fields, see order_view
+ORDER_FIELDS = {
+    'symbol': _symbol,
+    'asset': _asset,
+    'action': lambda o: _instrument(o)['orderAction'],
+    'status': lambda o: o['OrderDetail'][0]['status'].upper().replace('EXECUTED', 'FILLED').replace('OPEN',"WORKING"),
+    'quantity': lambda o: _instrument(o)['orderedQuantity'],
+    'filledQuantity': lambda o: _instrument(o)['filledQuantity'],
+    'price': lambda o: _instrument(o).get('averageExecutionPrice'),
+    'order_id': lambda o: o['orderId'],
+    'stopPrice': lambda o: _instrument(o).get('stopPrice') or None,
+    'orderType': lambda o: o['OrderDetail'][0]['priceType'],
+    'enteredTime': lambda o: _time(o['OrderDetail'][0]['placedTime']),
+    'closeTime': _close_time,
+    }
+
+
 class eTrade(BaseBroker):
+    broker = "etrade"
+
     def __init__(self, account_n=0, accountId=None):
         self.base_url = cfg["etrade"]["PROD_BASE_URL"]
         self.accountId = accountId
@@ -166,59 +206,53 @@ class eTrade(BaseBroker):
         else:
             print('No format_option match for', opt_ticker)
 
+    def order_view(self, order:dict)->LazyOrder:
+        """Standard order format, fields computed when read"""
+        return LazyOrder(order, ORDER_FIELDS, broker=self.broker)
+
     def format_order(self, order:dict)->dict:
         """Make order format standard"""
-        stopPrice= order['OrderDetail'][0]['Instrument'][0].get('stopPrice')
-        timestamp = int(order['OrderDetail'][0]['placedTime'])
-        enteredTime = datetime.fromtimestamp(timestamp/1000).strftime("%Y-%m-%d %H:%M:%S.%f")
-        if 'executedTime' in order['OrderDetail'][0]:
-            timestamp = int(order['OrderDetail'][0]['executedTime'])/1000
-            closeTime = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S.%f")
-        else:
-            closeTime = enteredTime
-        status = order['OrderDetail'][0]['status'].upper().replace('EXECUTED', 'FILLED').replace('OPEN',"WORKING")
-        symbol = order['OrderDetail'][0]['Instrument'][0]['Product']['symbol']
-        asset = 'stock' if order['orderType']=='EQ' else 'option' if order['orderType']=='OPTN' else "N/A"
-        if asset == 'option':
-            prod =  order['OrderDetail'][0]['Instrument'][0]['Product']
-            opty = prod['callPut'][0].upper().replace('CALL','C').replace('PUT','P')
-            symbol = f"{prod['symbol']}_{prod['expiryMonth']:02d}{prod['expiryDay']:02d}{str(prod['expiryYear'])[2:]}{opty}{str(prod['strikePrice']).replace('.0','')}"
-
-        order_info = {
-            'symbol': symbol,
-            'asset': asset,
-            'action': order['OrderDetail'][0]['Instrument'][0]['orderAction'],
-            'status': status,
-            'quantity': order['OrderDetail'][0]['Instrument'][0]['orderedQuantity'],
-            'filledQuantity': order['OrderDetail'][0]['Instrument'][0]['filledQuantity'],
-            'price': order['OrderDetail'][0]['Instrument'][0].get('averageExecutionPrice'),
-            "order_id": order['orderId'],
-            "stopPrice": stopPrice if stopPrice else None,
-            'orderType':  order['OrderDetail'][0]['priceType'],
-            'enteredTime': enteredTime,
-            "closeTime": closeTime,
-            "broker": "etrade"
-            }
-        return order_info
+        return dict(self.order_view(order))
+
+    def _list_orders(self, status:str, since:datetime=None, max_pages:int=10)->list:
+        "Raw orders, with since only executed orders from that day on, following pages"
+        if since is None:
+            resp = self.order_session.list_orders(self.accountIdKey, resp_format='json')
+            return resp['OrdersResponse'].get('Order', [])
+        kwargs = {'from_date': since, 'to_date': datetime.now() + timedelta(days=1)}
+        if status.upper() == 'FILLED':
+            kwargs['status'] = 'EXECUTED'
+        elif status.upper() == 'WORKING':
+            kwargs['status'] = 'OPEN'
+        orders, marker = [], None
+        for _ in range(max_pages):
+            resp = self.order_session.list_orders(self.accountIdKey, marker=marker, count=100,
+                                                  resp_format='json', **kwargs)
+            orders.extend(resp['OrdersResponse'].get('Order', []))
+            marker = resp['OrdersResponse'].get('marker')
+            if not marker:
+                break
+        return orders
 
     retry_on_exception()
-    def get_orders(self, status:str='ALL'):
-        "status: ALL, WORKING, FILLED"
+    def get_orders(self, status:str='ALL', since:datetime=None, skip_ids=()):
+        """status: ALL, WORKING, FILLED, since: only orders from since date on
+
+        Orders with other status or with orderId in skip_ids are dropped before
+        building their order_view
+        """
         assert status.upper() in ['ALL', 'WORKING', 'FILLED'], 'status must be ALL, WORKING, or FILLED'
-        resp = self.order_session.list_orders(self.accountIdKey, resp_format='json')
+        raw_status = {'WORKING': 'OPEN', 'FILLED': 'EXECUTED'}.get(status.upper())
         orders = []
-        for order in resp['OrdersResponse']['Order']:
-            order_info = self.format_order(order)
-            if status.upper() == 'ALL':
-                orders.append(order_info)
-            elif status.upper() == 'WORKING' and  order_info['status'] == 'WORKING':
-                orders.append(order_info)
-            elif status.upper() == 'FILLED' and order_info['status'] == 'FILLED':
-                orders.append(order_info)
+        for order in self._list_orders(status, since):
+            if raw_status and order['OrderDetail'][0]['status'].upper() != raw_status:
+                continue
+            if order['orderId'] in skip_ids:
+                continue
+            orders.append(self.order_view(order))
         return orders
 
 
-
 if __name__ == "__main__":
     rt = eTrade()
     rt.get_session()
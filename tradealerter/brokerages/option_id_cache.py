@@ -0,0 +1,78 @@
+""" SQLite LRU cache of broker option contract ids, evicted at expiry"""
+import sqlite3
+import threading
+import time
+from datetime import date
+
+
+class OptionIdCache():
+    """Option contract ids keyed by standard option symbol
+
+    Ids persist across restarts. Contracts past their expiry date are
+    dropped on open and on every put, and the least recently used are
+    dropped beyond max_size.
+
+    Parameters
+    ----------
+    fname : str
+        sqlite file, ':memory:' for no persistence
+    max_size : int
+        maximum number of contracts kept
+    """
+    def __init__(self, fname:str, max_size:int=20000):
+        self.fname = fname
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self.con = sqlite3.connect(fname, check_same_thread=False)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self.con.execute("CREATE TABLE IF NOT EXISTS option_ids (symbol TEXT PRIMARY KEY, "
+                         "option_id TEXT, expiry TEXT, last_used REAL)")
+        self.con.execute("CREATE INDEX IF NOT EXISTS ix_last_used ON option_ids (last_used)")
+        self.evict()
+
+    def __len__(self):
+        with self._lock:
+            return self.con.execute("SELECT COUNT(*) FROM option_ids").fetchone()[0]
+
+    def __contains__(self, symbol:str):
+        return self.get(symbol, touch=False) is not None
+
+    def get(self, symbol:str, touch:bool=True):
+        "Contract id of symbol, None if not cached"
+        with self._lock:
+            row = self.con.execute("SELECT option_id FROM option_ids WHERE symbol = ?",
+                                   (symbol,)).fetchone()
+            if row is None:
+                return None
+            if touch:
+                self.con.execute("UPDATE option_ids SET last_used = ? WHERE symbol = ?",
+                                 (time.time(), symbol))
+                self.con.commit()
+            return row[0]
+
+    def put_many(self, contracts:list):
+        "Cache a list of (symbol, option_id, expiry 'YYYY-MM-DD')"
+        now = time.time()
+        with self._lock:
+            self.con.executemany(
+                "INSERT OR REPLACE INTO option_ids (symbol, option_id, expiry, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                [(symbol, str(option_id), expiry, now) for symbol, option_id, expiry in contracts])
+            self.con.commit()
+        self.evict()
+
+    def put(self, symbol:str, option_id, expiry:str):
+        self.put_many([(symbol, option_id, expiry)])
+
+    def evict(self, today:date=None):
+        "Drop expired contracts and the least recently used beyond max_size"
+        today = (today or date.today()).isoformat()
+        with self._lock:
+            self.con.execute("DELETE FROM option_ids WHERE expiry < ?", (today,))
+            self.con.execute("DELETE FROM option_ids WHERE symbol IN (SELECT symbol FROM option_ids "
+                             "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_size,))
+            self.con.commit()
+
+    def close(self):
+        self.con.close()
@@ -0,0 +1,38 @@
+""" Normalized order view computed lazily from the raw broker order"""
+from collections.abc import Mapping
+
+
+class LazyOrder(Mapping):
+    """Read-only order in the format_order format, fields computed on first access
+
+    Parameters
+    ----------
+    raw : dict
+        order as returned by the broker
+    fields : dict
+        field name -> function of raw returning the normalized value
+    values :
+        fields with known values, e.g. broker
+    """
+    __slots__ = ('raw', 'fields', '_values')
+
+    def __init__(self, raw:dict, fields:dict, **values):
+        self.raw = raw
+        self.fields = fields
+        self._values = values
+
+    def __getitem__(self, key):
+        if key in self._values:
+            return self._values[key]
+        value = self._values[key] = self.fields[key](self.raw)
+        return value
+
+    def __iter__(self):
+        yield from self.fields
+        yield from (k for k in self._values if k not in self.fields)
+
+    def __len__(self):
+        return len(self.fields) + sum(k not in self.fields for k in self._values)
+
+    def __repr__(self):
+        return f"LazyOrder({dict(self)})"
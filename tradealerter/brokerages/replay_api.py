@@ -0,0 +1,167 @@
+""" Record and replay raw brokerage order payloads, orders_check without a live session
+
+A recording is a JSON lines file with one line per get_orders call:
+
+    {"broker": "etrade", "t": 0.53, "orders": [raw order, ...]}
+
+t is seconds since the first recorded call and orders are the raw broker
+orders of the call, most recent first. Replay serves one line per
+get_orders call, so the same fills are replayed in the same polls.
+"""
+import json
+import threading
+import time
+from datetime import datetime
+from tradealerter.brokerages import BaseBroker
+from tradealerter.brokerages.order_view import LazyOrder
+
+
+def order_fields(broker:str)->tuple:
+    "format_order fields and decoding schema, or None, of the raw orders of broker"
+    if broker.lower() == 'etrade':
+        from .eTrade_api import ORDER_FIELDS
+        return ORDER_FIELDS, None
+    elif broker.lower() == 'webull':
+        from .weBull_api import ORDER_FIELDS
+        from .webull_decoder import ORDER_SCHEMA
+        return ORDER_FIELDS, ORDER_SCHEMA
+    raise Exception(f"Brokerage {broker} can not be replayed")
+
+
+def load_recording(fname:str, broker:str=None)->list:
+    "Recorded get_orders calls of broker, default the broker of the first call"
+    polls = []
+    with open(fname) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            poll = json.loads(line)
+            broker = broker or poll['broker']
+            if poll['broker'] == broker:
+                polls.append(poll)
+    return polls
+
+
+class Replay(BaseBroker):
+    """Brokerage serving recorded raw orders, one recorded call per get_orders
+
+    Once all the calls are served the last one is served again, as a
+    brokerage keeps returning its orders when there are no new fills.
+
+    Parameters
+    ----------
+    fname : str
+        JSON lines recording, see Recorder
+    polls : list
+        recorded calls, instead of fname
+    broker : str
+        broker of the calls to replay, default the broker of the first call
+    """
+    def __init__(self, fname:str=None, polls:list=None, broker:str=None):
+        if polls is None:
+            polls = load_recording(fname, broker)
+        self.polls = [p for p in polls if broker is None or p['broker'] == broker]
+        self.broker = broker or (self.polls[0]['broker'] if len(self.polls) else 'replay')
+        self.name = 'replay'
+        self.n_served = 0
+        self._views = {}
+
+    @property
+    def exhausted(self)->bool:
+        "True once every recorded call has been served"
+        return self.n_served >= len(self.polls)
+
+    def get_session(self):
+        return True
+
+    def order_view(self, order:dict)->LazyOrder:
+        "Order in the format_order format, as the recorded brokerage builds it"
+        fields, schema = order_fields(self.broker)
+        if schema is not None:
+            from .webull_decoder import decode
+            order = decode(order, schema)
+        return LazyOrder(order, fields, broker=self.broker)
+
+    def _next_poll(self)->list:
+        if not len(self.polls):
+            return []
+        poll = self.polls[min(self.n_served, len(self.polls) - 1)]
+        self.n_served += 1
+        return poll['orders']
+
+    def get_orders(self, status:str='ALL', since:datetime=None, skip_ids=()):
+        """status: ALL, WORKING, FILLED, since: only orders closed from since on
+
+        Orders of the next recorded call, filtered as the live brokerages do
+        """
+        since = since.strftime("%Y-%m-%d %H:%M:%S.%f") if since is not None else ""
+        orders = []
+        for raw in self._next_poll():
+            order = self.order_view(raw)
+            if status != 'ALL' and order['status'] != status:
+                continue
+            if order['order_id'] in skip_ids or order['closeTime'] < since:
+                continue
+            self._views[order['order_id']] = order
+            orders.append(order)
+        return orders
+
+    def get_order_info(self, order_id):
+        "Status and format_order of an order already replayed"
+        order = self._views.get(order_id)
+        if order is None:
+            return None, None
+        return order['status'], dict(order)
+
+    def get_quotes(self, symbol:list)->dict:
+        "Last replayed fill price of each symbol as bid and ask"
+        prices = {}
+        for order in self._views.values():
+            if order['symbol'] in symbol and order['closeTime'] >= prices.get(order['symbol'], ("",))[0]:
+                prices[order['symbol']] = (order['closeTime'], order['price'])
+        resp = {}
+        for symb in symbol:
+            if symb in prices:
+                resp[symb] = {'symbol': symb, 'askPrice': prices[symb][1], 'bidPrice': prices[symb][1],
+                              'quoteTimeInLong': round(time.time()*1000)}
+            else:
+                resp[symb] = {'symbol': symb, 'description': 'Symbol not found'}
+        return resp
+
+    def send_order(self, side, symbol, order_type, quantity, price=None, stop_price=None):
+        "Rejected, a replay only serves recorded fills, returns no response and no order id"
+        print("Replay brokerage does not send orders, rejected", side, quantity, symbol)
+        return None, None
+
+    def cancel_order(self, order_id):
+        "Rejected, returns False"
+        print("Replay brokerage does not cancel orders, rejected", order_id)
+        return False
+
+
+class Recorder():
+    """Brokerage session that appends the raw orders of each get_orders call to fname
+
+    Everything else goes to the wrapped session. The raw orders are the ones
+    the brokerage kept after its own filtering, Webull orders already decoded.
+    """
+    def __init__(self, bksession, fname:str):
+        self.bksession = bksession
+        self.fname = fname
+        self._t0 = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.bksession, name)
+
+    def get_orders(self, *args, **kwargs):
+        orders = self.bksession.get_orders(*args, **kwargs)
+        with self._lock:
+            now = time.monotonic()
+            if self._t0 is None:
+                self._t0 = now
+            line = {'broker': self.bksession.broker, 't': round(now - self._t0, 3),
+                    'orders': [order.raw for order in orders]}
+            with open(self.fname, 'a') as f:
+                f.write(json.dumps(line) + "\n")
+        return orders
@@ -1,17 +1,71 @@
 import re
 import time
+import os
 from datetime import datetime
-from webull import webull, paper_webull
 from tradealerter.configurator import cfg
 from tradealerter.brokerages import BaseBroker
+from tradealerter.brokerages.order_view import LazyOrder
+from tradealerter.brokerages.option_id_cache import OptionIdCache
+from tradealerter.brokerages.webull_decoder import (
+    decode, ORDER_SCHEMA, POSITION_SCHEMA, QUOTE_SCHEMA, OPTION_QUOTE_SCHEMA)
+
+
+def _time(ms)->str:
+    return datetime.fromtimestamp(int(ms)/1000).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+def _price(order:dict):
+    price = order['orders'][0].get('avgFilledPrice')
+    if price is None:
+        price = order['orders'][0].get('lmtPrice')
+    return price if price is not None else order['auxPrice']
+
+def _symbol(order:dict)->str:
+    leg = order['orders'][0]
+    if leg['tickerType'].lower() != 'option':
+        return leg['symbol']
+    yer, mnt, day = leg['optionExpireDate'].split("-")
+    otype = leg['optionType'][0].upper()
+    symbol = f"{leg['symbol']}_{mnt}{day}{yer[2:]}{otype}{leg['optionExercisePrice']}".replace(".00","")
+    return weBull.fix_symbol(symbol, "in")
+
+def _strategy(order:dict)->str:
+    if order['orders'][0]['tickerType'].lower() == 'option':
+        return order['optionStrategy'].upper()
+    return 'SINGLE'
+
+# format_order fields of decoded orders, see order_view
+ORDER_FIELDS = {
+    'status': lambda o: o['status'].upper(),
+    'action': lambda o: o['orders'][0]['action'],
+    'asset': lambda o: o['orders'][0]['tickerType'].lower(),
+    'symbol': _symbol,
+    'quantity': lambda o: o['orders'][0]['totalQuantity'],
+    'filledQuantity': lambda o: o['orders'][0]['filledQuantity'],
+    'price': _price,
+    'orderStrategyType': _strategy,
+    "order_id": lambda o: o['orders'][0]['orderId'],
+    "orderId": lambda o: o['orders'][0]['orderId'],
+    "stopPrice": lambda o: o['orders'][0].get('stpPrice') or None,
+    'orderType': lambda o: o['orders'][0]['orderType'],
+    'enteredTime': lambda o: _time(o['orders'][0]['createTime0']),
+    "closeTime": lambda o: _time(o['orders'][0]['updateTime0']),
+    'orderLegCollection': lambda o: [{
+        'instrument':{'symbol': _symbol(o)},
+        'instruction': o['orders'][0]['action'],
+        'quantity': o['filledQuantity'],
+    }],
+    }
 
 
 class weBull:
+    broker = "weBull"
+
     def __init__(self, paper_trading: bool = False) -> None:
+        from webull import webull, paper_webull
         self._webull = paper_webull() if (paper_trading) else webull()
         self._loggedin = False
         self.name = 'webull'
-        self.option_ids = {}
+        self.option_ids = OptionIdCache(os.path.join(cfg['paths']['data'], "webull_option_ids.db"))
 
     def get_session(self, use_workaround: bool = True) -> bool:
         wb = self._webull
@@ -47,16 +101,16 @@ class weBull:
                     'availableFunds': data['accountMembers'][2]['value'],
                     },
         }}
-        positions = data['positions']
+        positions = decode(data['positions'], POSITION_SCHEMA)
         for position in positions:
             pos = {
-                "longQuantity" : eval(position['position']),
+                "longQuantity" : position['position'],
                 "symbol": position['ticker']["symbol"],
-                "marketValue": eval(position['marketValue']),
+                "marketValue": position['marketValue'],
                 "assetType": position['assetType'],
-                "averagePrice": eval(position['costPrice']),
-                "currentDayProfitLoss": eval(position['unrealizedProfitLoss']),
-                "currentDayProfitLossPercentage": float(eval(position['unrealizedProfitLoss']))/100,
+                "averagePrice": position['costPrice'],
+                "currentDayProfitLoss": position['unrealizedProfitLoss'],
+                "currentDayProfitLossPercentage": position['unrealizedProfitLoss']/100,
                 'instrument': {'symbol': position['ticker']["symbol"],
                                 'assetType': position['assetType'],
                                 }
@@ -90,53 +144,13 @@ class weBull:
                 return order_status, order_info
         return None, None
 
+    def order_view(self, order:dict)->LazyOrder:
+        """ Order in the format_order format, fields computed when read"""
+        return LazyOrder(decode(order, ORDER_SCHEMA), ORDER_FIELDS, broker=self.broker)
+
     def format_order(self, order:dict):
         """ output format for order_response. Order, mimicks the order_info from TDA API"""
-        stopPrice= order['orders'][0].get('stpPrice')
-        
-        price = order['orders'][0].get('avgFilledPrice')
-        if price is None:
-            price = order['orders'][0].get('lmtPrice')
-            
-        timestamp = int(order['orders'][0]['createTime0'])/1000
-
-        enteredTime = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S.%f')
-        timestamp = int(order['orders'][0]['updateTime0'])/1000
-        closeTime = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S.%f')
-        asset = order['orders'][0]['tickerType'].lower()
-        if asset == 'option':            
-            yer, mnt, day = order['orders'][0]['optionExpireDate'].split("-")
-            otype = order['orders'][0]['optionType'][0].upper()
-            symbol = f"{order['orders'][0]['symbol']}_{mnt}{day}{yer[2:]}{otype}{order['orders'][0]['optionExercisePrice']}".replace(".00","")
-            symbol = self.fix_symbol(symbol, "in")
-            orderStrategyType = order['optionStrategy'].upper()
-        else:
-            symbol = order['orders'][0]['symbol']
-            orderStrategyType= 'SINGLE'
-        status = order['status'].upper()
-        order_info = {
-            'status': status,
-            'action': order['orders'][0]['action'],
-            'asset': asset,
-            'symbol' : symbol,      
-            'quantity': eval(order['orders'][0]['totalQuantity']),
-            'filledQuantity': eval(order['orders'][0]['filledQuantity']),
-            'price': float(price) if price else float(order['auxPrice']),
-            'orderStrategyType': orderStrategyType,
-            "order_id" : order['orders'][0]['orderId'],
-            "orderId": order['orders'][0]['orderId'],
-            "stopPrice": stopPrice if stopPrice else None,
-            'orderType':  order['orders'][0]['orderType'],
-            'enteredTime': enteredTime,
-            "closeTime": closeTime,
-            'broker' : "weBull",
-            'orderLegCollection':[{
-                'instrument':{'symbol': symbol},
-                'instruction': order['orders'][0]['action'],
-                'quantity': eval(order['filledQuantity']),
-            }]             
-        }    
-        return order_info
+        return dict(self.order_view(order))
 
     def format_option(self, opt_ticker:str)->dict:
         """From ticker_monthdayyear[callput]strike to dict {ticker, year-month-day,optionType,strikePrice"""
@@ -163,23 +177,28 @@ class weBull:
 
     def get_option_id(self, symb:str):
         "Get option id from option symb with standard format"
-        if self.option_ids.get(symb) is None:
-            opt_info = self.format_option(symb)
-            if opt_info:
-                options_data = self.session.get_options(stock=opt_info['ticker'],
-                                                        direction=opt_info['direction'], 
-                                                        expireDate=opt_info['date'])
-                filtered_options_data = [option for option in options_data if option['strikePrice'] == opt_info['strike'] and \
-                    option[opt_info['direction']]['expireDate'] == opt_info['date']]
-                option_id = filtered_options_data[0][opt_info['direction']]['tickerId']
-                self.option_ids[symb] = str(option_id)
-                return option_id
-            else:
-                return None
-        else:
-            return self.option_ids[symb]
+        option_id = self.option_ids.get(symb)
+        if option_id is not None:
+            return option_id
+        opt_info = self.format_option(symb)
+        if not opt_info:
+            return None
+        options_data = self.session.get_options(stock=opt_info['ticker'],
+                                                direction=opt_info['direction'],
+                                                expireDate=opt_info['date'])
+        # cache every strike of the chain, neighbouring strikes are likely next
+        contracts = []
+        for option in options_data:
+            for direction in ['call', 'put']:
+                if direction in option and option[direction]['expireDate'] == opt_info['date']:
+                    contract = dict(opt_info, direction=direction, strike=option['strikePrice'])
+                    contracts.append((self.reformat_option(contract),
+                                      option[direction]['tickerId'], opt_info['date']))
+        self.option_ids.put_many(contracts)
+        return self.option_ids.get(symb)
 
-    def fix_symbol(self, symbol:str, direction:str):
+    @staticmethod
+    def fix_symbol(symbol:str, direction:str):
         "Fix symbol for options, direction in or out of webull format"
         if direction == 'in':
             return symbol.replace("SPXW", "SPX")
@@ -196,10 +215,11 @@ class weBull:
                     try:
                         option_id = self.get_option_id(symb)
                         quote = self.session.get_option_quote(stock=opt_info['ticker'], optionId=option_id)
-                        
+                        quote = decode(quote, OPTION_QUOTE_SCHEMA)
+
                         ts = quote['data'][0]['tradeStamp']
-                        ask = eval(quote['data'][0]['askList'][0]['price'])
-                        bid = eval(quote['data'][0]['bidList'][0]['price'])
+                        ask = quote['data'][0]['askList'][0]['price']
+                        bid = quote['data'][0]['bidList'][0]['price']
                         ticker = self.fix_symbol(self.reformat_option(opt_info), 'out')
                         
                         resp[ticker] = {
@@ -216,13 +236,13 @@ class weBull:
                                         'description':'Symbol not found'
                                         }
             else:
-                quote = self.session.get_quote(symb)
+                quote = decode(self.session.get_quote(symb), QUOTE_SCHEMA)
                 if quote and quote['template']=='stock':                
                     resp[symb] = {
                                 'symbol' : quote['symbol'],
                                 'description': quote['disSymbol'],
-                                'askPrice': eval(quote['askList'][0]['price']),
-                                'bidPrice': eval(quote['bidList'][0]['price']),
+                                'askPrice': quote['askList'][0]['price'],
+                                'bidPrice': quote['bidList'][0]['price'],
                                 'quoteTimeInLong': round(time.time()*1000),
                             }
                 else:
@@ -232,16 +252,34 @@ class weBull:
                                     }
         return resp
 
-    def get_orders(self, status:str='ALL'):
-        orders = self.session.get_history_orders()
-        if isinstance(orders, dict) and orders.get('success') is False:
-            raise ValueError("Order entpoint obsolete, go to webull/endpoints.py (actual webull package) line 144 and remove '&startTime=1970-0-1'")
-        
+    def get_orders(self, status:str='ALL', since:datetime=None, skip_ids=(),
+                   count:int=20, max_count:int=500):
+        """status: ALL, WORKING, FILLED, since: only orders updated from since on
+
+        Without since, the latest count orders, otherwise count grows until the
+        oldest order returned is before since, as the endpoint has no paging.
+        Orders with other status or with orderId in skip_ids are dropped before
+        building their order_view
+        """
+        while True:
+            orders = self.session.get_history_orders(status=status.capitalize(), count=count)
+            if isinstance(orders, dict) and orders.get('success') is False:
+                raise ValueError("Order entpoint obsolete, go to webull/endpoints.py (actual webull package) line 144 and remove '&startTime=1970-0-1'")
+            if since is None or len(orders) < count or count >= max_count:
+                break
+            if int(orders[-1]['orders'][0]['updateTime0']) < since.timestamp()*1000:
+                break
+            count = min(count*2, max_count)
+
         orders_all  = []
         for order in orders:
             if status != "ALL" and order['status'].upper() != status:
                 continue
-            orders_all.append(self.format_order(order))
+            if since is not None and int(order['orders'][0]['updateTime0']) < since.timestamp()*1000:
+                continue
+            if order['orders'][0]['orderId'] in skip_ids:
+                continue
+            orders_all.append(self.order_view(order))
         return orders_all
 
 if 0:
@@ -0,0 +1,100 @@
+""" Schema-driven decoding of the numeric string fields of Webull payloads
+
+Webull returns numbers as strings, e.g. "2" or "3.10". A schema maps field
+names to converters, nested dicts to a schema and lists to [schema], so
+every payload is decoded in one pass without eval. Fields not in the schema
+are kept as they are.
+"""
+from decimal import Decimal
+
+
+def number(value):
+    "int if the string is integral, float otherwise, None if empty"
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return float(value)
+    return value
+
+
+def integer(value):
+    if value is None or value == '':
+        return None
+    return int(value)
+
+
+def real(value):
+    if value is None or value == '':
+        return None
+    return float(value)
+
+
+def decimal(value):
+    "exact money values, for schemas that need them"
+    if value is None or value == '':
+        return None
+    return Decimal(value)
+
+
+PRICE_LEVEL = {'price': real, 'volume': number}
+
+ORDER_SCHEMA = {
+    'filledQuantity': number,
+    'auxPrice': real,
+    'orders': [{
+        'totalQuantity': number,
+        'filledQuantity': number,
+        'avgFilledPrice': real,
+        'lmtPrice': real,
+        'stpPrice': real,
+        'createTime0': integer,
+        'updateTime0': integer,
+        }],
+    }
+
+POSITION_SCHEMA = {
+    'position': number,
+    'marketValue': real,
+    'costPrice': real,
+    'unrealizedProfitLoss': real,
+    'unrealizedProfitLossRate': real,
+    }
+
+QUOTE_SCHEMA = {
+    'askList': [PRICE_LEVEL],
+    'bidList': [PRICE_LEVEL],
+    'close': real,
+    'pPrice': real,
+    }
+
+OPTION_QUOTE_SCHEMA = {
+    'data': [QUOTE_SCHEMA],
+    }
+
+
+def decode(payload, schema):
+    """Copy of payload with the schema fields converted
+
+    Parameters
+    ----------
+    payload : dict | list
+        Webull json payload, a list is decoded item by item
+    schema : dict | list | callable
+        field -> converter, nested schema or [schema]
+    """
+    if payload is None:
+        return None
+    if isinstance(schema, list):
+        return [decode(item, schema[0]) for item in payload]
+    if isinstance(schema, dict):
+        if isinstance(payload, list):
+            return [decode(item, schema) for item in payload]
+        out = dict(payload)
+        for key, field_schema in schema.items():
+            if key in out:
+                out[key] = decode(out[key], field_schema)
+        return out
+    return schema(payload)
@@ -1,47 +1,79 @@
 import os.path as op
 import sys
 import time
-import json
-import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 import re
-import queue
+import threading
 from tradealerter.configurator import cfg
-from tradealerter.brokerages import get_brokerage
+from tradealerter.brokerages import get_brokerages
+from tradealerter.order_journal import OrderJournal
+from tradealerter.portfolio_store import PortfolioStore
+from tradealerter.trade_table import TradeTable, Trade, Fill, isna
+from tradealerter.poll_scheduler import PollScheduler
+from tradealerter.alert_queue import AlertQueue
+from tradealerter.coalescer import Coalescer
+from tradealerter.metrics import metrics, stamp, fill_age_ns
 
 
 class orders_check():
     def __init__(self, 
-                 queue=queue.Queue(maxsize=10),
-                 order_fname = op.join(cfg['paths']['data'], "orders.json"),
-                 port_fname = op.join(cfg['paths']['data'], "portfolio.csv"),
+                 queue=None,
+                 order_fname=None,
+                 port_fname=None,
                  bksession=None
                  ):
+        # default files in the data folder of the config
+        if order_fname is None:
+            order_fname = op.join(cfg['paths']['data'], "orders.json")
+        if port_fname is None:
+            port_fname = op.join(cfg['paths']['data'], "portfolio.csv")
+        # portfolio is updated by the poller thread and by alert delivery callbacks
+        self.lock = threading.RLock()
         # load orders
         self.order_fname = order_fname
-        if op.exists(self.order_fname):    
-            with open(self.order_fname, 'r') as f:
-                self.orders = json.load(f)
-        else:
-            self.orders = []
+        self.journal = OrderJournal(
+            order_fname,
+            fsync=cfg['alert_configs'].get('journal_fsync', 'always'),
+            compact_every=int(cfg['alert_configs'].get('journal_compact_every', '1000')))
+        # index of processed orders, rejects already seen fills in O(1)
+        self.orders = []
+        self.seen_ids = set()
+        self.seen_by_broker = {}
+        self.last_close = {}
+        # brokers can report fills late, orders closed this many seconds
+        # before the last processed one are still checked against seen_ids
+        self.lookback = cfg.getfloat('polling', 'lookback', fallback=300)
+        for order in self.journal.load():
+            self.orders.append(order)
+            self._mark_seen(order)
         
-        # load portfolio
+        # load portfolio, the store keeps it up to date and portfolio.csv is an export
         self.port_fname = port_fname
-        if op.exists(self.port_fname):    
-            self.port = pd.read_csv(self.port_fname)
+        self.store = PortfolioStore(op.splitext(port_fname)[0] + ".db")
+        if len(self.store):
+            self.trades = TradeTable.from_rows(self.store.load_rows())
+        elif op.exists(self.port_fname):
+            import pandas as pd
+            self.trades = TradeTable.from_frame(pd.read_csv(self.port_fname))
+            self.store.save_all(self.port)
         else:
-            self.port = pd.DataFrame(columns=[
-                'date','symbol', "isopen", "broker", 'qty', 'avged', 'fills', 'price', 'ordID', 
-                'PnL', "PnL$", "PnLs", "PnLs$", "asset",
-                "STC-price", "STC-date", "STC-ordID", "STC-fills", "STC-qty", 
-                "STCs-price", "STCs-date", "STCs-ordID", "STCs-fills", "STCs-qty",
-                "avg_date", "avg_qty", "avg_price", "avg_ordID", 'BTO-n', 'STC-n', 'BTOs-sent', 'STCs-sent'])
+            self.trades = TradeTable()
+        self._index_open_trades()
         
+        # bksession is a brokerage class or a list of them, default brokerages in config
         if bksession is None:
-            self.bksession =  get_brokerage()
+            self.bksessions = get_brokerages()
+        elif isinstance(bksession, (list, tuple)):
+            self.bksessions = [bk() for bk in bksession]
         else:
-            self.bksession = bksession()
-        self.queue = queue
+            self.bksessions = [bksession()]
+        self.bksession = self.bksessions[0]
+        # alerts for the GUI or daemon, default one per checker with the config overflow policy
+        self.queue = AlertQueue.from_config() if queue is None else queue
+        # partial fills merged into one alert, off with a 0 window
+        window = cfg.getfloat('coalesce', 'window', fallback=0)
+        self.coalescer = Coalescer(window, cfg.getfloat('coalesce', 'max_delay', fallback=5)) \
+            if window > 0 else None
         
         # load previous orders, dont send them
         if not cfg['alert_configs'].getboolean('DEV'):
@@ -50,49 +82,174 @@ class orders_check():
     def check_orders(self, refresh_rate=1,
                      dev=False,                     
                      alert=True):
-        "Pool filled orders, generate alert and push it with date and inx to queue"
+        """Pool filled orders, generate alert and push it with date and inx to queue
+
+        refresh_rate is the poll interval in market hours, it is longer when
+        the market is closed and after errors, see PollScheduler
+        """
         n_errors = 0
+        scheduler = PollScheduler(
+            refresh_rate=refresh_rate,
+            extended_rate=cfg.getfloat('polling', 'extended_rate', fallback=5),
+            closed_rate=cfg.getfloat('polling', 'closed_rate', fallback=60),
+            max_backoff=cfg.getfloat('polling', 'max_backoff', fallback=120))
         if dev:
             self.orders = []
-        with open(op.join(cfg['paths']['data'],'webull_getorders_ts.txt'), 'a') as file:
+            self.seen_ids = set()
+            self.seen_by_broker = {}
+            self.last_close = {}
+        if len(self.bksessions) > 1:
+            # one poller per brokerage, a slow brokerage does not delay the others
+            import asyncio
+            from tradealerter.async_poller import AsyncPoller
+            poller = AsyncPoller(self, refresh_rate=refresh_rate)
+            asyncio.run(poller.run(dev, alert))
+            return
+        metrics_fname = self._metrics_fname()
+        try:
             while True:
+                error = False
+                t_start = time.monotonic()
                 try:
-                    t0 = datetime.now().strftime("%m/%d %H:%M:%S")
                     self._read_orders(dev, alert)
-                    t1 = datetime.now().strftime("%m/%d %H:%M:%S")
-                    iout = f'{t0},{t1}\n'                    
                 except Exception as e:
+                    error = True
                     n_errors += 1
                     print(f"Cauguth error num {n_errors}:", e)
-                    t1 = datetime.now().strftime("%m/%d %H:%M:%S")
-                    iout = f',{t1},error{n_errors}\n'
-                time.sleep(refresh_rate)
-                file.write(iout)
-                file.flush()
+                if metrics_fname:
+                    metrics.write_if_due(metrics_fname, cfg.getfloat('metrics', 'interval', fallback=10))
+                self._wait(scheduler.next_delay(time.monotonic() - t_start, error,
+                                                active=len(self.open_trades) > 0), dev, alert)
+        finally:
+            # held fills are seen already, they are only journaled once tracked
+            self.flush_coalesced(dev, alert)
+
+    def _wait(self, delay:float, dev, alert):
+        "Sleep delay seconds, processing the coalesced fills as they are due"
+        end = time.monotonic() + delay
+        while self.coalescer is not None and (self.coalescer.next_due() or end) < end:
+            time.sleep(max(0, self.coalescer.next_due() - time.monotonic()))
+            self._process_orders([], dev, alert)
+        time.sleep(max(0, end - time.monotonic()))
+
+    def _metrics_fname(self)->str:
+        "Prometheus text file of the alert latencies, None if disabled"
+        fname = cfg.get('metrics', 'file', fallback='metrics.prom')
+        if fname:
+            return op.join(cfg['paths']['data'], fname)
 
     
+    def _mark_seen(self, order:dict):
+        "Add order to the seen index and move the broker closeTime high-water mark"
+        # coalesced orders have the ids of all their fills
+        for order_id in order.get('order_ids', [order['order_id']]):
+            self.seen_ids.add((order['broker'], order_id))
+            self.seen_by_broker.setdefault(order['broker'], set()).add(order_id)
+        if order['closeTime'] > self.last_close.get(order['broker'], ""):
+            self.last_close[order['broker']] = order['closeTime']
+
+    def _new_orders(self, orders:list)->list:
+        """Get orders not processed yet, oldest first
+
+        Broker orders come most recent first, stop scanning once orders are
+        older than lookback seconds before the last processed closeTime of
+        the broker, late fills within it are kept if not seen.
+        """
+        new_orders, cutoffs = [], {}
+        for order in orders:
+            if order['broker'] not in cutoffs:
+                cutoffs[order['broker']] = self._cutoff(order['broker'])
+            if order['closeTime'] < cutoffs[order['broker']]:
+                break
+            if (order['broker'], order['order_id']) not in self.seen_ids:
+                new_orders.append(order)
+        return new_orders[-1::-1]
+
+    def _cutoff(self, broker:str)->str:
+        "closeTime lookback seconds before the last processed one of the broker"
+        last_close = self.last_close.get(broker)
+        if not last_close:
+            return ""
+        cutoff = datetime.strptime(last_close, "%Y-%m-%d %H:%M:%S.%f") - timedelta(seconds=self.lookback)
+        return cutoff.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+    def _skip_ids(self, bksession)->set:
+        "order ids already processed from the brokerage, dropped from the raw broker orders"
+        return self.seen_by_broker.get(getattr(bksession, 'broker', None), set())
+
+    def _since(self, bksession)->datetime:
+        "lookback seconds before the last processed closeTime of the brokerage, None to fetch all"
+        last_close = self.last_close.get(getattr(bksession, 'broker', None))
+        if last_close:
+            return datetime.strptime(last_close, "%Y-%m-%d %H:%M:%S.%f") - timedelta(seconds=self.lookback)
+
     def _read_orders(self, dev, alert):
-        et_orders = self.bksession.get_orders('FILLED')
-        for eto in et_orders[-1::-1]:                
-            if not len(self.orders) or eto['order_id'] not in [o['order_id'] for o in self.orders]:
-                _, trade_ix = self.track_portfolio(eto)                
-                if alert:
-                    alert = f"{self.make_alert(eto)}"
-                    self.queue.put([alert, eto['closeTime'], trade_ix])
-                self.orders.append(eto)
-                if dev:
-                    time.sleep(5)
-        # save pushed orders
-        if len(self.orders):
-            with open(self.order_fname, 'w') as f:
-                json.dump(self.orders, f)
+        for bksession in self.bksessions:
+            t_start = time.monotonic_ns()
+            orders = bksession.get_orders('FILLED', since=self._since(bksession),
+                                          skip_ids=self._skip_ids(bksession))
+            detected = time.monotonic_ns()
+            metrics.observe("tradealerter_poll_seconds", (detected - t_start) / 1e9,
+                            broker=getattr(bksession, 'broker', type(bksession).__name__))
+            self._process_orders(self._new_orders(orders), dev, alert, detected)
+
+    def _process_orders(self, new_orders:list, dev, alert, detected:int=None):
+        """Track new orders in portfolio, push alerts and save them
+
+        Alerts are pushed as [alert, closeTime, trade_ix, stamps], stamps has
+        the time.monotonic_ns() of each stage, from detected, the end of the
+        poll that found the order, and the fill age at detection in ns.
+
+        With a coalescer, alerted fills are held and the groups due are
+        processed as one order each, call with no orders to process them.
+        """
+        fills = []
+        for eto in new_orders:
+            stamps = {'detected': time.monotonic_ns() if detected is None else detected}
+            # brokers return lazy order views, build the full order once it is new
+            eto = dict(eto)
+            stamps['fill_age'] = fill_age_ns(eto['closeTime'])
+            metrics.observe("tradealerter_fill_to_detected_seconds", stamps['fill_age'] / 1e9,
+                            broker=eto['broker'])
+            fills.append((eto, stamps))
+        if self.coalescer is not None and alert:
+            # the coalescer is also flushed on shutdown from other threads
+            with self.lock:
+                for eto, stamps in fills:
+                    # seen while held, the next polls do not return it again
+                    self._mark_seen(eto)
+                    self.coalescer.add(eto, stamps)
+                fills = self.coalescer.pop_due()
+        for eto, stamps in fills:
+            self._track_order(eto, stamps, dev, alert)
+
+    def flush_coalesced(self, dev=False, alert=True):
+        "Process the fills held by the coalescer, due or not, call it before shutting down"
+        if self.coalescer is not None:
+            with self.lock:
+                fills = self.coalescer.pop_all()
+            for eto, stamps in fills:
+                self._track_order(eto, stamps, dev, alert)
+
+    def _track_order(self, eto:dict, stamps:dict, dev, alert):
+        with self.lock:
+            _, trade_ix = self.track_portfolio(eto)
+        stamp(stamps, 'tracked')
+        if alert:
+            alert = f"{self.make_alert(eto)}"
+            self.queue.put([alert, eto['closeTime'], trade_ix, stamp(stamps, 'enqueued')])
+        self.orders.append(eto)
+        self._mark_seen(eto)
+        # save pushed order
+        self.journal.append(eto)
+        if dev:
+            time.sleep(5)
 
     def make_alert(self, order:dict)->str:
         """ From order makes alert with format BTO|STC Qty Symbol [Strike] [Date] @ Price"""
         qty = order['quantity']
         price = order['price']
-        timestamp = int(order['orders'][0]['updateTime0'])/1000
-        closeTime = datetime.fromtimestamp(timestamp).strftime("%m/%d %H:%M:%S")
+        closeTime = datetime.strptime(order['closeTime'], "%Y-%m-%d %H:%M:%S.%f").strftime("%m/%d %H:%M:%S")
         if "_" in order['symbol']:
             # option
             act = order['action'].replace('BUY_OPEN', 'BTO').replace('SELL_CLOSE', 'STC').replace('BUY', 'BTO').replace('SELL', 'STC')
@@ -109,15 +266,22 @@ class orders_check():
     def extra_info_from_port():
         return
     
+    @property
+    def port(self):
+        "Portfolio as a DataFrame, built from the trades table on demand"
+        return self.trades.frame
+
+    def _index_open_trades(self):
+        "Index open trades by (broker, symbol), first open trade wins as in the portfolio"
+        self.open_trades = {}
+        for trade_ix in range(len(self.trades) - 1, -1, -1):
+            trade = self.trades[trade_ix]
+            if trade.isopen == 1:
+                self.open_trades[(trade.broker, trade.symbol)] = trade_ix
+
     def get_trade_ix(self, order):
-        open_trade = (self.port['symbol'] == order['symbol']) & \
-                     (self.port['isopen'] == 1) & \
-                     (self.port['broker'] == order['broker'])
-        if open_trade.any():
-            isopen, trade_ix = open_trade.any(), open_trade.idxmax()
-        else:
-            isopen, trade_ix = False, None
-        return isopen, trade_ix
+        trade_ix = self.open_trades.get((order['broker'], order['symbol']))
+        return trade_ix is not None, trade_ix
     
     def track_portfolio(self, order):
         "Track portfolio, update portfolio.csv"
@@ -142,150 +306,117 @@ class orders_check():
             trade_ix = None
         # save portfolio
         if port_info.get('message') != "STC order without BTO":
-            self.save_portfolio()
+            self.save_portfolio(trade_ix)
         
         return port_info, trade_ix
 
-    def save_portfolio(self):
-        self.port.to_csv(self.port_fname, index=False)
+    def save_portfolio(self, trade_ix=None):
+        """Persist trade trade_ix, if None persist all trades and export portfolio.csv"""
+        with self.lock:
+            if trade_ix is None:
+                self.store.save_all(self.port)
+                self.port.to_csv(self.port_fname, index=False)
+            else:
+                self.store.save_trade(trade_ix, self.trades[trade_ix].to_row())
+
+    def rebuild_portfolio(self, orders:list=None):
+        "Rebuild portfolio in batch from orders, by default from all processed orders"
+        from tradealerter import portfolio_rebuild
+        port = portfolio_rebuild.rebuild_portfolio(self.orders if orders is None else orders)
+        self.trades = TradeTable.from_frame(port)
+        self._index_open_trades()
+        self.store.clear()
+        self.save_portfolio()
+
+    def mark_sent(self, trade_ix:int, action:str):
+        "Count a sent BTO or STC alert of a trade"
+        with self.lock:
+            trade = self.trades[trade_ix]
+            if action == 'BTO':
+                trade.btos_sent = 1 if isna(trade.btos_sent) else trade.btos_sent + 1
+            else:
+                trade.stcs_sent = 1 if isna(trade.stcs_sent) else trade.stcs_sent + 1
+            self.trades.touch(trade_ix)
         
     def do_BTO(self, order):
         "Make BUY order in portfolio"
-        new_trade = {'date': order['closeTime'],
-             'isopen': 1,
-             'symbol': order['symbol'],
-             'asset': order['asset'],
-             'broker': order['broker'],
-             'qty': order['quantity'],
-             'fills': order['filledQuantity'],
-             'price': order['price'],
-             'ordID': order['order_id'],
-             'BTO-n' : 1,
-             'BTOs-sent':0,
-             'STCs-sent':0,
-             }
-        self.port = pd.concat([self.port, pd.DataFrame(new_trade, index=[0])], ignore_index=True)
-        return new_trade
+        bto = Fill(order['closeTime'], order['quantity'], order['price'], order['order_id'],
+                   order['filledQuantity'])
+        trade = Trade(order['symbol'], order['broker'], order['asset'], bto)
+        trade_ix = self.trades.append(trade)
+        self.open_trades[(order['broker'], order['symbol'])] = trade_ix
+        return trade.to_row()
 
     def do_BTO_avg(self, order, trade_ix):
         "Make BUY order in portfolio"
-        trade = self.port.loc[trade_ix]
+        trade = self.trades[trade_ix]
         
-        n_avg = 0  if pd.isna(trade['avged']) else trade['avged']
-        n_fills = int(0 if pd.isna(trade['fills']) else trade['fills'])
-        qty = 0 if pd.isna(trade['qty']) else trade['qty']
+        n_avg = 0  if isna(trade.avged) else trade.avged
+        n_fills = int(0 if isna(trade.fills) else trade.fills)
+        qty = 0 if isna(trade.qty) else trade.qty
         assert  n_fills == qty, f"Trade {order['symbol']} not filled yet but new avg added"
-        price = (trade['price'] * trade['fills'] + order['price'] * order['filledQuantity'])/\
-                    (trade['fills'] + order['filledQuantity'])
+        price = (trade.price * trade.fills + order['price'] * order['filledQuantity'])/\
+                    (trade.fills + order['filledQuantity'])
         
-        avg_trade = {
-                    'avged': int(n_avg + 1),
-                    'avg_date': self.combine_prevs(trade_ix, order['closeTime'], 'date', 'avg_date'),
-                    'avg_qty':  self.combine_prevs(trade_ix, order['quantity'], 'qty', 'avg_qty'),
-                    "avg_price": self.combine_prevs(trade_ix, order['price'], 'price', 'avg_price'),
-                    "avg_ordID": self.combine_prevs(trade_ix, order['order_id'], 'ordID', 'avg_ordID'),
-                    'qty': qty + order['quantity'],
-                    'fills': n_fills + int(order['filledQuantity']), 
-                    'price': round(price, 2), 
-                    'ordID': order['order_id'],
-                    'BTO-n' : trade['BTO-n'] + 1,
-                    }
-        for k, v in avg_trade.items():
-            self.port.loc[trade_ix, k] = v
+        trade.btos.append(Fill(order['closeTime'], order['quantity'], order['price'],
+                               order['order_id'], order['filledQuantity']))
+        trade.avged = int(n_avg + 1)
+        trade.qty = qty + order['quantity']
+        trade.fills = n_fills + int(order['filledQuantity'])
+        trade.price = round(price, 2)
+        trade.bto_n += 1
+        self.trades.touch(trade_ix)
         
-        return avg_trade
+        row = trade.to_row()
+        return {k: row[k] for k in ['avged', 'avg_date', 'avg_qty', 'avg_price', 'avg_ordID',
+                                    'qty', 'fills', 'price', 'ordID', 'BTO-n']}
 
     def do_STC(self, order, trade_ix):
         "Make SELL order in portfolio"
-        trade = self.port.loc[trade_ix]
+        trade = self.trades[trade_ix]
 
         stc_price = order['price']
         stc_date = order['closeTime']
         stc_fills = order['filledQuantity']
         stc_qty = order['quantity']
-        pnlq_mult = 1 if trade['asset'] == 'option' else .1
+        pnlq_mult = 1 if trade.asset == 'option' else .1
 
-        if pd.isna(trade['STC-price']):
+        if not len(trade.stcs):
             # First STC for the trade
-            stc_trade = {
-                'STC-price': stc_price,
-                'STC-date': stc_date,
-                'STC-ordID': order['order_id'],
-                'STC-fills': stc_fills,
-                'STC-qty': stc_qty 
-                }
-            for k, v in stc_trade.items():
-                self.port.loc[trade_ix, k] = v
-
-            # Calculate PnL
-            trade = self.port.loc[trade_ix]
-            pnl_perc = (trade['STC-price'] - trade['price']) / trade['price'] * 100
-            pnl_dollar = round(pnl_perc* trade['price'] * trade['STC-qty']*pnlq_mult, 2)
-            stc_trade['PnL'] = round(pnl_perc, 2)
-            stc_trade['PnL$'] = pnl_dollar
-            stc_trade['STC-n'] = 1
-            self.port.loc[trade_ix, 'PnL'] = stc_trade['PnL']
-            self.port.loc[trade_ix, 'PnL$'] = stc_trade['PnL$']
-            self.port.loc[trade_ix, 'STC-n'] = stc_trade['STC-n']
-            
+            pnl_perc = (stc_price - trade.price) / trade.price * 100
+            trade.stc_price = stc_price
+            trade.stc_fills = stc_fills
+            trade.stc_qty = stc_qty
+            trade.pnl = round(pnl_perc, 2)
+            trade.pnl_usd = round(pnl_perc* trade.price * stc_qty*pnlq_mult, 2)
+            trade.stc_n = 1
+            keys = ['STC-price', 'STC-date', 'STC-ordID', 'STC-fills', 'STC-qty',
+                    'PnL', 'PnL$', 'STC-n']
         else:
             # Multiple STCs for the trade, calculate average values
-            prev_stc_price = trade['STC-price']
-            prev_stc_fills = trade['STC-fills']
-            prev_stc_qty = trade['STC-qty']
-            tot_fills = prev_stc_fills + stc_fills
-            avg_price = (prev_stc_price * prev_stc_fills + stc_price * stc_fills) / tot_fills
-            curr_pnl = (stc_price - trade['price'])/trade['price'] * 100            
-            curr_pnlq = curr_pnl * trade['price'] * stc_qty * pnlq_mult
-            pnl = (avg_price - trade['price'])/trade['price'] * 100 
-            # save multiple stcs values
-            stc_trade = {
-                'STCs-date':self.combine_prevs(trade_ix, stc_date, 'STC-date', 'STCs-date'),
-                'STCs-qty': self.combine_prevs(trade_ix, stc_qty, 'STC-qty', 'STCs-qty'),
-                'STCs-price': self.combine_prevs(trade_ix, stc_price, 'STC-price', 'STCs-price'),
-                'STCs-ordID': self.combine_prevs(trade_ix, order['order_id'],'STC-ordID', 'STCs-ordID'),
-                'STCs-fills': self.combine_prevs(trade_ix, order['filledQuantity'],'STC-fills', 'STCs-fills'),
-                'PnLs': self.combine_prevs(trade_ix, round(curr_pnl,2),'PnL', 'PnLs'),
-                'PnLs$': self.combine_prevs(trade_ix, round(curr_pnlq,2),'PnL$', 'PnLs$'),    
-                'STC-price': avg_price,
-                'STC-date': stc_date,
-                'STC-ordID': order['order_id'],
-                'STC-fills': tot_fills,
-                'STC-qty': prev_stc_qty + stc_qty,   
-                'PnL': round(pnl,2),
-                'PnL$': round(pnl * trade['price'] * (prev_stc_qty + stc_qty) * pnlq_mult,2),
-                'STC-n': trade['STC-n'] + 1  
-                }
-            for k, v in stc_trade.items():
-                self.port.loc[trade_ix, k] = v
-
-        return stc_trade
-    
-    
-    def combine_prevs(self, trade_ix:int, new_val, col_main:str, col_cum:str)->str:
-        """Combine previous values in portfolio when multiple bto/stc
-
-        Parameters
-        ----------
-        trade_ix : int
-            index of trade in portfolio
-        new_val : str|numeric
-            new value to be added
-        col_main : str
-            column name with avergaed values
-        col_cum : str
-            column name with cummulative values
-
-        Returns
-        -------
-        str
-            combined values
-        """
+            tot_fills = trade.stc_fills + stc_fills
+            avg_price = (trade.stc_price * trade.stc_fills + stc_price * stc_fills) / tot_fills
+            curr_pnl = (stc_price - trade.price)/trade.price * 100            
+            pnl = (avg_price - trade.price)/trade.price * 100 
+            trade.stc_price = avg_price
+            trade.stc_fills = tot_fills
+            trade.stc_qty = trade.stc_qty + stc_qty
+            trade.pnl = round(pnl,2)
+            trade.pnl_usd = round(pnl * trade.price * trade.stc_qty * pnlq_mult,2)
+            trade.stc_n += 1
+            keys = ['STCs-date', 'STCs-qty', 'STCs-price', 'STCs-ordID', 'STCs-fills',
+                    'PnLs', 'PnLs$', 'STC-price', 'STC-date', 'STC-ordID', 'STC-fills',
+                    'STC-qty', 'PnL', 'PnL$', 'STC-n']
+            pnl_perc = curr_pnl
+        trade.stcs.append(Fill(stc_date, stc_qty, stc_price, order['order_id'], stc_fills,
+                               round(pnl_perc, 2), round(pnl_perc* trade.price * stc_qty*pnlq_mult, 2)))
 
-        trade = self.port.loc[trade_ix]
-        if pd.isna(trade[col_cum]):
-            return f"{trade[col_main]},{new_val}"
-        else:
-            return f"{trade[col_cum]},{new_val}"
-            
-        
+        # close trade once all bought contracts are sold
+        if trade.stc_fills >= trade.fills:
+            trade.isopen = 0
+            keys.append('isopen')
+            del self.open_trades[(order['broker'], order['symbol'])]
+        self.trades.touch(trade_ix)
+
+        row = trade.to_row()
+        return {k: row[k] for k in keys}
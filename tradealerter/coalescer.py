@@ -0,0 +1,103 @@
+""" Merge bursts of partial fills into one order before tracking and alerting"""
+import time
+from tradealerter.metrics import metrics, stamp
+
+
+def merge_fills(orders:list)->dict:
+    """One order from fills of the same broker, symbol and action, oldest first
+
+    Quantities are added, the price is the filled quantity weighted average
+    and closeTime is the one of the last fill. order_id is the one of the
+    first fill, order_ids has all of them.
+    """
+    if len(orders) == 1:
+        return orders[0]
+    merged = dict(orders[0])
+    filled = sum(o['filledQuantity'] for o in orders)
+    merged['quantity'] = sum(o['quantity'] for o in orders)
+    merged['filledQuantity'] = filled
+    merged['price'] = round(sum(o['price'] * o['filledQuantity'] for o in orders) / filled, 4)
+    merged['closeTime'] = orders[-1]['closeTime']
+    merged['order_ids'] = [o['order_id'] for o in orders]
+    return merged
+
+
+class Coalescer():
+    """Hold fills of the same broker, symbol and action until none came for window seconds
+
+    A group of fills is due window seconds after its last fill, and at most
+    max_delay seconds after its first one, so bursts add a bounded latency.
+    A fill of the other action of the symbol closes the group, later fills
+    start a new one, so a group never spans a BTO and the STC closing it.
+
+    Parameters
+    ----------
+    window : float
+        seconds without a new fill of the group before it is due
+    max_delay : float
+        max seconds a fill is held
+    """
+    def __init__(self, window:float=1, max_delay:float=5):
+        self.window = window
+        self.max_delay = max_delay
+        # key -> [first seen, due, [(order, stamps)]], in first seen order,
+        # closed groups are kept under their key plus a sequence number
+        self._groups = {}
+        self._n_closed = 0
+
+    def __len__(self):
+        return len(self._groups)
+
+    def add(self, order:dict, stamps:dict, now:float=None):
+        now = time.monotonic() if now is None else now
+        key = (order['broker'], order['symbol'], order['action'])
+        if key in self._groups and any(
+                k[:2] == key[:2] and k[2] != key[2] and g[0] >= self._groups[key][0]
+                for k, g in self._groups.items()):
+            # an opposite fill came after the open group, close it
+            self._n_closed += 1
+            self._groups[key + (self._n_closed,)] = self._groups.pop(key)
+        group = self._groups.get(key)
+        if group is None:
+            self._groups[key] = [now, now + min(self.window, self.max_delay), [(order, stamps)]]
+        else:
+            group[1] = min(now + self.window, group[0] + self.max_delay)
+            group[2].append((order, stamps))
+
+    def next_due(self)->float:
+        "time.monotonic() when the next group is due, None if none held"
+        return min((group[1] for group in self._groups.values()), default=None)
+
+    def pop_due(self, now:float=None)->list:
+        """Merged (order, stamps) of the groups due, by closeTime of their first fill
+
+        Groups of the same symbol held since before a due group are popped
+        with it, a BTO is tracked before the STC that closes it.
+        """
+        now = time.monotonic() if now is None else now
+        due = [key for key, group in self._groups.items() if group[1] <= now]
+        if not due:
+            return []
+        # per broker and symbol, first seen time of the last due group
+        due_since = {}
+        for key in due:
+            due_since[key[:2]] = max(due_since.get(key[:2], 0), self._groups[key][0])
+        keys = [key for key, group in self._groups.items()
+                if key in due or group[0] <= due_since.get(key[:2], -1)]
+        return self._pop(keys)
+
+    def pop_all(self)->list:
+        "Merged (order, stamps) of every group held, by closeTime of their first fill"
+        return self._pop(list(self._groups))
+
+    def _pop(self, keys:list)->list:
+        merged = []
+        for key in keys:
+            fills = self._groups.pop(key)[2]
+            orders = sorted((order for order, _ in fills), key=lambda o: o['closeTime'])
+            # stamps of the first fill detected, its latency includes the time held
+            stamps = stamp(dict(fills[0][1]), 'coalesced')
+            if len(fills) > 1:
+                metrics.inc("tradealerter_coalesced_fills_total", len(fills) - 1, broker=key[0])
+            merged.append((orders[0]['closeTime'], merge_fills(orders), stamps))
+        return [(order, stamps) for _, order, stamps in sorted(merged, key=lambda m: m[0])]
@@ -1,21 +1,59 @@
 import configparser
 import os
 import sys
+import threading
 import os.path as op
 
 package_dir = os.path.abspath(os.path.dirname(__file__))
 # package_dir = op.abspath(op.dirname(sys.executable))
 
-config_path = package_dir + '/config.ini'
-if not os.path.exists(config_path):
-    print("\033[91mWARNING: tradealerter/config.ini not found. \033[0m")
-    print("\033[91mWARNING: Rename tradealerter/config_example.ini to tradealerter/config.ini. \033[0m")
-    print("\033[91mWARNING: Reverting to config_example.ini for now (might be necessary for testing). \033[0m")
-    config_path = package_dir + '/config_example.ini'
-
-# load configuration file
-cfg = configparser.ConfigParser()
-cfg.read(config_path, encoding='utf-8')
-cfg['paths']= {'root': package_dir,
-               'data': op.join(package_dir,'data')}
-os.makedirs(op.join(cfg['paths']['data']), exist_ok=True)
\ No newline at end of file
+
+def load_config()->configparser.ConfigParser:
+    "Read config.ini, or config_example.ini if missing, and make the data folder"
+    config_path = package_dir + '/config.ini'
+    if not os.path.exists(config_path):
+        print("\033[91mWARNING: tradealerter/config.ini not found. \033[0m")
+        print("\033[91mWARNING: Rename tradealerter/config_example.ini to tradealerter/config.ini. \033[0m")
+        print("\033[91mWARNING: Reverting to config_example.ini for now (might be necessary for testing). \033[0m")
+        config_path = package_dir + '/config_example.ini'
+
+    # load configuration file
+    config = configparser.ConfigParser()
+    config.read(config_path, encoding='utf-8')
+    config['paths']= {'root': package_dir,
+                      'data': op.join(package_dir,'data')}
+    os.makedirs(op.join(config['paths']['data']), exist_ok=True)
+    return config
+
+
+class LazyConfig():
+    "ConfigParser that is loaded on first use, so importing modules does not read the config"
+    def __init__(self, loader=load_config):
+        self._loader = loader
+        self._config = None
+        self._lock = threading.Lock()
+
+    def _get(self)->configparser.ConfigParser:
+        if self._config is None:
+            with self._lock:
+                if self._config is None:
+                    self._config = self._loader()
+        return self._config
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __getitem__(self, key):
+        return self._get()[key]
+
+    def __setitem__(self, key, value):
+        self._get()[key] = value
+
+    def __contains__(self, key):
+        return key in self._get()
+
+    def __iter__(self):
+        return iter(self._get())
+
+
+cfg = LazyConfig()
@@ -0,0 +1,199 @@
+""" Headless alerter: order poller, alert dispatch and a local HTTP API
+
+    tradealerter-daemon [--host 127.0.0.1] [--port 8765] [--dev]
+
+API:
+    GET  /alerts              recent alerts, most recent first
+    POST /alerts/<id>/send    send an alert, optional json {"extra": "text to append"}
+    GET  /portfolio[?open=1]  portfolio trades
+    GET  /metrics             alert latencies, Prometheus text format
+    GET  /health
+"""
+import argparse
+import json
+import queue
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from tradealerter.configurator import cfg
+from tradealerter.alert_policy import alert_status, delivery_status, send_order
+from tradealerter.metrics import metrics, stamp
+
+
+class AlertDaemon():
+    """Run orders_check and send its alerts without a GUI
+
+    Parameters
+    ----------
+    ord_checker : orders_check
+        default one with the brokerages of the config
+    dispatcher : AlertDispatcher
+        default one with the sinks of the config
+    host, port : str, int
+        address of the local API, port 0 picks a free port
+    n_alerts : int
+        number of recent alerts kept
+    """
+    def __init__(self, ord_checker=None, dispatcher=None, host:str='127.0.0.1', port:int=8765,
+                 n_alerts:int=100):
+        if ord_checker is None:
+            from tradealerter.check_orders import orders_check
+            ord_checker = orders_check()
+        if dispatcher is None:
+            from tradealerter.alert_router import make_dispatcher
+            dispatcher = make_dispatcher()
+        self.ord_checker = ord_checker
+        self.dispatcher = dispatcher
+        self.alerts = deque(maxlen=n_alerts)
+        self.n_alerts = 0
+        self.lock = threading.Lock()
+        self.on_status = delivery_status(ord_checker, lambda order: None)
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.alerter = self
+        self._stop = threading.Event()
+        self._threads = []
+
+    @property
+    def address(self)->tuple:
+        return self.server.server_address
+
+    def handle_alert(self, alert:str, date:str, port_ix, stamps:dict=None):
+        "Keep a new alert and send it if the send policy says so"
+        status = alert_status(self.ord_checker, alert, port_ix)
+        if status is None:
+            print("skipping as not in port", alert)
+            return
+        with self.lock:
+            order = {'id': self.n_alerts, 'alert': alert, 'date': date, 'port_ix': port_ix,
+                     'status': status, 'stamps': stamps}
+            self.n_alerts += 1
+            self.alerts.appendleft(order)
+        if status == "do_send":
+            extra = cfg['alert_configs']['string_add_to_alert']
+            self.send(order['id'], extra)
+        return order
+
+    def send(self, alert_id:int, extra:str=""):
+        "Send a kept alert, None if it is not kept anymore"
+        with self.lock:
+            order = next((o for o in self.alerts if o['id'] == alert_id), None)
+            if order is None:
+                return None
+            if extra:
+                order['alert'] += f" {extra}"
+        return send_order(order, self.dispatcher, self.on_status)
+
+    def recent_alerts(self)->list:
+        with self.lock:
+            return [dict(order) for order in self.alerts]
+
+    def portfolio(self, only_open:bool=False)->list:
+        with self.ord_checker.lock:
+            port = self.ord_checker.port
+            if only_open:
+                port = port[port['isopen'] == 1]
+            port = port.astype(object).where(port.notna(), None)
+            trades = port.to_dict(orient='records')
+        for ix, trade in zip(port.index, trades):
+            trade['ix'] = int(ix)
+        return trades
+
+    def _consume(self):
+        "Handle the alerts pushed by the order checker"
+        while not self._stop.is_set():
+            try:
+                alert, date, port_ix, stamps = self.ord_checker.queue.get(timeout=.5)
+            except queue.Empty:
+                continue
+            try:
+                self.handle_alert(alert, date, port_ix, stamp(stamps, 'dequeued'))
+            except Exception as e:
+                print("Error handling alert", alert, e)
+
+    def start(self, poll:bool=True, dev:bool=False):
+        "Start the poller, the alert consumer and the API in daemon threads"
+        targets = [self._consume, self.server.serve_forever]
+        if poll:
+            targets.append(lambda: self.ord_checker.check_orders(1, dev))
+        for target in targets:
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print("tradealerter API at http://%s:%d" % self.address)
+
+    def stop(self, timeout:float=5):
+        # fills held by the coalescer are lost if not tracked now
+        self.ord_checker.flush_coalesced()
+        self._stop.set()
+        self.server.shutdown()
+        self.server.server_close()
+        self.dispatcher.close(timeout=timeout)
+        self.ord_checker.save_portfolio()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _reply(self, status:int, body, content_type:str="application/json"):
+        data = body.encode() if isinstance(body, str) else json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        alerter = self.server.alerter
+        url = urlparse(self.path)
+        if url.path == '/health':
+            self._reply(200, {'status': 'ok'})
+        elif url.path == '/alerts':
+            self._reply(200, alerter.recent_alerts())
+        elif url.path == '/portfolio':
+            only_open = parse_qs(url.query).get('open', ['0'])[0] not in ['0', 'false']
+            self._reply(200, alerter.portfolio(only_open))
+        elif url.path == '/metrics':
+            self._reply(200, metrics.prometheus(), "text/plain; version=0.0.4")
+        else:
+            self._reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        parts = urlparse(self.path).path.strip('/').split('/')
+        if len(parts) != 3 or parts[0] != 'alerts' or parts[2] != 'send' or not parts[1].isdigit():
+            self._reply(404, {'error': 'not found'})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length)) if length else {}
+        except json.JSONDecodeError:
+            self._reply(400, {'error': 'invalid json'})
+            return
+        order = self.server.alerter.send(int(parts[1]), body.get('extra', ''))
+        if order is None:
+            self._reply(404, {'error': 'alert not found'})
+        else:
+            self._reply(202, dict(order))
+
+    def log_message(self, *args):
+        pass
+
+
+def main(argv:list=None):
+    parser = argparse.ArgumentParser(description="Send trade alerts from order fills, without GUI")
+    parser.add_argument('--host', default=cfg.get('daemon', 'host', fallback='127.0.0.1'))
+    parser.add_argument('--port', type=int, default=cfg.getint('daemon', 'port', fallback=8765))
+    parser.add_argument('--dev', action='store_true', default=cfg['alert_configs'].getboolean('DEV'))
+    args = parser.parse_args(argv)
+
+    alerter = AlertDaemon(host=args.host, port=args.port)
+    alerter.start(dev=args.dev)
+    try:
+        alerter._stop.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        alerter.stop()
+
+
+if __name__ == '__main__':
+    main()
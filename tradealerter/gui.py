@@ -1,14 +1,13 @@
 """ GUI for showing new orders"""
 import threading
 import queue
-from queue import Empty
 from datetime import datetime
 import PySimpleGUI as sg
-import time
-import pandas as pd
-from discord_webhook import DiscordWebhook
 from tradealerter.check_orders import orders_check
+from tradealerter.alert_router import make_dispatcher
+from tradealerter.alert_policy import alert_status, delivery_status, send_order
 from tradealerter.configurator import cfg
+from tradealerter.metrics import stamp
 
 
 DEV = cfg['alert_configs'].getboolean('DEV')
@@ -43,73 +42,45 @@ def layout():
     layout = [[tab_group]]
     return layout
 
-def send_order(order, port):  
-    sent = False
-    if len(cfg['discord']['webhook']):
-        print("webhook alert sending at", datetime.now().strftime("%m/%d %H:%M:%S"))
-        webhook = DiscordWebhook(
-            url=cfg['discord']['webhook'], 
-            username=cfg['discord']['webhook_name'], 
-            content= order['alert'], 
-            rate_limit_retry=True)
-        response = webhook.execute()
-        print("webhook alert sent at", datetime.now().strftime("%m/%d %H:%M:%S"), "response:", response)
-        sent = True
-    
-    if sent:
-        order['status'] = 'Sent'
-        if order['alert'].startswith('BTO'):
-            port.loc[order['port_ix'], 'BTOs-sent'] += 1
-        elif order['alert'].startswith('STC'):
-            port.loc[order['port_ix'], 'STCs-sent'] += 1
-    return order
+
+def forward_alerts(orders_queue:queue.Queue, window:sg.Window):
+    "Hand the alerts of the order checker to the window as -ALERT- events"
+    while True:
+        window.write_event_value('-ALERT-', orders_queue.get())
 
 
 def gui():
-    orders_queue = queue.Queue(maxsize=20) # list with alert, date and port ix
-    ord_checker = orders_check(orders_queue)
+    ord_checker = orders_check()
+    orders_queue = ord_checker.queue # list with alert, date, port ix and stage stamps
     thread_orders = threading.Thread(target=ord_checker.check_orders, args=(1, DEV,), daemon=True)
 
     window = sg.Window('Trade Alerter', layout(), resizable=True, finalize=True)
+    # alerts are sent from the dispatcher threads, the event loop never waits on the network
+    dispatcher = make_dispatcher()
+    on_status = delivery_status(ord_checker, lambda order: window.write_event_value('-STATUS-', order))
+    # threads wake the event loop with events, it blocks until there is one
+    thread_alerts = threading.Thread(target=forward_alerts, args=(orders_queue, window), daemon=True)
 
     thread_orders.start()
+    thread_alerts.start()
     last_items = []
     # Event Loop
     while True:
-        event, values = window.read(1)
+        event, values = window.read()
 
         # If user closes window or clicks cancel
         if event == sg.WINDOW_CLOSED:
             break
 
-        try:
-            new_order, date, port_ix = orders_queue.get(False)
-            if port_ix is None and not cfg['alert_configs'].getboolean('send_all_BTOs'):
+        if event == '-ALERT-':
+            new_order, date, port_ix, stamps = values['-ALERT-']
+            stamp(stamps, 'dequeued')
+            status = alert_status(ord_checker, new_order, port_ix)
+            if status is None:
                 print("skipping as not in port", new_order)
                 continue
-            trade = ord_checker.port.loc[port_ix]
-            if new_order.startswith("BTO"):
-                if cfg['alert_configs'].getboolean('send_all_BTOs'):
-                    status = "do_send"
-                elif (pd.Series(trade['BTOs-sent']) - trade['BTO-n']).lt(0).all():
-                    status = "Send"
-                else:
-                    status = "Sent"
-            elif new_order.startswith("STC"):
-                # send all STC
-                if cfg['alert_configs'].getboolean('send_all_BTOs'):
-                    status = "do_send"
-                # if not sent but BTO not sent           
-                elif pd.isna(trade['BTOs-sent']):
-                    status = "Send"
-                # if not sent but BTO already sent
-                elif (pd.Series(trade['STCs-sent']) - trade['STC-n']).lt(0).all() and \
-                    (pd.Series(trade['BTOs-sent']) - trade['BTO-n']).ge(0).all():
-                    status = "do_send"
-                else:
-                    status = "Send"
-            
-            order = {'alert': new_order, 'date': reformat_date(date), 'port_ix': port_ix, 'status': status}
+            order = {'alert': new_order, 'date': reformat_date(date), 'port_ix': port_ix, 'status': status,
+                     'stamps': stamps}
             last_items.insert(0,order)
         
             for i in range(min([len(last_items),NORDERS])):
@@ -118,37 +89,44 @@ def gui():
                 window[f'-COPY{i}-'].update(visible=True)
                 window[f'-ORDER{i}-'].update(visible=True,value=last_items[i]['alert'], text_color =color, background_color='white')
                 window[f'-DATE{i}-'].update(visible=True,value=last_items[i]['date'])                
-                window[f'-SEND{i}-'].update(visible=True, disabled=(status=='Sent'), text=status)                
+                window[f'-SEND{i}-'].update(visible=True, disabled=(status in ['Sent', 'Sending']), text=status)
                 if status == "do_send":
                     last_items[i]['alert'] += f" {values[f'-APPEND_EXTRA']}"
-                    last_items[i] = send_order(last_items[i], ord_checker.port)
-                    ord_checker.save_portfolio()
+                    last_items[i] = send_order(last_items[i], dispatcher, on_status)
                     status = last_items[i]['status']
-                    window[f'-SEND{i}-'].update(visible=True, disabled=(status=='Sent'), text=status)
-                window.refresh()
-                
-        except Empty:
-            pass
+                    window[f'-SEND{i}-'].update(visible=True, disabled=(status in ['Sent', 'Sending']), text=status)
+            window.refresh()
+
+        # delivery status of a sent alert
+        elif event == '-STATUS-':
+            order = values['-STATUS-']
+            for index, item in enumerate(last_items[:NORDERS]):
+                if item is order:
+                    window[f'-SEND{index}-'].update(disabled=(order['status'] in ['Sent', 'Sending']),
+                                                    text=order['status'])
         
         # If send button is clicked
-        if event.startswith('-SEND'):
+        elif event.startswith('-SEND'):
             # Get the index of the clicked button to retrieve the order
             index = int(event[-2]) 
             last_items[index]['alert'] += f" {values[f'-APPEND_EXTRA']}"
-            last_items[index] = send_order(last_items[index], ord_checker.port)
-            ord_checker.save_portfolio()
-            status = last_items[i]['status']
-            window[f'-SEND{index}-'].update(disabled=(status=='Sent'), text=status)
+            last_items[index] = send_order(last_items[index], dispatcher, on_status)
+            status = last_items[index]['status']
+            window[f'-SEND{index}-'].update(disabled=(status in ['Sent', 'Sending']), text=status)
             window.refresh()
         
         # If copy button is clicked
-        if event.startswith('-COPY'):
+        elif event.startswith('-COPY'):
             # Get the index of the clicked button
             index = int(event[5:-1])  
             # If there's at leaast nth order, copy to clipboard
             if len(last_items) and len(last_items) >= index:  
                 sg.clipboard_set(last_items[index]['alert'])  
 
+    dispatcher.close(timeout=5)
+    # fills held by the coalescer are lost if not tracked now
+    ord_checker.flush_coalesced()
+    ord_checker.save_portfolio()
     window.close()
 
 if __name__ == '__main__':
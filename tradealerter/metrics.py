@@ -0,0 +1,158 @@
+""" Alert latency per stage, exported as Prometheus summaries
+
+Every alert carries a dict of stage -> time.monotonic_ns() stamps, from the
+poll that detected the fill to the webhook response, and the broker fill
+age at detection. Durations between stages are kept per metric and
+exported with their p50, p95 and p99 to a Prometheus text file, or served
+by the daemon at /metrics.
+"""
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+QUANTILES = (.5, .95, .99)
+# consecutive stages of an alert, the time between them is a metric
+STAGES = ('detected', 'coalesced', 'tracked', 'enqueued', 'dequeued', 'sent')
+CLOSE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def stamp(stamps:dict, stage:str)->dict:
+    "Stamp stage with the monotonic time in ns"
+    stamps[stage] = time.monotonic_ns()
+    return stamps
+
+
+def fill_age_ns(close_time:str)->int:
+    "ns between the broker fill time and now, from the closeTime of an order"
+    fill = datetime.strptime(close_time, CLOSE_FORMAT).timestamp()
+    return int((time.time() - fill) * 1e9)
+
+
+def _quantile(values:list, q:float)->float:
+    "Quantile of sorted values, nearest rank"
+    return values[min(len(values) - 1, max(0, int(round(q * len(values))) - 1))]
+
+
+def _key(name:str, labels:dict)->tuple:
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+
+def _labels(labels:tuple, extra:str="")->str:
+    label_str = ",".join(filter(None, [",".join(f'{k}="{v}"' for k, v in labels), extra]))
+    return f"{{{label_str}}}" if label_str else ""
+
+
+class Metrics():
+    """Durations in seconds per metric name and labels, plus gauges and counters
+
+    Parameters
+    ----------
+    window : int
+        observations kept per metric for the quantiles
+    """
+    def __init__(self, window:int=1000):
+        self.window = window
+        self._values = {}
+        self._count = {}
+        self._sum = {}
+        self._gauges = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._last_write = 0
+
+    def observe(self, name:str, seconds:float, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = deque(maxlen=self.window)
+                self._count[key], self._sum[key] = 0, 0.
+            self._values[key].append(seconds)
+            self._count[key] += 1
+            self._sum[key] += seconds
+
+    def set(self, name:str, value:float, **labels):
+        "Set a gauge"
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def inc(self, name:str, n:int=1, **labels):
+        "Add n to a counter"
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def value(self, name:str, **labels):
+        "Value of a gauge or counter, None if never set"
+        key = _key(name, labels)
+        with self._lock:
+            return self._gauges.get(key, self._counters.get(key))
+
+    def observe_stages(self, stamps:dict, **labels):
+        """Observe the time between consecutive stamped stages of an alert
+
+        The fill age and the end to end fill to sent time are also observed
+        when stamped.
+        """
+        previous = None
+        for stage in STAGES:
+            if stage not in stamps:
+                continue
+            if previous is not None:
+                self.observe(f"tradealerter_{previous}_to_{stage}_seconds",
+                             (stamps[stage] - stamps[previous]) / 1e9, **labels)
+            previous = stage
+        if 'fill_age' in stamps and 'sent' in stamps and 'detected' in stamps:
+            self.observe("tradealerter_fill_to_sent_seconds",
+                         (stamps['fill_age'] + stamps['sent'] - stamps['detected']) / 1e9, **labels)
+
+    def summary(self, name:str, **labels)->dict:
+        "quantile -> seconds, plus count and sum"
+        key = _key(name, labels)
+        with self._lock:
+            values = sorted(self._values.get(key, []))
+            out = {'count': self._count.get(key, 0), 'sum': self._sum.get(key, 0.)}
+        for q in QUANTILES:
+            out[q] = _quantile(values, q) if values else float('nan')
+        return out
+
+    def prometheus(self)->str:
+        "Metrics in the Prometheus text format, durations as summaries"
+        with self._lock:
+            keys = sorted(self._values)
+            gauges = sorted(self._gauges.items())
+            counters = sorted(self._counters.items())
+        lines, typed = [], set()
+        for name, labels in keys:
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            summary = self.summary(name, **dict(labels))
+            for q in QUANTILES:
+                q_label = f'quantile="{q}"'
+                lines.append(f"{name}{_labels(labels, q_label)} {summary[q]:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {summary['count']}")
+            lines.append(f"{name}_sum{_labels(labels)} {summary['sum']:.6f}")
+        for kind, values in [('gauge', gauges), ('counter', counters)]:
+            for (name, labels), value in values:
+                if name not in typed:
+                    lines.append(f"# TYPE {name} {kind}")
+                    typed.add(name)
+                lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, fname:str):
+        "Write the Prometheus text file, atomically for scrapers"
+        tmp = fname + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, fname)
+        self._last_write = time.monotonic()
+
+    def write_if_due(self, fname:str, interval:float=10):
+        if time.monotonic() - self._last_write >= interval:
+            self.write(fname)
+
+
+metrics = Metrics()
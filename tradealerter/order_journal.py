@@ -0,0 +1,98 @@
+""" Append-only journal of processed orders, one json per line"""
+import os
+import time
+import json
+
+
+class OrderJournal():
+    """Append-only JSON-lines journal of processed orders
+
+    Parameters
+    ----------
+    fname : str
+        path of the journal file, legacy files with a json list are read
+        and converted to json lines on the first write
+    fsync : str|float
+        'always' to fsync after every append, 'never' to leave it to the OS,
+        or the minimum number of seconds between fsyncs
+    compact_every : int
+        rewrite the journal without duplicated or corrupted lines after
+        this many appends, 0 to never compact
+    """
+    def __init__(self, fname:str, fsync='always', compact_every:int=1000):
+        self.fname = fname
+        self.fsync = fsync
+        self.compact_every = compact_every
+        self.n_appends = 0
+        self._last_fsync = 0
+        self._file = None
+        self._legacy = self._is_legacy()
+
+    def _is_legacy(self)->bool:
+        "Legacy orders.json files are a single json list"
+        if not os.path.exists(self.fname):
+            return False
+        with open(self.fname, 'r') as f:
+            for line in f:
+                if line.strip():
+                    return line.lstrip().startswith('[')
+        return False
+
+    def load(self):
+        "Stream orders from the journal, oldest first"
+        if not os.path.exists(self.fname):
+            return
+        with open(self.fname, 'r') as f:
+            if self._legacy:
+                yield from json.load(f)
+                return
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # torn write from a crash, only possible in the last line
+                    print("Skipping corrupted line in", self.fname)
+
+    def append(self, order:dict):
+        "Write one order to the journal"
+        if self._legacy:
+            self.compact()
+        if self._file is None:
+            self._file = open(self.fname, 'a')
+        self._file.write(json.dumps(order) + '\n')
+        self._file.flush()
+        self._sync()
+        self.n_appends += 1
+        if self.compact_every and self.n_appends % self.compact_every == 0:
+            self.compact()
+
+    def _sync(self):
+        if self.fsync == 'never':
+            return
+        now = time.monotonic()
+        if self.fsync == 'always' or now - self._last_fsync >= float(self.fsync):
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+    def compact(self):
+        "Rewrite the journal without duplicated or corrupted lines"
+        orders = {}
+        for order in self.load():
+            orders[(order['order_id'], order['closeTime'])] = order
+        self.close()
+        tmp_fname = self.fname + '.tmp'
+        with open(tmp_fname, 'w') as f:
+            for order in orders.values():
+                f.write(json.dumps(order) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_fname, self.fname)
+        self._legacy = False
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
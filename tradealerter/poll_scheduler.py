@@ -0,0 +1,86 @@
+""" Polling interval for check_orders, adapted to market hours, errors and latency"""
+import random
+from datetime import datetime, time as dtime
+try:
+    from zoneinfo import ZoneInfo
+    MARKET_TZ = ZoneInfo("America/New_York")
+except Exception:
+    # no tz database (e.g. windows without tzdata), always poll as in session
+    MARKET_TZ = None
+
+
+class PollScheduler():
+    """Decide how long to wait before the next broker poll
+
+    Parameters
+    ----------
+    refresh_rate : float
+        seconds between polls during regular market hours, or in extended
+        hours while there are open trades
+    extended_rate : float
+        seconds between polls in pre/after market without open trades
+    closed_rate : float
+        seconds between polls when the market is closed
+    max_backoff : float
+        maximum seconds to wait after consecutive errors
+    """
+    def __init__(self, refresh_rate:float=1, extended_rate:float=5, closed_rate:float=60,
+                 max_backoff:float=120, latency_alpha:float=.2):
+        self.refresh_rate = refresh_rate
+        self.extended_rate = extended_rate
+        self.closed_rate = closed_rate
+        self.max_backoff = max_backoff
+        self.latency_alpha = latency_alpha
+        self.latency = None
+        self.n_errors = 0
+
+    def session(self, now:datetime=None)->str:
+        "'regular', 'extended' or 'closed' market session"
+        if MARKET_TZ is None:
+            return 'regular'
+        now = now or datetime.now(MARKET_TZ)
+        if now.tzinfo is not None:
+            now = now.astimezone(MARKET_TZ)
+        if now.weekday() >= 5:
+            return 'closed'
+        if dtime(9, 30) <= now.time() < dtime(16):
+            return 'regular'
+        if dtime(4) <= now.time() < dtime(20):
+            return 'extended'
+        return 'closed'
+
+    def interval(self, active:bool=False, now:datetime=None)->float:
+        "Seconds between the start of two polls"
+        session = self.session(now)
+        if session == 'regular' or (session == 'extended' and active):
+            return self.refresh_rate
+        elif session == 'extended':
+            return self.extended_rate
+        return self.closed_rate
+
+    def next_delay(self, duration:float, error:bool=False, active:bool=False,
+                   now:datetime=None)->float:
+        """Seconds to sleep after a poll
+
+        Parameters
+        ----------
+        duration : float
+            seconds the poll took, subtracted from the interval
+        error : bool
+            if the poll failed, consecutive errors back off exponentially
+            with jitter, never polling faster than the session interval
+        active : bool
+            if there are open trades or working orders
+        """
+        if error:
+            self.n_errors += 1
+            backoff = min(self.max_backoff, self.refresh_rate * 2 ** self.n_errors)
+            return max(self.interval(active, now), random.uniform(backoff / 2, backoff))
+        self.n_errors = 0
+        if self.latency is None:
+            self.latency = duration
+        else:
+            self.latency += self.latency_alpha * (duration - self.latency)
+        # no point in polling faster than the broker answers
+        interval = max(self.interval(active, now), self.latency)
+        return max(0, interval - duration)
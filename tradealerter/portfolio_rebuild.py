@@ -0,0 +1,172 @@
+""" Batch rebuild of the portfolio from the full order history"""
+import numpy as np
+import pandas as pd
+from tradealerter.portfolio_store import PORT_COLUMNS
+
+
+def _round(values:np.ndarray, ndigits:int=2)->np.ndarray:
+    "Python round, np.round can differ on ties"
+    return np.array([round(v, ndigits) for v in values.tolist()], dtype=float)
+
+
+def _join(events:pd.DataFrame, col:str)->pd.Series:
+    "Comma join the values of each trade as the legacy portfolio columns"
+    return events[col].map("{}".format).groupby(events['trade'], sort=False).agg(",".join)
+
+
+def rebuild_portfolio(orders:list)->pd.DataFrame:
+    """Rebuild the portfolio from orders, same output as tracking them one by one
+
+    Orders are grouped by (broker, symbol) and the i-th order of every group
+    is processed at once, so the python loop runs over the longest order
+    sequence of a symbol instead of over every order.
+
+    Parameters
+    ----------
+    orders : list
+        orders in the format_order format, in the order they were filled
+
+    Returns
+    -------
+    pd.DataFrame
+        portfolio with the portfolio.csv columns
+    """
+    if not len(orders):
+        return pd.DataFrame(columns=PORT_COLUMNS, dtype=object)
+    ords = pd.DataFrame(orders, dtype=object)
+    action = ords['action'].astype(str)
+    is_buy = action.str.startswith('BUY')
+    is_sell = action.str.startswith('SELL')
+    keep = (ords['status'].astype(str).str.upper() == 'FILLED') & (is_buy | is_sell)
+    ords, is_buy = ords[keep].reset_index(drop=True), is_buy[keep].to_numpy()
+    n_ords = len(ords)
+    if not n_ords:
+        return pd.DataFrame(columns=PORT_COLUMNS, dtype=object)
+
+    qty = ords['quantity'].to_numpy(dtype=float)
+    fills = ords['filledQuantity'].to_numpy(dtype=float)
+    price = ords['price'].to_numpy(dtype=float)
+    mult = np.where(ords['asset'].to_numpy() == 'option', 1, .1)
+    group = ords.groupby(['broker', 'symbol'], sort=False).ngroup().to_numpy()
+    rank = ords.groupby(group).cumcount().to_numpy()
+
+    # state of the open trade of each group and of every trade
+    g_open = np.zeros(group.max() + 1, dtype=bool)
+    g_trade = np.full(group.max() + 1, -1)
+    t_seq = np.zeros(n_ords, dtype=int)
+    t_mult = np.zeros(n_ords)
+    t_qty, t_fills, t_price, t_avged = np.zeros(n_ords), np.zeros(n_ords), np.zeros(n_ords), np.zeros(n_ords)
+    t_stc_price, t_stc_fills, t_stc_qty = np.zeros(n_ords), np.zeros(n_ords), np.zeros(n_ords)
+    t_pnl, t_pnl_usd, t_stc_n = np.zeros(n_ords), np.zeros(n_ords), np.zeros(n_ords, dtype=int)
+    # trade of each order, -1 if ignored, and PnL of STCs
+    o_trade = np.full(n_ords, -1)
+    o_pnl, o_pnl_usd = np.full(n_ords, np.nan), np.full(n_ords, np.nan)
+
+    n_trades = 0
+    order_by_rank = np.argsort(rank, kind='stable')
+    steps = np.split(order_by_rank, np.cumsum(np.bincount(rank))[:-1])
+    for ix in steps:
+        g = group[ix]
+        is_open = g_open[g]
+
+        # BTO
+        new = ix[is_buy[ix] & ~is_open]
+        if len(new):
+            tid = np.arange(n_trades, n_trades + len(new))
+            n_trades += len(new)
+            g_trade[group[new]] = tid
+            g_open[group[new]] = True
+            o_trade[new] = tid
+            t_seq[tid] = new
+            t_mult[tid] = mult[new]
+            t_qty[tid], t_fills[tid], t_price[tid] = qty[new], fills[new], price[new]
+
+        # BTO average
+        avg = ix[is_buy[ix] & is_open]
+        if len(avg):
+            tid = g_trade[group[avg]]
+            o_trade[avg] = tid
+            avg_price = (t_price[tid] * t_fills[tid] + price[avg] * fills[avg]) / \
+                        (t_fills[tid] + fills[avg])
+            t_avged[tid] += 1
+            t_qty[tid] += qty[avg]
+            t_fills[tid] = np.trunc(t_fills[tid]) + np.trunc(fills[avg])
+            t_price[tid] = _round(avg_price)
+
+        # STC, sells without an open trade are ignored
+        stc = ix[~is_buy[ix] & is_open]
+        if len(stc):
+            tid = g_trade[group[stc]]
+            o_trade[stc] = tid
+            curr_pnl = (price[stc] - t_price[tid]) / t_price[tid] * 100
+            o_pnl[stc] = _round(curr_pnl)
+            o_pnl_usd[stc] = _round(curr_pnl * t_price[tid] * qty[stc] * t_mult[tid])
+
+            first = t_stc_n[tid] == 0
+            tot_fills = t_stc_fills[tid] + fills[stc]
+            stc_price = np.where(first, price[stc],
+                                 (t_stc_price[tid] * t_stc_fills[tid] + price[stc] * fills[stc]) / tot_fills)
+            t_stc_price[tid] = stc_price
+            t_stc_fills[tid] = tot_fills
+            t_stc_qty[tid] += qty[stc]
+            t_stc_n[tid] += 1
+            pnl = (stc_price - t_price[tid]) / t_price[tid] * 100
+            t_pnl[tid] = _round(pnl)
+            t_pnl_usd[tid] = _round(pnl * t_price[tid] * t_stc_qty[tid] * t_mult[tid])
+
+            # close trades once all bought contracts are sold
+            closed = t_stc_fills[tid] >= t_fills[tid]
+            g_open[group[stc[closed]]] = False
+
+    # trades in the order they were opened
+    trade_order = np.argsort(t_seq[:n_trades], kind='stable')
+    tids = np.arange(n_trades)[trade_order]
+    opening = t_seq[tids]
+    is_open = np.zeros(n_trades, dtype=bool)
+    is_open[g_trade[g_open]] = True
+
+    ords['trade'] = o_trade
+    ords['pnl'], ords['pnl_usd'] = o_pnl, o_pnl_usd
+    events = ords[o_trade >= 0]
+    btos, stcs = events[is_buy[o_trade >= 0]], events[~is_buy[o_trade >= 0]]
+    last_bto = btos.groupby('trade').last()
+    last_stc = stcs.groupby('trade').last()
+
+    def nan_if(values, mask):
+        return np.where(mask, np.nan, values).astype(object)
+
+    port = pd.DataFrame(index=tids, columns=PORT_COLUMNS, dtype=object)
+    port['date'] = ords['closeTime'].to_numpy()[opening]
+    port['symbol'] = ords['symbol'].to_numpy()[opening]
+    port['isopen'] = is_open[tids].astype(int)
+    port['broker'] = ords['broker'].to_numpy()[opening]
+    port['asset'] = ords['asset'].to_numpy()[opening]
+    port['qty'] = t_qty[tids]
+    port['avged'] = nan_if(t_avged[tids], t_avged[tids] == 0)
+    port['fills'] = t_fills[tids]
+    port['price'] = t_price[tids]
+    port['ordID'] = last_bto['order_id']
+    port['BTO-n'] = t_avged[tids] + 1
+    port['BTOs-sent'] = 0
+    port['STCs-sent'] = 0
+
+    no_stc = t_stc_n[tids] == 0
+    port['STC-price'] = nan_if(t_stc_price[tids], no_stc)
+    port['STC-date'] = last_stc['closeTime']
+    port['STC-ordID'] = last_stc['order_id']
+    port['STC-fills'] = nan_if(t_stc_fills[tids], no_stc)
+    port['STC-qty'] = nan_if(t_stc_qty[tids], no_stc)
+    port['PnL'] = nan_if(t_pnl[tids], no_stc)
+    port['PnL$'] = nan_if(t_pnl_usd[tids], no_stc)
+    port['STC-n'] = nan_if(t_stc_n[tids], no_stc)
+
+    avged = t_avged[tids] > 0
+    for col, ord_col in [('avg_date', 'closeTime'), ('avg_qty', 'quantity'),
+                         ('avg_price', 'price'), ('avg_ordID', 'order_id')]:
+        port.loc[avged, col] = _join(btos, ord_col)
+    multi_stc = t_stc_n[tids] > 1
+    for col, ord_col in [('STCs-date', 'closeTime'), ('STCs-qty', 'quantity'),
+                         ('STCs-price', 'price'), ('STCs-ordID', 'order_id'),
+                         ('STCs-fills', 'filledQuantity'), ('PnLs', 'pnl'), ('PnLs$', 'pnl_usd')]:
+        port.loc[multi_stc, col] = _join(stcs, ord_col)
+    return port.reset_index(drop=True).astype(object)
@@ -0,0 +1,101 @@
+""" SQLite store of the portfolio, persists one trade row per fill"""
+import math
+import sqlite3
+import threading
+
+
+PORT_COLUMNS = [
+    'date','symbol', "isopen", "broker", 'qty', 'avged', 'fills', 'price', 'ordID',
+    'PnL', "PnL$", "PnLs", "PnLs$", "asset",
+    "STC-price", "STC-date", "STC-ordID", "STC-fills", "STC-qty",
+    "STCs-price", "STCs-date", "STCs-ordID", "STCs-fills", "STCs-qty",
+    "avg_date", "avg_qty", "avg_price", "avg_ordID", 'BTO-n', 'STC-n', 'BTOs-sent', 'STCs-sent']
+
+
+def isna(value)->bool:
+    "pd.isna for scalars that also accepts missing row values, without importing pandas"
+    if value is None:
+        return True
+    if isinstance(value, float):
+        return math.isnan(value)
+    if isinstance(value, (str, int)):
+        return False
+    import pandas as pd
+    return bool(pd.isna(value))
+
+
+def _to_sql_value(value):
+    "Convert numpy and pandas scalars to values sqlite understands"
+    if isna(value):
+        return None
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+class PortfolioStore():
+    """Portfolio table keyed by trade index
+
+    Each fill rewrites only the row of the trade it belongs to, so the cost
+    of saving does not grow with the number of trades.
+    """
+    def __init__(self, fname:str, columns:list=PORT_COLUMNS):
+        self.fname = fname
+        self.columns = columns
+        self._lock = threading.Lock()
+        self.con = sqlite3.connect(fname, check_same_thread=False)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        cols = ", ".join(f'"{c}"' for c in columns)
+        self.con.execute(f"CREATE TABLE IF NOT EXISTS trades (ix INTEGER PRIMARY KEY, {cols})")
+        self.con.commit()
+        self._upsert = f"INSERT OR REPLACE INTO trades (ix, {cols}) VALUES " + \
+                       f"({', '.join('?' * (len(columns) + 1))})"
+
+    def __len__(self):
+        return self.con.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+
+    def _row_values(self, trade_ix:int, trade)->list:
+        return [int(trade_ix)] + [_to_sql_value(trade.get(c)) for c in self.columns]
+
+    def save_trade(self, trade_ix:int, trade):
+        "Persist a single trade, trade is a dict or a portfolio row"
+        with self._lock:
+            self.con.execute(self._upsert, self._row_values(trade_ix, trade))
+            self.con.commit()
+
+    def save_all(self, port):
+        "Persist every trade of the portfolio"
+        with self._lock:
+            self.con.executemany(self._upsert, [self._row_values(ix, trade)
+                                                for ix, trade in port.iterrows()])
+            self.con.commit()
+
+    def clear(self):
+        with self._lock:
+            self.con.execute("DELETE FROM trades")
+            self.con.commit()
+
+    def load_rows(self)->list:
+        "Trades as dicts with the portfolio.csv columns, in index order"
+        with self._lock:
+            cursor = self.con.execute("SELECT * FROM trades ORDER BY ix")
+            names = [d[0] for d in cursor.description]
+            rows = [dict(zip(names, values)) for values in cursor.fetchall()]
+        for row in rows:
+            del row['ix']
+        return rows
+
+    def load(self):
+        "Replay the store into a portfolio with the portfolio.csv columns"
+        import pandas as pd
+        with self._lock:
+            port = pd.read_sql_query("SELECT * FROM trades ORDER BY ix", self.con, index_col='ix')
+        port.index.name = None
+        return port
+
+    def export_csv(self, fname:str):
+        self.load().to_csv(fname, index=False)
+
+    def close(self):
+        self.con.close()
@@ -0,0 +1,94 @@
+""" Quotes of a brokerage with a per-symbol cache and concurrent fetches"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class QuoteService():
+    """Serve bksession.get_quotes with a per-symbol TTL cache
+
+    Symbols not cached are fetched in one call if the brokerage has a bulk
+    quotes endpoint (bulk_quotes attribute, e.g. TDA), otherwise one call
+    per symbol in a thread pool. A symbol already being fetched for another
+    caller is waited for instead of requested again.
+
+    Parameters
+    ----------
+    bksession : BaseBroker
+        brokerage with get_quotes(list) -> {symbol: quote}
+    ttl : float
+        seconds a quote is served from the cache
+    max_workers : int
+        concurrent get_quotes calls
+    timeout : float
+        seconds to wait for a quote
+    """
+    def __init__(self, bksession, ttl:float=2, max_workers:int=8, timeout:float=10):
+        self.bksession = bksession
+        self.ttl = ttl
+        self.timeout = timeout
+        self.bulk = getattr(bksession, 'bulk_quotes', False)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='quotes')
+        self._cache = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get_quotes(self, symbols:list)->dict:
+        "Quotes {symbol: quote}, symbols that could not be fetched are left out"
+        quotes, pending, to_fetch = {}, {}, []
+        now = time.monotonic()
+        with self._lock:
+            for symbol in dict.fromkeys(symbols):
+                cached = self._cache.get(symbol)
+                if cached is not None and now - cached[0] < self.ttl:
+                    quotes[symbol] = cached[1]
+                elif symbol in self._inflight:
+                    pending[symbol] = self._inflight[symbol]
+                else:
+                    pending[symbol] = self._inflight[symbol] = Future()
+                    to_fetch.append(symbol)
+
+        if self.bulk and to_fetch:
+            self.executor.submit(self._fetch, to_fetch)
+        else:
+            for symbol in to_fetch:
+                self.executor.submit(self._fetch, [symbol])
+
+        for symbol, future in pending.items():
+            try:
+                quotes[symbol] = future.result(self.timeout)
+            except Exception as e:
+                print("Could not get quote for", symbol, e)
+        return quotes
+
+    def get_quote(self, symbol:str):
+        "Quote of one symbol, None if it could not be fetched"
+        return self.get_quotes([symbol]).get(symbol)
+
+    def _fetch(self, symbols:list):
+        "Get quotes from the brokerage, cache them and resolve their futures"
+        try:
+            resp = self.bksession.get_quotes(symbols)
+            if len(symbols) == 1 and len(resp) == 1 and symbols[0] not in resp:
+                # brokers can reformat the symbol, e.g. weBull SPX options
+                resp = {symbols[0]: next(iter(resp.values()))}
+            error = None
+        except Exception as e:
+            resp, error = {}, e
+        now = time.monotonic()
+        with self._lock:
+            for symbol in symbols:
+                future = self._inflight.pop(symbol)
+                if symbol in resp:
+                    self._cache[symbol] = (now, resp[symbol])
+                    future.set_result(resp[symbol])
+                else:
+                    future.set_exception(error or KeyError(f"{symbol} not in quotes"))
+
+    def clear(self):
+        "Drop cached quotes"
+        with self._lock:
+            self._cache.clear()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
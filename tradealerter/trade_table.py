@@ -0,0 +1,226 @@
+""" Portfolio trades kept as records, the DataFrame is built on demand"""
+from tradealerter.portfolio_store import PORT_COLUMNS, isna
+
+
+def _parse(value:str):
+    "Parse a value of the legacy comma joined columns"
+    for typ in (int, float):
+        try:
+            return typ(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _split(row:dict, col:str)->list:
+    return [_parse(v) for v in str(row[col]).split(",")]
+
+
+def _join(values)->str:
+    return ",".join(f"{v}" for v in values)
+
+
+class Fill():
+    "A BTO or STC fill of a trade, STC fills also keep their PnL"
+    __slots__ = ('date', 'qty', 'price', 'ordID', 'fills', 'pnl', 'pnl_usd')
+
+    def __init__(self, date, qty, price, ordID, fills=None, pnl=None, pnl_usd=None):
+        self.date = date
+        self.qty = qty
+        self.price = price
+        self.ordID = ordID
+        self.fills = fills
+        self.pnl = pnl
+        self.pnl_usd = pnl_usd
+
+
+class Trade():
+    """A trade of the portfolio, BTO and STC fills are kept in lists
+
+    The legacy portfolio.csv columns, with multiple fills as comma joined
+    strings, are only made by `to_row`.
+    """
+    __slots__ = ('symbol', 'broker', 'asset', 'isopen', 'qty', 'fills', 'price', 'avged',
+                 'bto_n', 'stc_price', 'stc_fills', 'stc_qty', 'pnl', 'pnl_usd', 'stc_n',
+                 'btos_sent', 'stcs_sent', 'btos', 'stcs')
+
+    def __init__(self, symbol, broker, asset, bto:Fill, isopen=1, btos_sent=0, stcs_sent=0):
+        self.symbol = symbol
+        self.broker = broker
+        self.asset = asset
+        self.isopen = isopen
+        self.qty = bto.qty
+        self.fills = bto.fills
+        self.price = bto.price
+        self.avged = None
+        self.bto_n = 1
+        self.stc_price = None
+        self.stc_fills = None
+        self.stc_qty = None
+        self.pnl = None
+        self.pnl_usd = None
+        self.stc_n = None
+        self.btos_sent = btos_sent
+        self.stcs_sent = stcs_sent
+        self.btos = [bto]
+        self.stcs = []
+
+    def to_row(self)->dict:
+        "Trade in the portfolio.csv columns, without missing values"
+        row = {
+            'date': self.btos[0].date,
+            'symbol': self.symbol,
+            'isopen': self.isopen,
+            'broker': self.broker,
+            'qty': self.qty,
+            'avged': self.avged,
+            'fills': self.fills,
+            'price': self.price,
+            'ordID': self.btos[-1].ordID,
+            'asset': self.asset,
+            'BTO-n': self.bto_n,
+            'BTOs-sent': self.btos_sent,
+            'STCs-sent': self.stcs_sent,
+            }
+        if len(self.btos) > 1:
+            row.update({
+                'avg_date': _join(f.date for f in self.btos),
+                'avg_qty': _join(f.qty for f in self.btos),
+                'avg_price': _join(f.price for f in self.btos),
+                'avg_ordID': _join(f.ordID for f in self.btos),
+                })
+        if len(self.stcs):
+            row.update({
+                'STC-price': self.stc_price,
+                'STC-date': self.stcs[-1].date,
+                'STC-ordID': self.stcs[-1].ordID,
+                'STC-fills': self.stc_fills,
+                'STC-qty': self.stc_qty,
+                'PnL': self.pnl,
+                'PnL$': self.pnl_usd,
+                'STC-n': self.stc_n,
+                })
+        if len(self.stcs) > 1:
+            row.update({
+                'STCs-date': _join(f.date for f in self.stcs),
+                'STCs-qty': _join(f.qty for f in self.stcs),
+                'STCs-price': _join(f.price for f in self.stcs),
+                'STCs-ordID': _join(f.ordID for f in self.stcs),
+                'STCs-fills': _join(f.fills for f in self.stcs),
+                'PnLs': _join(f.pnl for f in self.stcs),
+                'PnLs$': _join(f.pnl_usd for f in self.stcs),
+                })
+        return {k: v for k, v in row.items() if not isna(v)}
+
+    @classmethod
+    def from_row(cls, row:dict):
+        "Make trade from a row with the portfolio.csv columns"
+        row = {k: v for k, v in row.items() if not isna(v)}
+        if 'avg_date' in row:
+            btos = [Fill(*vals, fills=vals[1]) for vals in zip(
+                _split(row, 'avg_date'), _split(row, 'avg_qty'),
+                _split(row, 'avg_price'), _split(row, 'avg_ordID'))]
+        else:
+            btos = [Fill(row.get('date'), row.get('qty'), row.get('price'), row.get('ordID'),
+                         row.get('fills'))]
+        trade = cls(row.get('symbol'), row.get('broker'), row.get('asset'), btos[0],
+                    isopen=row.get('isopen'), btos_sent=row.get('BTOs-sent'),
+                    stcs_sent=row.get('STCs-sent'))
+        trade.btos = btos
+        trade.qty = row.get('qty')
+        trade.fills = row.get('fills')
+        trade.price = row.get('price')
+        trade.avged = row.get('avged')
+        trade.bto_n = row.get('BTO-n', len(btos))
+
+        if 'STCs-date' in row:
+            trade.stcs = [Fill(*vals) for vals in zip(
+                _split(row, 'STCs-date'), _split(row, 'STCs-qty'), _split(row, 'STCs-price'),
+                _split(row, 'STCs-ordID'), _split(row, 'STCs-fills'), _split(row, 'PnLs'),
+                _split(row, 'PnLs$'))]
+        elif 'STC-date' in row:
+            trade.stcs = [Fill(row['STC-date'], row.get('STC-qty'), row.get('STC-price'),
+                               row.get('STC-ordID'), row.get('STC-fills'), row.get('PnL'),
+                               row.get('PnL$'))]
+        trade.stc_price = row.get('STC-price')
+        trade.stc_fills = row.get('STC-fills')
+        trade.stc_qty = row.get('STC-qty')
+        trade.pnl = row.get('PnL')
+        trade.pnl_usd = row.get('PnL$')
+        trade.stc_n = row.get('STC-n', len(trade.stcs) or None)
+        return trade
+
+
+class TradeTable():
+    """Trades as a list of Trade records with a lazily built DataFrame
+
+    New trades are appended to a list and changed trades are marked dirty,
+    the DataFrame only gets the pending rows when `frame` is read. Appending
+    a trade does not copy the portfolio, the frame rows are kept in a buffer
+    grown geometrically so reading it after each append is amortized O(1).
+    """
+    def __init__(self, columns:list=PORT_COLUMNS):
+        self.columns = columns
+        self.rows = []
+        # pandas is only imported once the frame is read
+        self._buffer = None
+        self._n_framed = 0
+        self._frame = None
+        self._dirty = set()
+
+    @classmethod
+    def from_frame(cls, port, columns:list=PORT_COLUMNS):
+        "Make table from a portfolio DataFrame with a 0 to n index"
+        return cls.from_rows((row.to_dict() for _, row in port.iterrows()), columns)
+
+    @classmethod
+    def from_rows(cls, rows, columns:list=PORT_COLUMNS):
+        "Make table from portfolio rows as dicts, in index order"
+        table = cls(columns)
+        for row in rows:
+            table.append(Trade.from_row(row))
+        return table
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, trade_ix:int)->Trade:
+        return self.rows[trade_ix]
+
+    def append(self, trade:Trade)->int:
+        "Add a new trade, returns its index"
+        self.rows.append(trade)
+        return len(self.rows) - 1
+
+    def touch(self, trade_ix:int):
+        "Mark a trade as changed"
+        if trade_ix < self._n_framed:
+            self._dirty.add(trade_ix)
+
+    def _values(self, trade_ixs)->list:
+        rows = [self.rows[ix].to_row() for ix in trade_ixs]
+        return [[row.get(c, float('nan')) for c in self.columns] for row in rows]
+
+    @property
+    def frame(self):
+        "Portfolio DataFrame, adds pending trades and updates"
+        import pandas as pd
+        n_rows = len(self.rows)
+        if self._frame is not None and self._n_framed == n_rows and not self._dirty:
+            return self._frame
+        # without a view of the buffer left, writing to it does not copy it
+        self._frame = None
+        if self._buffer is None or not self._n_framed:
+            self._buffer = pd.DataFrame(self._values(range(n_rows)), columns=self.columns,
+                                        dtype=object)
+        else:
+            if n_rows > len(self._buffer):
+                self._buffer = self._buffer.reindex(range(max(n_rows, 2 * len(self._buffer))))
+            if self._n_framed < n_rows:
+                self._buffer.iloc[self._n_framed:n_rows] = self._values(range(self._n_framed, n_rows))
+            for trade_ix in self._dirty:
+                self._buffer.iloc[trade_ix] = self._values([trade_ix])[0]
+        self._n_framed = n_rows
+        self._dirty = set()
+        self._frame = self._buffer.iloc[:n_rows]
+        return self._frame
@@ -0,0 +1,101 @@
+""" Webhook client keeping a warm keep-alive connection per webhook URL"""
+import threading
+import time
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from tradealerter.alert_dispatcher import RateLimited
+
+
+class WebhookClient():
+    """Post alerts to a Discord style webhook over a pooled session
+
+    The TCP and TLS handshakes are paid once by warm(), at startup and again
+    by the keep-alive thread when the connection has been idle for longer
+    than idle seconds, so sends reuse an open connection.
+
+    Parameters
+    ----------
+    url : str
+        webhook URL
+    username : str
+        name shown as author of the alerts
+    timeout : float
+        seconds to wait for the webhook to answer
+    idle : float
+        seconds without requests before warming the connection again,
+        servers usually close idle keep-alive connections after a minute or two
+    """
+    def __init__(self, url:str, username:str=None, timeout:float=5, idle:float=45):
+        self.url = url
+        self.username = username
+        self.timeout = timeout
+        self.idle = idle
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.latencies = deque(maxlen=100)
+        self.last_used = None
+        self._stop = threading.Event()
+        self._keepalive = None
+
+    def warm(self):
+        "Open the connection with a cheap GET of the webhook"
+        try:
+            self.session.get(self.url, timeout=self.timeout)
+            self.last_used = time.monotonic()
+        except requests.RequestException as e:
+            print("Could not warm webhook connection:", e)
+
+    def start_keepalive(self):
+        "Warm now and keep the connection warm from a daemon thread"
+        if self._keepalive is None:
+            self._keepalive = threading.Thread(target=self._keep_warm, daemon=True,
+                                               name="webhook-keepalive")
+            self._keepalive.start()
+
+    def _keep_warm(self):
+        self.warm()
+        while not self._stop.wait(self.idle / 3):
+            if self.last_used is None or time.monotonic() - self.last_used > self.idle:
+                self.warm()
+
+    def send(self, content:str)->requests.Response:
+        "Post content, raises RateLimited on 429 and HTTPError on other errors"
+        payload = {'content': content}
+        if self.username:
+            payload['username'] = self.username
+        t0 = time.perf_counter()
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        latency = time.perf_counter() - t0
+        self.last_used = time.monotonic()
+        self.latencies.append(latency)
+        if response.status_code == 429:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after is None:
+                try:
+                    retry_after = response.json().get('retry_after', 1)
+                except ValueError:
+                    retry_after = 1
+            raise RateLimited(float(retry_after))
+        response.raise_for_status()
+        print(f"webhook alert sent in {latency*1000:.0f} ms, response: {response.status_code}")
+        return response
+
+    def close(self):
+        self._stop.set()
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_webhook_client(url:str, username:str=None, **kwargs)->WebhookClient:
+    "Shared client of url, created and kept warm on first use"
+    with _clients_lock:
+        client = _clients.get(url)
+        if client is None:
+            client = _clients[url] = WebhookClient(url, username, **kwargs)
+            client.start_keepalive()
+        return client